@@ -1,30 +1,218 @@
 """
 Authentication module for the School Management System
+
+Password hashes live in the 'credentials' collection, keyed by username and
+separate from the user records, so a login is two keyed lookups. Hashes are
+made with a tunable KDF (PASSWORD_KDF); legacy SHA-256 hashes and hashes
+made with older settings are upgraded when their owner next logs in.
 """
 import hashlib
+import hmac
 import uuid
 import json
 import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
 from typing import Dict, Tuple, Optional, Any, List
-from utils.constants import USER_ROLES, DATA_DIR
-from storage.datastore import get_data, save_data
+from utils.constants import (
+    USER_ROLES, DATA_DIR, PASSWORD_KDF, PBKDF2_ITERATIONS, SCRYPT_N, SCRYPT_R, SCRYPT_P,
+    VERIFIED_CACHE_SIZE, VERIFIED_CACHE_TTL_SECONDS
+)
+from storage.datastore import (
+    get_data, save_data, get_item, add_item, delete_item, run_transaction
+)
+from utils.helpers import set_user_id_mapping, remove_user_id_mapping
+
+# Recent successful logins: username -> (stored hash, keyed digest of the
+# password, expiry). The digest key never leaves the process.
+_verified: "OrderedDict[str, Tuple[str, bytes, float]]" = OrderedDict()
+_verified_key = os.urandom(32)
+_verified_lock = threading.Lock()
+
+def _kdf_params() -> Tuple[str, Tuple[int, ...]]:
+    """Get the configured KDF and its cost parameters."""
+    if PASSWORD_KDF == "scrypt":
+        return "scrypt", (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return "pbkdf2_sha256", (PBKDF2_ITERATIONS,)
+
+def _derive(password: str, salt: bytes, kdf: str, params: Tuple[int, ...]) -> bytes:
+    """Run a KDF over a password."""
+    if kdf == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024)
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params[0])
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using SHA-256.
+    Hash a password with the configured KDF and a random salt.
     
     Args:
         password: The password to hash
         
     Returns:
-        The hashed password
+        Encoded hash, e.g. "pbkdf2_sha256$60000$<salt>$<hash>"
+    """
+    kdf, params = _kdf_params()
+    salt = os.urandom(16)
+    digest = _derive(password, salt, kdf, params)
+    return "$".join([kdf, *map(str, params), salt.hex(), digest.hex()])
+
+def verify_password(password: str, encoded: str) -> bool:
+    """
+    Check a password against a stored hash.
+    
+    Args:
+        password: The password to verify
+        encoded: Hash from hash_password(), or a legacy SHA-256 hex digest
+        
+    Returns:
+        True if the password matches
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    if "$" not in encoded:
+        # Legacy unsalted SHA-256
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), encoded)
+    
+    try:
+        kdf, *params, salt, digest = encoded.split("$")
+        params = tuple(map(int, params))
+        expected = bytes.fromhex(digest)
+        salt = bytes.fromhex(salt)
+    except ValueError:
+        return False
+    
+    if kdf not in ("pbkdf2_sha256", "scrypt"):
+        return False
+    
+    return hmac.compare_digest(_derive(password, salt, kdf, params), expected)
+
+def needs_rehash(encoded: str) -> bool:
+    """
+    Check whether a stored hash was made with other than the current settings.
+    
+    Args:
+        encoded: Stored hash
+        
+    Returns:
+        True if the hash should be replaced after a successful login
+    """
+    kdf, params = _kdf_params()
+    return not encoded.startswith("$".join([kdf, *map(str, params), ""]))
+
+def set_password(username: str, password: str) -> None:
+    """
+    Store a new password for a user.
+    
+    Args:
+        username: The username of the user
+        password: The new password
+    """
+    _store_hash(username, hash_password(password))
+
+def _store_hash(username: str, encoded: str) -> None:
+    """Replace a user's stored hash."""
+    add_item('credentials', username, {
+        "hash": encoded,
+        "updated_at": datetime.now().isoformat()
+    })
+    
+    with _verified_lock:
+        _verified.pop(username, None)
+
+def delete_credentials(username: str) -> None:
+    """
+    Remove a user's stored password.
+    
+    Args:
+        username: The username of the user
+    """
+    delete_item('credentials', username)
+    
+    with _verified_lock:
+        _verified.pop(username, None)
+
+def rename_credentials(old_username: str, new_username: str) -> None:
+    """
+    Move a user's stored password to a new username.
+    
+    Args:
+        old_username: The user's previous username
+        new_username: The user's new username
+    """
+    credential = get_item('credentials', old_username)
+    if credential is None:
+        return
+    
+    add_item('credentials', new_username, credential)
+    delete_credentials(old_username)
+
+def migrate_credentials() -> int:
+    """
+    Move password hashes still stored on user records to the credential store.
+    
+    Returns:
+        Number of hashes moved
+    """
+    if not any("password" in user for user in get_data('users', readonly=True).values()):
+        return 0
+    
+    def move() -> int:
+        users = get_data('users')
+        credentials = get_data('credentials')
+        moved = 0
+        
+        for username, user in users.items():
+            if "password" in user:
+                encoded = user.pop("password")
+                # A hash already in the store is newer than the one on the record
+                if username not in credentials:
+                    credentials[username] = {"hash": encoded, "updated_at": datetime.now().isoformat()}
+                moved += 1
+        
+        save_data('credentials', credentials)
+        save_data('users', users)
+        return moved
+    
+    return run_transaction(move)
+
+def _recently_verified(username: str, encoded: str, password: str) -> bool:
+    """Check whether this password was verified against this hash lately."""
+    with _verified_lock:
+        entry = _verified.get(username)
+        if entry is None:
+            return False
+        
+        stored, digest, expires_at = entry
+        if stored != encoded or expires_at < time.monotonic():
+            del _verified[username]
+            return False
+        
+        _verified.move_to_end(username)
+    
+    candidate = hmac.new(_verified_key, password.encode(), hashlib.sha256).digest()
+    return hmac.compare_digest(candidate, digest)
+
+def _remember_verified(username: str, encoded: str, password: str) -> None:
+    """Record a successful verification, evicting the least recent if full."""
+    digest = hmac.new(_verified_key, password.encode(), hashlib.sha256).digest()
+    
+    with _verified_lock:
+        _verified[username] = (encoded, digest, time.monotonic() + VERIFIED_CACHE_TTL_SECONDS)
+        _verified.move_to_end(username)
+        
+        while len(_verified) > VERIFIED_CACHE_SIZE:
+            _verified.popitem(last=False)
 
 def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
     """
     Authenticate a user using username and password.
     
+    Only the user's credential and record are read. A password verified
+    in the last VERIFIED_CACHE_TTL_SECONDS skips the KDF, and a hash made
+    with outdated settings is replaced once the password is known.
+    
     Args:
         username: The username to authenticate
         password: The password to verify
@@ -32,20 +220,26 @@ def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
     Returns:
         User data if authentication successful, None otherwise
     """
-    users = get_data('users')
+    credential = get_item('credentials', username)
     
     # Check if username exists
-    if username not in users:
+    if credential is None:
         return None
     
-    user = users[username]
-    hashed_password = hash_password(password)
+    encoded = credential["hash"]
     
-    # Check if password matches
-    if user["password"] == hashed_password:
-        return user
+    if not _recently_verified(username, encoded, password):
+        # Check if password matches
+        if not verify_password(password, encoded):
+            return None
+        
+        if needs_rehash(encoded):
+            encoded = hash_password(password)
+            _store_hash(username, encoded)
+        
+        _remember_verified(username, encoded, password)
     
-    return None
+    return get_item('users', username)
 
 def register_new_user(username: str, password: str) -> Tuple[bool, str]:
     """
@@ -58,34 +252,41 @@ def register_new_user(username: str, password: str) -> Tuple[bool, str]:
     Returns:
         Tuple of (success, message)
     """
-    users = get_data('users')
+    # Hash before queueing, so the queue is only held for the write
+    encoded = hash_password(password)
     
-    # Check if username already exists
-    if username in users:
-        return False, "❌ Username already exists"
-    
-    # If this is the first user, make them an admin
-    if not users:
-        role = USER_ROLES.ADMIN
-        message = "✅ Admin account created successfully"
-    else:
-        # Otherwise, register as a pending user that needs admin approval
-        role = "pending"
-        message = "✅ Registration submitted. Awaiting admin approval."
-    
-    # Create user record
-    users[username] = {
-        "id": str(uuid.uuid4()),
-        "username": username,
-        "password": hash_password(password),
-        "role": role,
-        "created_at": __import__('datetime').datetime.now().isoformat()
-    }
-    
-    # Save the updated users data
-    save_data('users', users)
+    def register() -> Tuple[bool, str]:
+        # Check if username already exists
+        if get_item('users', username) is not None:
+            return False, "❌ Username already exists"
+        
+        # If this is the first user, make them an admin
+        if not get_data('users', readonly=True):
+            role = USER_ROLES.ADMIN
+            message = "✅ Admin account created successfully"
+        else:
+            # Otherwise, register as a pending user that needs admin approval
+            role = "pending"
+            message = "✅ Registration submitted. Awaiting admin approval."
+        
+        # Create user record
+        user_id = str(uuid.uuid4())
+        add_item('users', username, {
+            "id": user_id,
+            "username": username,
+            "role": role,
+            "created_at": datetime.now().isoformat()
+        })
+        
+        # Save the user, password and ID mapping together
+        _store_hash(username, encoded)
+        set_user_id_mapping(user_id, username)
+        
+        return True, message
     
-    return True, message
+    # Registrations run one at a time, as the only writer: two first
+    # registrations must not both find no users and become admins
+    return run_transaction(register, retries=0)
 
 def update_user_role(username: str, new_role: str, admin_username: str) -> Tuple[bool, str]:
     """
@@ -167,7 +368,12 @@ def reject_registration(username: str, admin_username: str) -> Tuple[bool, str]:
         return False, f"❌ User '{username}' is not a pending registration"
     
     # Remove the user
+    user_id = users[username].get("id")
     del users[username]
     save_data('users', users)
+    delete_credentials(username)
+    
+    if user_id:
+        remove_user_id_mapping(user_id)
     
     return True, f"✅ Registration for '{username}' has been rejected"
\ No newline at end of file
@@ -2,18 +2,23 @@
 Admin dashboard module for the School Management System
 """
 import os
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from utils.helpers import clear_screen, get_user_by_id, get_username_by_id
+from itertools import groupby
+from typing import List, Dict, Any, Optional, Iterable
+from utils.helpers import clear_screen, get_user_by_id, get_username_by_id, set_user_id_mapping
 from utils.constants import USER_ROLES, MENU_BACK, MENU_LOGOUT
 from auth import get_pending_registrations, approve_registration, reject_registration
 from storage.datastore import get_data, save_data, add_item, update_item, delete_item
+from storage.sequences import next_id
 from services.user_service import create_user, get_user_by_username, list_users_by_role
 from services.student_service import add_student, get_student_details
 from services.teacher_service import add_teacher, get_teacher_details
 from services.staff_service import add_staff, get_staff_details
-from services.event_service import create_event, list_events
-from services.attendance_service import generate_attendance_report
+from services.event_service import create_event, update_event, list_events
+from services.attendance_service import iter_attendance_report
+from services.grade_service import load_grade_analytics
+from services.search_service import search_by_name
 
 def admin_dashboard(admin_id: str) -> None:
     """
@@ -159,16 +164,12 @@ def lookup_users(admin_id: str) -> None:
         elif choice == "3":
             # Lookup by name
             name = input("\nEnter name or part of name: ").lower()
-            users = get_data('users')
-            matching_users = []
-            
-            for username, user in users.items():
-                first_name = user.get("first_name", "").lower()
-                last_name = user.get("last_name", "").lower()
-                full_name = f"{first_name} {last_name}".strip()
-                
-                if name in first_name or name in last_name or name in full_name:
-                    matching_users.append(user)
+            users = get_data('users', readonly=True)
+            # Skip users removed between the search and this read
+            matching_users = [
+                users[username] for username in search_by_name('users', name)
+                if username in users
+            ]
             
             if matching_users:
                 print(f"\nFound {len(matching_users)} matching users:")
@@ -329,7 +330,7 @@ def post_announcement(admin_id: str) -> None:
     
     # Create the announcement
     announcements = get_data('announcements')
-    announcement_id = f"ANN{len(announcements) + 1:04d}"
+    announcement_id = next_id("ANN")
     
     announcements[announcement_id] = {
         "title": title,
@@ -639,9 +640,9 @@ def add_parent_ui(admin_username: str) -> None:
     
     # Call the service to add the parent
     parents = get_data('parents')
-    parent_id = f"PAR{len(parents) + 1:04d}"
+    parent_id = next_id("PAR")
     
-    from auth import hash_password
+    from auth import set_password
     
     # Create parent record
     parents[parent_id] = {
@@ -662,7 +663,6 @@ def add_parent_ui(admin_username: str) -> None:
     users[username] = {
         "id": parent_id,
         "username": username,
-        "password": hash_password(password),
         "role": USER_ROLES.PARENT,
         "first_name": first_name,
         "last_name": last_name,
@@ -672,7 +672,9 @@ def add_parent_ui(admin_username: str) -> None:
         "is_active": True
     }
     
+    set_password(username, password)
     save_data('users', users)
+    set_user_id_mapping(parent_id, username)
     
     # Update student records with parent ID
     for student_id in selected_students:
@@ -755,9 +757,9 @@ def update_user_ui(admin_username: str) -> None:
     # Update password option
     change_password = input("\nChange password? (y/n): ").lower() == 'y'
     if change_password:
-        from auth import hash_password
+        from auth import set_password
         new_password = input("New Password: ")
-        user["password"] = hash_password(new_password)
+        set_password(username, new_password)
     
     # Update basic user information
     user["first_name"] = first_name
@@ -1158,21 +1160,14 @@ def edit_event_ui(admin_username: str) -> None:
             description = input(f"Description [{selected_event.get('description', '')}]: ") or selected_event.get('description', '')
             location = input(f"Location [{selected_event.get('location', '')}]: ") or selected_event.get('location', '')
             
-            # Update the event
-            all_events = get_data('events')
-            if event_id in all_events:
-                all_events[event_id].update({
-                    "title": title,
-                    "description": description,
-                    "location": location,
-                    "modified_at": datetime.now().isoformat(),
-                    "modified_by": admin_username
-                })
-                
-                save_data('events', all_events)
-                print("\n✅ Event updated successfully.")
-            else:
-                print("\n❌ Event not found.")
+            # Update the event (rejected if the new location is already booked)
+            success, message = update_event(event_id, {
+                "title": title,
+                "description": description,
+                "location": location
+            }, admin_username)
+            
+            print(f"\n{message}")
     except ValueError:
         print("\n❌ Invalid choice.")
     
@@ -1274,14 +1269,14 @@ def view_attendance_reports() -> None:
             course_ids = list(courses.keys())
             if 1 <= course_idx <= len(course_ids):
                 course_id = course_ids[course_idx - 1]
-                report = generate_attendance_report(course_id=course_id)
+                report = iter_attendance_report(course_id=course_id)
                 display_attendance_report(report, f"Course: {courses[course_id].get('name', '')}")
         except ValueError:
             print("\n❌ Invalid choice.")
     
     elif choice == "2":
         # Get list of students
-        students = get_data('students')
+        students = get_data('students', readonly=True)
         if not students:
             print("\nNo students found.")
             input("\nPress Enter to continue...")
@@ -1290,15 +1285,10 @@ def view_attendance_reports() -> None:
         print("\nEnter student name or ID:")
         search = input().lower()
         
-        matching_students = []
-        for student_id, student in students.items():
-            first_name = student.get("first_name", "").lower()
-            last_name = student.get("last_name", "").lower()
-            full_name = f"{first_name} {last_name}".strip()
-            
-            if (search in first_name or search in last_name or 
-                search in full_name or search in student_id.lower()):
-                matching_students.append((student_id, student))
+        matching_students = [
+            (student_id, students[student_id])
+            for student_id in search_by_name('students', search, match_ids=True)
+        ]
         
         if matching_students:
             print("\nMatching Students:")
@@ -1312,7 +1302,7 @@ def view_attendance_reports() -> None:
                 if 1 <= student_idx <= len(matching_students):
                     student_id, student = matching_students[student_idx - 1]
                     name = f"{student.get('first_name', '')} {student.get('last_name', '')}".strip()
-                    report = generate_attendance_report(student_id=student_id)
+                    report = iter_attendance_report(student_id=student_id)
                     display_attendance_report(report, f"Student: {name}")
             except ValueError:
                 print("\n❌ Invalid choice.")
@@ -1324,7 +1314,7 @@ def view_attendance_reports() -> None:
         start_date = input("Start Date (YYYY-MM-DD): ")
         end_date = input("End Date (YYYY-MM-DD): ")
         
-        report = generate_attendance_report(start_date=start_date, end_date=end_date)
+        report = iter_attendance_report(start_date=start_date, end_date=end_date)
         display_attendance_report(report, f"Date Range: {start_date} to {end_date}")
     
     elif choice == MENU_BACK:
@@ -1350,14 +1340,26 @@ def view_grade_reports() -> None:
     choice = input("\nEnter your choice: ")
     
     if choice == "1":
-        # Grade report by class logic
-        pass
+        # Grade report by class
+        analytics = load_grade_analytics()
+        courses = get_data('courses', readonly=True)
+        
+        rows = [
+            (f"{courses.get(row['course_id'], {}).get('name', row['course_id'])} "
+             f"({courses.get(row['course_id'], {}).get('code', '')})", row)
+            for row in analytics.course_report()
+        ]
+        display_grade_statistics(rows, "By Class")
     elif choice == "2":
-        # Grade report by student logic
-        pass
+        # Grade report by student
+        analytics = load_grade_analytics()
+        students = get_data('students', readonly=True)
+        display_student_grade_report(analytics.student_report(), students)
     elif choice == "3":
-        # Grade report by term logic
-        pass
+        # Grade report by term
+        analytics = load_grade_analytics()
+        rows = [(row["term"], row) for row in analytics.term_report()]
+        display_grade_statistics(rows, "By Term")
     elif choice == MENU_BACK:
         return
     else:
@@ -1365,6 +1367,77 @@ def view_grade_reports() -> None:
     
     input("\nPress Enter to continue...")
 
+def display_grade_statistics(rows: List[tuple], title: str, 
+                             rows_per_page: int = 10) -> None:
+    """
+    Display grade statistics for a list of groups (classes or terms).
+    
+    Args:
+        rows: List of (label, statistics) tuples
+        title: Title for the report
+        rows_per_page: Number of groups to show before pausing
+    """
+    clear_screen()
+    print("\n" + "=" * 50)
+    print(f"📊 GRADE REPORT: {title} 📊".center(50))
+    print("=" * 50 + "\n")
+    
+    if not rows:
+        print("No grades found.")
+        return
+    
+    for shown, (label, stats) in enumerate(rows):
+        if shown and shown % rows_per_page == 0:
+            more = input("\nPress Enter for more (or 0 to stop): ")
+            if more == MENU_BACK:
+                return
+        
+        distribution = ", ".join(
+            f"{letter}: {count}" for letter, count in stats["distribution"].items() if count
+        )
+        
+        print(f"\n{label}")
+        print("-" * 50)
+        print(f"Grades: {stats['count']}")
+        print(f"Mean: {stats['mean']:.1f}%   Median: {stats['median']:.1f}%   "
+              f"Std Dev: {stats['stddev']:.1f}")
+        print(f"Range: {stats['min']:.1f}% - {stats['max']:.1f}%")
+        print(f"Distribution: {distribution}")
+
+def display_student_grade_report(report: List[Dict[str, Any]], 
+                                 students: Dict[str, Any],
+                                 rows_per_page: int = 20) -> None:
+    """
+    Display every student's average and GPA, highest GPA first.
+    
+    Args:
+        report: Rows from GradeAnalytics.student_report()
+        students: The students collection, for names
+        rows_per_page: Number of students to show before pausing
+    """
+    clear_screen()
+    print("\n" + "=" * 50)
+    print("📊 GRADE REPORT: By Student 📊".center(50))
+    print("=" * 50 + "\n")
+    
+    if not report:
+        print("No grades found.")
+        return
+    
+    print(f"{'Student':<30} {'Courses':>7} {'Average':>8} {'GPA':>5}")
+    print("-" * 53)
+    
+    for shown, row in enumerate(report):
+        if shown and shown % rows_per_page == 0:
+            more = input("\nPress Enter for more (or 0 to stop): ")
+            if more == MENU_BACK:
+                return
+        
+        student = students.get(row["student_id"], {})
+        name = f"{student.get('first_name', '')} {student.get('last_name', '')}".strip() or row["student_id"]
+        
+        print(f"{name[:30]:<30} {row['courses']:>7} {row['average']:>7.1f}% {row['gpa']:>5.2f}")
+
 def view_financial_reports() -> None:
     """UI for viewing financial reports."""
     clear_screen()
@@ -1645,13 +1718,18 @@ def display_event_details(event: Dict[str, Any]) -> None:
     
     input("\nPress Enter to continue...")
 
-def display_attendance_report(report: List[Dict[str, Any]], title: str) -> None:
+def display_attendance_report(report: Iterable[Dict[str, Any]], title: str,
+                              dates_per_page: int = 10) -> None:
     """
     Display an attendance report.
     
+    The report is consumed lazily, one date at a time, and shown a page of
+    dates at a time, so long reports never have to be held in memory.
+    
     Args:
-        report: List of attendance records
+        report: Attendance records sorted by date (list or iterator)
         title: Title for the report
+        dates_per_page: Number of dates to show before pausing
     """
     clear_screen()
     print("\n" + "=" * 50)
@@ -1659,31 +1737,31 @@ def display_attendance_report(report: List[Dict[str, Any]], title: str) -> None:
     print("=" * 50)
     print(f"\n{title}\n")
     
-    if not report:
-        print("No attendance records found.")
-        return
-    
-    # Group by date
-    by_date = {}
-    for record in report:
-        date = record.get('date', '')
-        if date not in by_date:
-            by_date[date] = []
-        by_date[date].append(record)
+    shown = 0
     
-    # Display report
-    for date, records in sorted(by_date.items()):
+    # Display report, grouping consecutive records by date
+    for date, records in groupby(report, key=lambda r: r.get('date', '')):
+        if shown and shown % dates_per_page == 0:
+            more = input("\nPress Enter for more dates (or 0 to stop): ")
+            if more == MENU_BACK:
+                return
+        
+        counts = Counter(r.get('status') for r in records)
+        total = sum(counts.values())
+        present = counts['present']
+        absent = counts['absent']
+        late = counts['late']
+        excused = counts['excused']
+        shown += 1
+        
         print(f"\nDate: {date}")
         print("-" * 50)
         
-        present = sum(1 for r in records if r.get('status') == 'present')
-        absent = sum(1 for r in records if r.get('status') == 'absent')
-        late = sum(1 for r in records if r.get('status') == 'late')
-        excused = sum(1 for r in records if r.get('status') == 'excused')
-        total = len(records)
-        
         print(f"Total: {total}")
         print(f"Present: {present} ({present/total*100:.1f}%)")
         print(f"Absent: {absent} ({absent/total*100:.1f}%)")
         print(f"Late: {late} ({late/total*100:.1f}%)")
-        print(f"Excused: {excused} ({excused/total*100:.1f}%)")
\ No newline at end of file
+        print(f"Excused: {excused} ({excused/total*100:.1f}%)")
+    
+    if not shown:
+        print("No attendance records found.")
\ No newline at end of file
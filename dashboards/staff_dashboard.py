@@ -487,12 +487,11 @@ def send_fees_report_to_admin(staff_id: str) -> None:
     }
     
     # Save report
-    reports = get_data('reports')
-    report_id = f"REP{len(reports) + 1:04d}"
-    reports[report_id] = report
+    from storage.datastore import add_item
+    from storage.sequences import next_id
     
-    from storage.datastore import save_data
-    save_data('reports', reports)
+    report_id = next_id("REP")
+    add_item('reports', report_id, report)
     
     print(f"\n✅ Fee report sent to admin. Report ID: {report_id}")
     input("\nPress Enter to continue...")
\ No newline at end of file
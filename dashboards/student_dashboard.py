@@ -2,12 +2,15 @@
 Student dashboard for the School Management System
 """
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from utils.helpers import clear_screen, get_user_by_id
 from utils.constants import USER_ROLES, MENU_BACK, MENU_LOGOUT
-from storage.datastore import get_data, save_data
+from storage.datastore import get_data, add_item, run_transaction
+from storage.sequences import next_id
 from services.event_service import get_upcoming_events
 from services.student_service import get_student_courses, get_student_grades
+from services.assignment_service import get_submission, record_submission, iter_assignments_due
+from services.grade_service import get_student_gradebook
 
 def student_dashboard(student_id: str) -> None:
     """
@@ -89,38 +92,32 @@ def get_due_assignments(student_id: str, limit: int = 5) -> List[Dict[str, Any]]
     course_ids = [course.get("id", "") for course in student_courses]
     
     # Get assignments for these courses
-    assignments = get_data('assignments')
+    assignments = get_data('assignments', readonly=True)
     
-    # Filter assignments that are active and due in the future
+    # Walk the courses' assignments in due-date order, starting today
     today = datetime.now().strftime("%Y-%m-%d")
     
     due_assignments = []
-    submissions = get_data('submissions')
     
-    for assignment_id, assignment in assignments.items():
-        if assignment.get("course_id") in course_ids and assignment.get("status") == "active":
-            due_date = assignment.get("due_date", "")
-            
-            if due_date >= today:
-                # Check if already submitted
-                is_submitted = False
-                for submission in submissions.values():
-                    if (submission.get("assignment_id") == assignment_id and 
-                        submission.get("student_id") == student_id):
-                        is_submitted = True
-                        break
-                
-                if not is_submitted:
-                    due_assignments.append({
-                        "id": assignment_id,
-                        **assignment
-                    })
-    
-    # Sort by due date
-    due_assignments.sort(key=lambda x: x.get("due_date", ""))
+    for due_date, assignment_id in iter_assignments_due(course_ids, today):
+        assignment = assignments.get(assignment_id)
+        
+        if not assignment or assignment.get("status") != "active":
+            continue
+        
+        # Skip assignments already submitted
+        if get_submission(assignment_id, student_id):
+            continue
+        
+        due_assignments.append({
+            "id": assignment_id,
+            **assignment
+        })
+        
+        if len(due_assignments) >= limit:
+            break
     
-    # Return limited number of assignments
-    return due_assignments[:limit]
+    return due_assignments
 
 def view_grades_ui(student_id: str) -> None:
     """
@@ -344,28 +341,21 @@ def view_course_grades(student_id: str, course: Dict[str, Any]) -> None:
     
     input("\nPress Enter to continue...")
 
-def view_grade_summaries(student_id: str) -> None:
+def get_grade_summaries(student_id: str) -> Tuple[List[Dict[str, Any]], Optional[float]]:
     """
-    View grade summaries for a student.
+    Calculate per-course grade averages and the overall average for a student.
     
     Args:
         student_id: ID of the student
-    """
-    clear_screen()
-    print("\n" + "=" * 50)
-    print("📊 GRADE SUMMARIES 📊".center(50))
-    print("=" * 50 + "\n")
     
+    Returns:
+        Tuple of (course averages, overall average or None if no grades)
+    """
     # Get student's courses
     student_courses = get_student_courses(student_id)
     
-    if not student_courses:
-        print("You are not enrolled in any courses.")
-        input("\nPress Enter to continue...")
-        return
-    
-    # Get student's grades
-    grades = get_data('grades')
+    # Get the student's precomputed per-course aggregates
+    gradebook = get_student_gradebook(student_id)
     
     # Calculate course averages
     course_averages = []
@@ -374,25 +364,15 @@ def view_grade_summaries(student_id: str) -> None:
         course_id = course.get("id", "")
         course_name = course.get("name", "")
         
-        course_grades = []
-        for grade_id, grade in grades.items():
-            if grade.get("student_id") == student_id and grade.get("course_id") == course_id:
-                course_grades.append(grade)
+        entry = gradebook.get(course_id)
         
-        if course_grades:
-            total_percentage = sum(grade.get("percentage", 0) for grade in course_grades)
-            average_percentage = total_percentage / len(course_grades)
-            
-            # Get letter grade for average
-            from utils.helpers import calculate_grade_letter
-            average_letter = calculate_grade_letter(average_percentage)
-            
+        if entry and entry.get("count", 0) > 0:
             course_averages.append({
                 "course_id": course_id,
                 "course_name": course_name,
-                "average_percentage": average_percentage,
-                "average_letter": average_letter,
-                "grades_count": len(course_grades)
+                "average_percentage": entry["average_percentage"],
+                "average_letter": entry["average_letter"],
+                "grades_count": entry["count"]
             })
         else:
             course_averages.append({
@@ -403,12 +383,37 @@ def view_grade_summaries(student_id: str) -> None:
                 "grades_count": 0
             })
     
-    # Calculate overall GPA
+    # Calculate overall average
     courses_with_grades = [course for course in course_averages if course["grades_count"] > 0]
     
-    if courses_with_grades:
-        total_percentage = sum(course.get("average_percentage", 0) for course in courses_with_grades)
-        overall_average = total_percentage / len(courses_with_grades)
+    if not courses_with_grades:
+        return course_averages, None
+    
+    total_percentage = sum(course.get("average_percentage", 0) for course in courses_with_grades)
+    return course_averages, total_percentage / len(courses_with_grades)
+
+def view_grade_summaries(student_id: str) -> None:
+    """
+    View grade summaries for a student.
+    
+    Args:
+        student_id: ID of the student
+    """
+    clear_screen()
+    print("\n" + "=" * 50)
+    print("📊 GRADE SUMMARIES 📊".center(50))
+    print("=" * 50 + "\n")
+    
+    course_averages, overall_average = get_grade_summaries(student_id)
+    
+    if not course_averages:
+        print("You are not enrolled in any courses.")
+        input("\nPress Enter to continue...")
+        return
+    
+    # Display overall GPA
+    if overall_average is not None:
+        from utils.helpers import calculate_grade_letter
         overall_letter = calculate_grade_letter(overall_average)
         
         print(f"Overall Average: {overall_average:.1f}% ({overall_letter})\n")
@@ -516,20 +521,13 @@ def submit_assignment_ui(student_id: str) -> None:
     assignments = get_data('assignments')
     
     # Filter assignments that are active and not already submitted
-    submissions = get_data('submissions')
-    
     available_assignments = []
     
     for assignment_id, assignment in assignments.items():
         if assignment.get("course_id") in [course.get("id") for course in student_courses]:
             if assignment.get("status") == "active":
                 # Check if already submitted
-                is_submitted = False
-                for submission in submissions.values():
-                    if (submission.get("assignment_id") == assignment_id and 
-                        submission.get("student_id") == student_id):
-                        is_submitted = True
-                        break
+                is_submitted = get_submission(assignment_id, student_id) is not None
                 
                 if not is_submitted:
                     available_assignments.append({
@@ -612,10 +610,9 @@ def submit_assignment(student_id: str, assignment: Dict[str, Any]) -> None:
     is_late = today > due_date
     
     # Create submission
-    submissions = get_data('submissions')
-    submission_id = f"SUB{len(submissions) + 1:04d}"
+    submission_id = next_id("SUB")
     
-    submissions[submission_id] = {
+    submission = {
         "assignment_id": assignment_id,
         "student_id": student_id,
         "content": content,
@@ -625,7 +622,11 @@ def submit_assignment(student_id: str, assignment: Dict[str, Any]) -> None:
         "status": "submitted"
     }
     
-    save_data('submissions', submissions)
+    def submit() -> None:
+        add_item('submissions', submission_id, submission)
+        record_submission(assignment_id, student_id, submission_id)
+    
+    run_transaction(submit)
     
     if is_late:
         print("\n⚠️ This submission is late.")
@@ -790,13 +791,11 @@ def display_material_details(material: Dict[str, Any]) -> None:
     uploader_name = "Unknown"
     
     if uploader_id:
-        users = get_data('users')
-        for username, user in users.items():
-            if user.get("id") == uploader_id:
-                uploader_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
-                if not uploader_name:
-                    uploader_name = username
-                break
+        user = get_user_by_id(uploader_id)
+        if user:
+            uploader_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
+            if not uploader_name:
+                uploader_name = user.get("username", "Unknown")
     
     print(f"Title: {title}")
     print(f"Type: {material_type}")
@@ -885,13 +884,11 @@ def display_announcement_details(announcement: Dict[str, Any]) -> None:
     author_name = "Unknown"
     
     if author_id:
-        users = get_data('users')
-        for username, user in users.items():
-            if user.get("id") == author_id:
-                author_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
-                if not author_name:
-                    author_name = username
-                break
+        user = get_user_by_id(author_id)
+        if user:
+            author_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
+            if not author_name:
+                author_name = user.get("username", "Unknown")
     
     if is_important:
         print(f"🔴 {title} (IMPORTANT)")
@@ -6,10 +6,18 @@ from datetime import datetime
 from typing import List, Dict, Any
 from utils.helpers import clear_screen, get_user_by_id
 from utils.constants import USER_ROLES, MENU_BACK, MENU_LOGOUT, ATTENDANCE_STATUS
-from storage.datastore import get_data, save_data
+from storage.datastore import (
+    get_data, get_item, add_item, update_item, get_by_index, run_transaction
+)
+from storage.sequences import next_id
 from services.event_service import get_upcoming_events
 from services.teacher_service import get_teacher_courses
 from services.attendance_service import mark_attendance, update_attendance, get_course_attendance
+from services.assignment_service import add_course_assignment, get_submission, record_submission
+from services.grade_service import record_grades
+from services.message_service import (
+    send_message, get_inbox, get_thread, get_thread_messages, mark_thread_read
+)
 
 def teacher_dashboard(teacher_id: str) -> None:
     """
@@ -396,10 +404,9 @@ def enter_grades(teacher_id: str, course_id: str, assignment_type: str,
         return
     
     # Create assignment entry
-    assignments = get_data('assignments')
-    assignment_id = f"ASN{len(assignments) + 1:04d}"
+    assignment_id = next_id("ASN")
     
-    assignments[assignment_id] = {
+    assignment = {
         "course_id": course_id,
         "name": assignment_name,
         "type": assignment_type,
@@ -409,10 +416,14 @@ def enter_grades(teacher_id: str, course_id: str, assignment_type: str,
         "created_at": datetime.now().isoformat()
     }
     
-    save_data('assignments', assignments)
+    def create() -> None:
+        add_item('assignments', assignment_id, assignment)
+        add_course_assignment(course_id, assignment_id, "")
+    
+    run_transaction(create)
     
     # Process student grades
-    grades = get_data('grades')
+    new_grades = {}
     student_grades = []
     
     clear_screen()
@@ -455,8 +466,8 @@ def enter_grades(teacher_id: str, course_id: str, assignment_type: str,
                     letter_grade = calculate_grade_letter(percentage)
                     
                     # Create grade record
-                    grade_id = f"GRD{len(grades) + 1:04d}"
-                    grades[grade_id] = {
+                    grade_id = next_id("GRD")
+                    new_grades[grade_id] = {
                         "student_id": student_id,
                         "course_id": course_id,
                         "assignment_id": assignment_id,
@@ -480,8 +491,13 @@ def enter_grades(teacher_id: str, course_id: str, assignment_type: str,
                 except ValueError:
                     print("❌ Invalid input. Please enter a number.")
     
-    # Save grades
-    save_data('grades', grades)
+    # Save grades and fold them into the gradebook
+    def save() -> None:
+        for grade_id, grade in new_grades.items():
+            add_item('grades', grade_id, grade)
+        record_grades(new_grades)
+    
+    run_transaction(save)
     
     # Show summary
     print("\nGrades Summary:")
@@ -610,10 +626,9 @@ def create_assignment_ui(teacher_id: str) -> None:
                 return
             
             # Create assignment
-            assignments = get_data('assignments')
-            assignment_id = f"ASN{len(assignments) + 1:04d}"
+            assignment_id = next_id("ASN")
             
-            assignments[assignment_id] = {
+            assignment = {
                 "title": title,
                 "description": description,
                 "type": assignment_type,
@@ -625,7 +640,11 @@ def create_assignment_ui(teacher_id: str) -> None:
                 "status": "active"
             }
             
-            save_data('assignments', assignments)
+            def create() -> None:
+                add_item('assignments', assignment_id, assignment)
+                add_course_assignment(course_id, assignment_id, due_date)
+            
+            run_transaction(create)
             
             print(f"\n✅ Assignment '{title}' created successfully.")
         else:
@@ -836,19 +855,17 @@ def grade_assignment(teacher_id: str, assignment: Dict[str, Any]) -> None:
         return
     
     # Get submissions for this assignment
-    submissions = get_data('submissions')
-    
     assignment_submissions = {}
-    for submission_id, submission in submissions.items():
-        if submission.get("assignment_id") == assignment_id:
-            student_id = submission.get("student_id")
-            assignment_submissions[student_id] = {
-                "id": submission_id,
-                **submission
-            }
+    for submission_id, submission in get_by_index('submissions', 'assignment_id', assignment_id).items():
+        student_id = submission.get("student_id")
+        assignment_submissions[student_id] = {
+            "id": submission_id,
+            **submission
+        }
     
     # Process grades
-    grades = get_data('grades')
+    new_grades = {}
+    graded = []
     
     clear_screen()
     print("\n" + "=" * 50)
@@ -871,12 +888,8 @@ def grade_assignment(teacher_id: str, assignment: Dict[str, Any]) -> None:
                 submission_date = submission.get("submitted_at", "")
                 
                 # Check if already graded
-                is_graded = False
-                for grade_id, grade in grades.items():
-                    if (grade.get("assignment_id") == assignment_id and 
-                        grade.get("student_id") == student_id):
-                        is_graded = True
-                        break
+                indexed = get_submission(assignment_id, student_id)
+                is_graded = bool(indexed) and indexed.get("status") == "graded"
                 
                 if is_graded:
                     print(f"{name}: Already graded")
@@ -908,8 +921,8 @@ def grade_assignment(teacher_id: str, assignment: Dict[str, Any]) -> None:
                         letter_grade = calculate_grade_letter(percentage)
                         
                         # Create grade record
-                        grade_id = f"GRD{len(grades) + 1:04d}"
-                        grades[grade_id] = {
+                        grade_id = next_id("GRD")
+                        new_grades[grade_id] = {
                             "student_id": student_id,
                             "course_id": course_id,
                             "assignment_id": assignment_id,
@@ -923,10 +936,8 @@ def grade_assignment(teacher_id: str, assignment: Dict[str, Any]) -> None:
                             "graded_at": datetime.now().isoformat()
                         }
                         
-                        # Update submission status
-                        submissions[submission.get("id")]["status"] = "graded"
-                        submissions[submission.get("id")]["graded_at"] = datetime.now().isoformat()
-                        submissions[submission.get("id")]["graded_by"] = teacher_id
+                        # Mark the submission graded when the grades are saved
+                        graded.append((student_id, submission.get("id")))
                         
                         break
                     except ValueError:
@@ -934,9 +945,23 @@ def grade_assignment(teacher_id: str, assignment: Dict[str, Any]) -> None:
             else:
                 print(f"{name}: Not submitted")
     
-    # Save grades and updated submissions
-    save_data('grades', grades)
-    save_data('submissions', submissions)
+    # Save grades and updated submissions together
+    def save() -> None:
+        graded_at = datetime.now().isoformat()
+        
+        for grade_id, grade in new_grades.items():
+            add_item('grades', grade_id, grade)
+        record_grades(new_grades)
+        
+        for student_id, submission_id in graded:
+            update_item('submissions', submission_id, {
+                "status": "graded",
+                "graded_at": graded_at,
+                "graded_by": teacher_id
+            })
+            record_submission(assignment_id, student_id, submission_id, "graded")
+    
+    run_transaction(save)
     
     print(f"\n✅ Grading for {assignment.get('title', '')} completed.")
     input("\nPress Enter to continue...")
@@ -1203,20 +1228,7 @@ def send_parent_message_ui(teacher_id: str) -> None:
             message = input("Message: ")
             
             # Send the message
-            messages = get_data('messages')
-            message_id = f"MSG{len(messages) + 1:04d}"
-            
-            messages[message_id] = {
-                "from_id": teacher_id,
-                "to_id": parent_id,
-                "student_id": selected_student.get("id"),
-                "subject": subject,
-                "message": message,
-                "sent_at": datetime.now().isoformat(),
-                "read": False
-            }
-            
-            save_data('messages', messages)
+            send_message(teacher_id, parent_id, selected_student.get("id"), teacher_id, subject, message)
             
             print("\n✅ Message sent successfully.")
         else:
@@ -1238,71 +1250,39 @@ def view_parent_messages_ui(teacher_id: str) -> None:
     print("📬 MESSAGE HISTORY 📬".center(50))
     print("=" * 50 + "\n")
     
-    # Get teacher's messages
-    messages = get_data('messages')
+    # Get teacher's conversations, most recent first
+    threads = get_inbox(teacher_id, "teacher_id")
     
-    teacher_messages = []
-    for message_id, message in messages.items():
-        if message.get("from_id") == teacher_id or message.get("to_id") == teacher_id:
-            teacher_messages.append({
-                "id": message_id,
-                **message
-            })
-    
-    if not teacher_messages:
+    if not threads:
         print("You don't have any messages.")
         input("\nPress Enter to continue...")
         return
     
-    # Sort by sent_at (newest first)
-    teacher_messages.sort(key=lambda x: x.get("sent_at", ""), reverse=True)
-    
-    # Group by conversation
-    conversations = {}
-    
-    for message in teacher_messages:
-        from_id = message.get("from_id")
-        to_id = message.get("to_id")
-        student_id = message.get("student_id")
-        
-        if from_id == teacher_id:
-            parent_id = to_id
-        else:
-            parent_id = from_id
-        
-        if student_id not in conversations:
-            conversations[student_id] = []
-        
-        conversations[student_id].append(message)
-    
     # Display conversations
     print("Select a conversation:")
     
-    students = get_data('students')
-    parents = get_data('parents')
-    
     i = 1
     conversation_map = {}
     
-    for student_id, msgs in conversations.items():
+    for thread in threads:
+        student_id = thread.get("student_id")
+        
         # Get student and parent names
         student_name = "Unknown Student"
         parent_name = "Unknown Parent"
         
-        if student_id in students:
-            student = students[student_id]
+        student = get_item('students', student_id)
+        if student:
             student_name = f"{student.get('first_name', '')} {student.get('last_name', '')}".strip()
-            
-            parent_id = student.get("parent_id")
-            if parent_id in parents:
-                parent = parents[parent_id]
-                parent_name = f"{parent.get('first_name', '')} {parent.get('last_name', '')}".strip()
         
-        latest_message = msgs[0]
-        sent_at = latest_message.get("sent_at", "")
-        unread = sum(1 for msg in msgs if msg.get("to_id") == teacher_id and not msg.get("read", False))
+        parent = get_item('parents', thread.get("parent_id"))
+        if parent:
+            parent_name = f"{parent.get('first_name', '')} {parent.get('last_name', '')}".strip()
         
-        print(f"{i}. Conversation with parent of {student_name}")
+        sent_at = thread.get("last_sent_at", "")
+        unread = thread.get("unread_count", 0)
+        
+        print(f"{i}. Conversation with {parent_name}, parent of {student_name}")
         print(f"   Latest message: {sent_at}")
         if unread > 0:
             print(f"   Unread messages: {unread}")
@@ -1362,28 +1342,12 @@ def view_conversation(teacher_id: str, student_id: str) -> None:
     parent = parents[parent_id]
     parent_name = f"{parent.get('first_name', '')} {parent.get('last_name', '')}".strip()
     
-    # Get messages
-    messages = get_data('messages')
-    
-    conversation_messages = []
-    for message_id, message in messages.items():
-        if ((message.get("from_id") == teacher_id and message.get("to_id") == parent_id) or
-            (message.get("from_id") == parent_id and message.get("to_id") == teacher_id)) and \
-           message.get("student_id") == student_id:
-            conversation_messages.append({
-                "id": message_id,
-                **message
-            })
-    
-    # Sort by sent_at
-    conversation_messages.sort(key=lambda x: x.get("sent_at", ""))
+    # Get the thread's messages, oldest first
+    thread = get_thread(teacher_id, parent_id, student_id)
+    conversation_messages = get_thread_messages(thread) if thread else []
     
     # Mark unread messages as read
-    for message in conversation_messages:
-        if message.get("to_id") == teacher_id and not message.get("read", False):
-            messages[message.get("id")]["read"] = True
-    
-    save_data('messages', messages)
+    mark_thread_read(teacher_id, parent_id, student_id, teacher_id)
     
     # Display conversation
     while True:
@@ -1424,32 +1388,10 @@ def view_conversation(teacher_id: str, student_id: str) -> None:
             message = input("Message: ")
             
             # Create the message
-            messages = get_data('messages')
-            message_id = f"MSG{len(messages) + 1:04d}"
-            
-            messages[message_id] = {
-                "from_id": teacher_id,
-                "to_id": parent_id,
-                "student_id": student_id,
-                "subject": subject,
-                "message": message,
-                "sent_at": datetime.now().isoformat(),
-                "read": False
-            }
-            
-            save_data('messages', messages)
+            message_id = send_message(teacher_id, parent_id, student_id, teacher_id, subject, message)
             
             # Add to conversation
-            conversation_messages.append({
-                "id": message_id,
-                "from_id": teacher_id,
-                "to_id": parent_id,
-                "student_id": student_id,
-                "subject": subject,
-                "message": message,
-                "sent_at": datetime.now().isoformat(),
-                "read": False
-            })
+            conversation_messages.append({"id": message_id, **get_item('messages', message_id)})
             
             print("\n✅ Reply sent successfully.")
             input("\nPress Enter to continue...")
@@ -1539,13 +1481,11 @@ def display_announcement_details(announcement: Dict[str, Any]) -> None:
     author_name = "Unknown"
     
     if author_id:
-        users = get_data('users')
-        for username, user in users.items():
-            if user.get("id") == author_id:
-                author_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
-                if not author_name:
-                    author_name = username
-                break
+        user = get_user_by_id(author_id)
+        if user:
+            author_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
+            if not author_name:
+                author_name = user.get("username", "Unknown")
     
     if is_important:
         print(f"🔴 {title} (IMPORTANT)")
@@ -5,7 +5,7 @@ Entry point for the application
 import os
 from getpass import getpass
 from utils.helpers import clear_screen
-from auth import authenticate_user, register_new_user
+from auth import authenticate_user, register_new_user, migrate_credentials
 from utils.constants import USER_ROLES
 from dashboards.admin_dashboard import admin_dashboard
 from dashboards.teacher_dashboard import teacher_dashboard
@@ -29,6 +29,7 @@ def main() -> None:
     """Main function to run the application."""
     # Initialize data store if it doesn't exist
     initialize_data_store()
+    migrate_credentials()
     
     while True:
         display_main_menu()
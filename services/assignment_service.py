@@ -0,0 +1,150 @@
+"""
+Assignment service for the School Management System
+
+Maintains two lookup collections next to assignments and submissions:
+'submission_index' maps "<assignment_id>|<student_id>" to the student's
+submission, and 'course_assignments' keeps each course's assignments as
+[due_date, assignment_id] pairs ordered by due date.
+"""
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, Any, List, Optional, Iterator
+from storage import derived
+from storage.datastore import get_data, save_data, get_item, add_item, update_item, run_transaction
+
+def _submission_key(assignment_id: str, student_id: str) -> str:
+    """Get the 'submission_index' key for a student's submission."""
+    return f"{assignment_id}|{student_id}"
+
+def rebuild_assignment_indexes() -> None:
+    """
+    Recompute 'submission_index' and 'course_assignments' from the
+    assignments and submissions collections.
+    """
+    def rebuild() -> None:
+        # Pin the current lookups, so entries added meanwhile make this retry
+        get_data('submission_index', readonly=True)
+        get_data('course_assignments', readonly=True)
+        
+        submission_index = {derived.MARKER_ID: derived.build_marker(['submissions'])}
+        for submission_id, submission in get_data('submissions', readonly=True).items():
+            key = _submission_key(submission.get("assignment_id"), submission.get("student_id"))
+            submission_index[key] = {
+                "submission_id": submission_id,
+                "status": submission.get("status", "submitted")
+            }
+        
+        course_assignments = {derived.MARKER_ID: derived.build_marker(['assignments'])}
+        for assignment_id, assignment in get_data('assignments', readonly=True).items():
+            entry = course_assignments.setdefault(assignment.get("course_id"), {"assignments": []})
+            entry["assignments"].append([assignment.get("due_date", ""), assignment_id])
+        
+        for course_id, entry in course_assignments.items():
+            if course_id != derived.MARKER_ID:
+                entry["assignments"].sort()
+        
+        save_data('submission_index', submission_index)
+        save_data('course_assignments', course_assignments)
+    
+    run_transaction(rebuild)
+
+def _ensure_indexes() -> None:
+    """Rebuild the lookup collections if their sources changed without updating them."""
+    if (not derived.is_current('submission_index', ['submissions']) or
+            not derived.is_current('course_assignments', ['assignments'])):
+        rebuild_assignment_indexes()
+
+def record_submission(assignment_id: str, student_id: str, submission_id: str,
+                      status: str = "submitted") -> None:
+    """
+    Record a student's submission (or its new status) in the index.
+    
+    Call in the transaction that writes the submission.
+    
+    Args:
+        assignment_id: ID of the assignment
+        student_id: ID of the student
+        submission_id: ID of the submission
+        status: Status of the submission ('submitted' or 'graded')
+    """
+    derived.record_write('submission_index', 'submissions')
+    
+    add_item('submission_index', _submission_key(assignment_id, student_id), {
+        "submission_id": submission_id,
+        "status": status
+    })
+
+def get_submission(assignment_id: str, student_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a student's submission for an assignment.
+    
+    Args:
+        assignment_id: ID of the assignment
+        student_id: ID of the student
+    
+    Returns:
+        Dictionary with submission_id and status if submitted, None otherwise
+    """
+    _ensure_indexes()
+    return get_item('submission_index', _submission_key(assignment_id, student_id))
+
+def add_course_assignment(course_id: str, assignment_id: str, due_date: str) -> None:
+    """
+    Insert an assignment into its course's due-date ordered list.
+    
+    Call in the transaction that writes the assignment.
+    
+    Args:
+        course_id: ID of the course
+        assignment_id: ID of the assignment
+        due_date: Due date of the assignment (YYYY-MM-DD), empty if none
+    """
+    derived.record_write('course_assignments', 'assignments')
+    
+    entry = get_item('course_assignments', course_id)
+    
+    if entry is None:
+        add_item('course_assignments', course_id, {"assignments": [[due_date, assignment_id]]})
+        return
+    
+    ordered = entry.get("assignments", [])
+    
+    # Already listed if the lookup was rebuilt since the assignment was saved
+    if [due_date, assignment_id] in ordered:
+        return
+    
+    insort(ordered, [due_date, assignment_id])
+    update_item('course_assignments', course_id, {"assignments": ordered})
+
+def get_course_assignments(course_id: str, from_date: str = "") -> List[List[str]]:
+    """
+    Get a course's assignments ordered by due date.
+    
+    Args:
+        course_id: ID of the course
+        from_date: Only include assignments due on or after this date (YYYY-MM-DD)
+    
+    Returns:
+        List of [due_date, assignment_id] pairs
+    """
+    _ensure_indexes()
+    
+    entry = get_item('course_assignments', course_id)
+    if entry is None:
+        return []
+    
+    ordered = entry.get("assignments", [])
+    return ordered[bisect_left(ordered, [from_date]):]
+
+def iter_assignments_due(course_ids: List[str], from_date: str) -> Iterator[List[str]]:
+    """
+    Stream the assignments of several courses in due-date order.
+    
+    Args:
+        course_ids: IDs of the courses
+        from_date: Only include assignments due on or after this date (YYYY-MM-DD)
+    
+    Yields:
+        [due_date, assignment_id] pairs
+    """
+    yield from heapq.merge(*(get_course_assignments(course_id, from_date) for course_id in course_ids))
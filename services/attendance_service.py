@@ -1,10 +1,503 @@
 """
 Attendance service for the School Management System
 """
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Tuple, Optional
-from storage.datastore import get_data, save_data
-from utils.constants import ATTENDANCE_STATUS
+import os
+import json
+import uuid
+import heapq
+import threading
+from datetime import datetime, timedelta, date as date_type
+from typing import Dict, Any, List, Tuple, Optional, Iterator, Iterable
+from storage import locks, fileio, derived
+from storage.datastore import (
+    get_data, save_data, get_by_index, get_item, add_item, update_item, get_version,
+    run_transaction, after_commit
+)
+from utils.constants import ATTENDANCE_STATUS, DATA_DIR
+from utils.helpers import get_term_for_date
+
+# 2-bit status codes used by the columnar attendance store
+STATUS_CODES = {
+    ATTENDANCE_STATUS.PRESENT: 0,
+    ATTENDANCE_STATUS.ABSENT: 1,
+    ATTENDANCE_STATUS.LATE: 2,
+    ATTENDANCE_STATUS.EXCUSED: 3
+}
+CODE_STATUSES = {code: status for status, code in STATUS_CODES.items()}
+
+class AttendanceStore:
+    """
+    Columnar attendance engine with one status per (student, course, day).
+    
+    Every (student, course) pair gets a dense row number, recorded in an
+    append-only dimension log (one "student_id<TAB>course_id" line per row).
+    Each calendar year is a file of fixed-size rows: 366 2-bit status codes
+    followed by a 366-bit "marked" bitset, so a single day is updated with
+    a one-byte write and a date range is read as one slice of a row.
+    
+    Writes hold the 'attendance' collection's writer lock, so processes
+    updating bytes of the same row never overwrite each other's bits.
+    
+    A state file records the 'attendance' version the store reflects and
+    an ID for the current build; a rebuild renumbers the rows, so other
+    processes drop their row numbers when the build ID changes.
+    """
+    
+    DAYS = 366
+    CODE_BYTES = DAYS // 4 + 1
+    MARK_BYTES = DAYS // 8 + 1
+    ROW_BYTES = CODE_BYTES + MARK_BYTES
+    
+    def __init__(self, directory: str) -> None:
+        """
+        Initialize the store.
+        
+        Args:
+            directory: Directory holding the dimension log and year files
+        """
+        self.directory = directory
+        self.lock = threading.RLock()
+        self.rows: Dict[Tuple[str, str], int] = {}
+        self.student_rows: Dict[str, List[int]] = {}
+        self.course_rows: Dict[str, List[int]] = {}
+        self.row_pairs: List[Tuple[str, str]] = []
+        self.dims_offset = 0
+        self.build: Optional[str] = None
+    
+    @property
+    def dims_path(self) -> str:
+        """Path of the append-only dimension log."""
+        return os.path.join(self.directory, "dims.log")
+    
+    @property
+    def state_path(self) -> str:
+        """Path of the file holding the build ID and synced version."""
+        return os.path.join(self.directory, "state.json")
+    
+    def year_path(self, year: int) -> str:
+        """
+        Get the path of a year's row file.
+        
+        Args:
+            year: Calendar year
+        
+        Returns:
+            Path of the year file
+        """
+        return os.path.join(self.directory, f"{year}.bin")
+    
+    def _reset(self, build: Optional[str]) -> None:
+        """Forget the row numbers read from the dimension log."""
+        self.build = build
+        self.rows = {}
+        self.student_rows = {}
+        self.course_rows = {}
+        self.row_pairs = []
+        self.dims_offset = 0
+    
+    def synced_version(self) -> Optional[int]:
+        """
+        Get the 'attendance' version the store was last brought up to date with.
+        
+        Returns:
+            Collection version, or None if the store was never built or a
+            rebuild didn't finish
+        """
+        with self.lock:
+            try:
+                with open(self.state_path, 'r') as f:
+                    state = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            
+            if state.get("build") != self.build:
+                self._reset(state.get("build"))
+            
+            return state.get("version")
+    
+    def mark_synced(self, version: int) -> None:
+        """
+        Record that the store reflects a version of the 'attendance' collection.
+        
+        Args:
+            version: Collection version
+        """
+        fileio.write_json_atomic(self.state_path, {"build": self.build, "version": version})
+    
+    def rebuild(self, records: Iterable[Dict[str, Any]], version: int) -> None:
+        """
+        Replace the store's contents with a set of attendance records.
+        
+        Args:
+            records: Every record of the 'attendance' collection
+            version: Collection version the records were read at
+        """
+        with self.lock, locks.locked('attendance', exclusive=True):
+            os.makedirs(self.directory, exist_ok=True)
+            
+            # Without the state file, an interrupted rebuild is redone
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            
+            for name in os.listdir(self.directory):
+                if name == "dims.log" or name.endswith(".bin"):
+                    os.remove(os.path.join(self.directory, name))
+            
+            self._reset(uuid.uuid4().hex)
+            
+            # Lay every year out in memory, then write each file once
+            pairs: Dict[Tuple[str, str], int] = {}
+            year_rows: Dict[int, bytearray] = {}
+            
+            for record in records:
+                course_id = record.get("course_id")
+                day = datetime.strptime(record.get("date"), "%Y-%m-%d").date()
+                index = self._day_of_year(day)
+                
+                for entry in record.get("students", []):
+                    status = entry.get("status")
+                    if status not in STATUS_CODES:
+                        continue
+                    
+                    row = pairs.setdefault((entry.get("student_id"), course_id), len(pairs))
+                    rows = year_rows.setdefault(day.year, bytearray())
+                    if len(rows) < (row + 1) * self.ROW_BYTES:
+                        rows.extend(bytes((row + 1) * self.ROW_BYTES - len(rows)))
+                    
+                    code_at = row * self.ROW_BYTES + index // 4
+                    shift = (index % 4) * 2
+                    rows[code_at] = (rows[code_at] & ~(3 << shift) & 0xFF) | (STATUS_CODES[status] << shift)
+                    rows[row * self.ROW_BYTES + self.CODE_BYTES + index // 8] |= 1 << (index % 8)
+            
+            for year, rows in year_rows.items():
+                fileio.write_bytes_atomic(self.year_path(year), bytes(rows))
+            fileio.write_bytes_atomic(self.dims_path, "".join(
+                f"{student_id}\t{course_id}\n" for student_id, course_id in pairs
+            ).encode("utf-8"))
+            
+            self.mark_synced(version)
+    
+    def _refresh_dims(self) -> None:
+        """Read dimension log lines appended since the last refresh."""
+        try:
+            with open(self.dims_path, 'rb') as f:
+                f.seek(self.dims_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        
+        end = chunk.rfind(b"\n") + 1
+        
+        for line in chunk[:end].decode("utf-8").splitlines():
+            student_id, _, course_id = line.partition("\t")
+            pair = (student_id, course_id)
+            row = len(self.row_pairs)
+            self.row_pairs.append(pair)
+            
+            # Another process may have appended the same pair; first row wins
+            if pair in self.rows:
+                continue
+            
+            self.rows[pair] = row
+            self.student_rows.setdefault(student_id, []).append(row)
+            self.course_rows.setdefault(course_id, []).append(row)
+        
+        self.dims_offset += end
+    
+    def _row_for(self, student_id: str, course_id: str) -> int:
+        """
+        Get the row of a (student, course) pair, allocating it if needed.
+        
+        Args:
+            student_id: ID of the student
+            course_id: ID of the course
+        
+        Returns:
+            Row number
+        """
+        pair = (student_id, course_id)
+        self._refresh_dims()
+        
+        if pair not in self.rows:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.dims_path, 'ab') as f:
+                f.write(f"{student_id}\t{course_id}\n".encode("utf-8"))
+            self._refresh_dims()
+        
+        return self.rows[pair]
+    
+    @staticmethod
+    def _day_of_year(day: date_type) -> int:
+        """Get the zero-based day index of a date within its year."""
+        return day.timetuple().tm_yday - 1
+    
+    def set_status(self, student_id: str, course_id: str, 
+                   date: str, status: Optional[str]) -> None:
+        """
+        Record (or clear) one student's status for a course on a day.
+        
+        Args:
+            student_id: ID of the student
+            course_id: ID of the course
+            date: Date (YYYY-MM-DD)
+            status: Attendance status, or None to clear the day
+        
+        Raises:
+            ValueError: If the status is not an attendance status
+        """
+        if status is not None and status not in STATUS_CODES:
+            raise ValueError(f"Unknown attendance status '{status}'")
+        
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        index = self._day_of_year(day)
+        
+        with self.lock, locks.locked('attendance', exclusive=True):
+            row = self._row_for(student_id, course_id)
+            path = self.year_path(day.year)
+            base = row * self.ROW_BYTES
+            code_at = base + index // 4
+            mark_at = base + self.CODE_BYTES + index // 8
+            
+            # Create the year file if needed, never truncating one another process made
+            os.makedirs(self.directory, exist_ok=True)
+            with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b') as f:
+                f.seek(code_at)
+                code_byte = (f.read(1) or b"\0")[0]
+                f.seek(mark_at)
+                mark_byte = (f.read(1) or b"\0")[0]
+                
+                shift = (index % 4) * 2
+                code_byte &= ~(3 << shift) & 0xFF
+                if status is None:
+                    mark_byte &= ~(1 << (index % 8)) & 0xFF
+                else:
+                    code_byte |= STATUS_CODES[status] << shift
+                    mark_byte |= 1 << (index % 8)
+                
+                f.seek(code_at)
+                f.write(bytes([code_byte]))
+                f.seek(mark_at)
+                f.write(bytes([mark_byte]))
+    
+    def _read_rows(self, rows: List[int], start: date_type, 
+                   end: date_type) -> Iterator[Tuple[int, str, str]]:
+        """
+        Decode the marked days of some rows within a date range.
+        
+        Args:
+            rows: Row numbers to read
+            start: First date (inclusive)
+            end: Last date (inclusive)
+        
+        Yields:
+            Tuples of (row, date, status)
+        """
+        for year in range(start.year, end.year + 1):
+            path = self.year_path(year)
+            if not os.path.exists(path):
+                continue
+            
+            first = self._day_of_year(max(start, date_type(year, 1, 1)))
+            last = self._day_of_year(min(end, date_type(year, 12, 31)))
+            year_start = date_type(year, 1, 1).toordinal()
+            
+            with open(path, 'rb') as f:
+                for row in rows:
+                    f.seek(row * self.ROW_BYTES)
+                    data = f.read(self.ROW_BYTES)
+                    if not data:
+                        continue
+                    
+                    data = data.ljust(self.ROW_BYTES, b"\0")
+                    codes = data[:self.CODE_BYTES]
+                    marks = data[self.CODE_BYTES:]
+                    
+                    # Skip whole bitset bytes with nothing marked
+                    for byte_index in range(first // 8, last // 8 + 1):
+                        mark_byte = marks[byte_index]
+                        if not mark_byte:
+                            continue
+                        
+                        for bit in range(8):
+                            index = byte_index * 8 + bit
+                            if index < first or index > last or not (mark_byte >> bit) & 1:
+                                continue
+                            code = (codes[index // 4] >> ((index % 4) * 2)) & 3
+                            day = date_type.fromordinal(year_start + index)
+                            yield row, day.isoformat(), CODE_STATUSES[code]
+    
+    def _query(self, rows: List[int], start_date: Optional[str], 
+               end_date: Optional[str]) -> List[Dict[str, str]]:
+        """
+        Read attendance entries for rows within an optional date range.
+        
+        Args:
+            rows: Row numbers to read
+            start_date: Optional start date (YYYY-MM-DD)
+            end_date: Optional end date (YYYY-MM-DD)
+        
+        Returns:
+            List of entries with student_id, course_id, date and status
+        """
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+        
+        if start is None or end is None:
+            years = self.years()
+            if not years:
+                return []
+            start = start or date_type(years[0], 1, 1)
+            end = end or date_type(years[-1], 12, 31)
+        
+        entries = []
+        for row, day, status in self._read_rows(rows, start, end):
+            student_id, course_id = self.row_pairs[row]
+            entries.append({
+                "student_id": student_id,
+                "course_id": course_id,
+                "date": day,
+                "status": status
+            })
+        
+        entries.sort(key=lambda x: x["date"])
+        return entries
+    
+    def years(self) -> List[int]:
+        """Get the years that have a row file, in order."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(name[:-4]) for name in os.listdir(self.directory)
+            if name.endswith(".bin") and name[:-4].isdigit()
+        )
+    
+    def student_history(self, student_id: str, start_date: Optional[str] = None,
+                        end_date: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Get one student's attendance across all courses.
+        
+        Args:
+            student_id: ID of the student
+            start_date: Optional start date (YYYY-MM-DD)
+            end_date: Optional end date (YYYY-MM-DD)
+        
+        Returns:
+            List of entries sorted by date
+        """
+        with self.lock, locks.locked('attendance'):
+            self.synced_version()
+            self._refresh_dims()
+            return self._query(self.student_rows.get(student_id, []), start_date, end_date)
+    
+    def course_history(self, course_id: str, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Get every student's attendance for one course.
+        
+        Args:
+            course_id: ID of the course
+            start_date: Optional start date (YYYY-MM-DD)
+            end_date: Optional end date (YYYY-MM-DD)
+        
+        Returns:
+            List of entries sorted by date
+        """
+        with self.lock, locks.locked('attendance'):
+            self.synced_version()
+            self._refresh_dims()
+            return self._query(self.course_rows.get(course_id, []), start_date, end_date)
+    
+    def record_day(self, course_id: str, date: str, 
+                   attendance_data: List[Dict[str, Any]],
+                   previous_data: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Record a class's attendance for one day.
+        
+        Args:
+            course_id: ID of the course
+            date: Date for the attendance (YYYY-MM-DD)
+            attendance_data: List of dictionaries with student_id and status
+            previous_data: Entries previously recorded for that day, if any
+        """
+        with locks.locked('attendance', exclusive=True):
+            marked = set()
+            for entry in attendance_data:
+                student_id = entry.get("student_id")
+                self.set_status(student_id, course_id, date, entry.get("status"))
+                marked.add(student_id)
+            
+            # Students dropped from an updated record no longer have a status
+            for entry in previous_data or []:
+                if entry.get("student_id") not in marked:
+                    self.set_status(entry.get("student_id"), course_id, date, None)
+
+_attendance_store = None
+
+def _store() -> AttendanceStore:
+    """Get the shared store object, whether or not it is up to date."""
+    global _attendance_store
+    
+    if _attendance_store is None:
+        _attendance_store = AttendanceStore(os.path.join(DATA_DIR, "attendance_store"))
+    
+    return _attendance_store
+
+def get_attendance_store() -> AttendanceStore:
+    """
+    Get the shared columnar attendance store.
+    
+    mark_attendance and update_attendance keep the store in step with the
+    'attendance' collection. If the collection changed any other way (e.g.
+    replaced by an import), or a process died between a commit and its
+    store update, the versions differ and the store is rebuilt.
+    
+    Returns:
+        The attendance store
+    """
+    store = _store()
+    
+    version = get_version('attendance')
+    if store.synced_version() != version:
+        records = list(get_data('attendance', readonly=True).values())
+        
+        with locks.locked('attendance', exclusive=True):
+            # Another process may have caught the store up while we waited
+            if store.synced_version() != get_version('attendance'):
+                store.rebuild(records, version)
+    
+    return store
+
+def _record_day_in_store(course_id: str, date: str,
+                         attendance_data: List[Dict[str, Any]],
+                         previous_data: Optional[List[Dict[str, Any]]] = None) -> None:
+    """
+    Apply a committed attendance record to the columnar store.
+    
+    Runs after the commit, while it still holds the 'attendance' writer lock.
+    
+    Args:
+        course_id: ID of the course
+        date: Date for the attendance (YYYY-MM-DD)
+        attendance_data: List of dictionaries with student_id and status
+        previous_data: Entries previously recorded for that day, if any
+    """
+    store = _store()
+    version = get_version('attendance')
+    
+    # A commit bumps the version by one, so a store that was current before
+    # it is one behind; one further behind missed a write and is rebuilt
+    if store.synced_version() == version - 1:
+        store.record_day(course_id, date, attendance_data, previous_data)
+        store.mark_synced(version)
+    else:
+        store.rebuild(get_data('attendance', readonly=True).values(), version)
+
+def _unknown_statuses(attendance_data: List[Dict[str, Any]]) -> List[str]:
+    """Get the statuses of a class list that aren't attendance statuses."""
+    return sorted({
+        str(entry.get("status")) for entry in attendance_data
+        if entry.get("status") not in STATUS_CODES
+    })
 
 def mark_attendance(teacher_id: str, course_id: str, date: str, 
                    attendance_data: List[Dict[str, Any]]) -> Tuple[bool, str]:
@@ -21,33 +514,45 @@ def mark_attendance(teacher_id: str, course_id: str, date: str,
         Tuple of (success, message)
     """
     # Validate course and teacher
-    courses = get_data('courses')
-    if course_id not in courses:
+    course = get_item('courses', course_id)
+    if course is None:
         return False, f"❌ Course with ID '{course_id}' not found."
     
-    if courses[course_id].get("teacher_id") != teacher_id:
+    if course.get("teacher_id") != teacher_id:
         return False, f"❌ You are not authorized to mark attendance for this course."
     
-    # Get attendance data
-    attendance = get_data('attendance')
+    unknown = _unknown_statuses(attendance_data)
+    if unknown:
+        return False, f"❌ Unknown attendance status: {', '.join(unknown)}."
     
     # Create unique key for this attendance record
     attendance_key = f"{course_id}_{date}"
     
-    # Check if attendance already marked for this date
-    if attendance_key in attendance:
-        return False, f"❌ Attendance for this course on {date} has already been marked."
+    def record() -> bool:
+        # Check if attendance already marked for this date
+        if get_item('attendance', attendance_key) is not None:
+            return False
+        
+        # Create attendance record
+        add_item('attendance', attendance_key, {
+            "course_id": course_id,
+            "date": date,
+            "marked_by": teacher_id,
+            "marked_at": datetime.now().isoformat(),
+            "students": attendance_data
+        })
+        _update_attendance_stats(course_id, date, attendance_data)
+        
+        # Only the attempt that commits writes the columnar store
+        after_commit(lambda: _record_day_in_store(course_id, date, attendance_data))
+        return True
     
-    # Create attendance record
-    attendance[attendance_key] = {
-        "course_id": course_id,
-        "date": date,
-        "marked_by": teacher_id,
-        "marked_at": datetime.now().isoformat(),
-        "students": attendance_data
-    }
+    _ensure_attendance_stats()
     
-    save_data('attendance', attendance)
+    # Commits as journal records for the touched items only; another
+    # teacher's concurrent write to the same rollups retries this one
+    if not run_transaction(record):
+        return False, f"❌ Attendance for this course on {date} has already been marked."
     
     return True, f"✅ Attendance marked successfully for {date}."
 
@@ -66,29 +571,44 @@ def update_attendance(teacher_id: str, course_id: str, date: str,
         Tuple of (success, message)
     """
     # Validate course and teacher
-    courses = get_data('courses')
-    if course_id not in courses:
+    course = get_item('courses', course_id)
+    if course is None:
         return False, f"❌ Course with ID '{course_id}' not found."
     
-    if courses[course_id].get("teacher_id") != teacher_id:
+    if course.get("teacher_id") != teacher_id:
         return False, f"❌ You are not authorized to update attendance for this course."
     
-    # Get attendance data
-    attendance = get_data('attendance')
+    unknown = _unknown_statuses(attendance_data)
+    if unknown:
+        return False, f"❌ Unknown attendance status: {', '.join(unknown)}."
     
     # Create unique key for this attendance record
     attendance_key = f"{course_id}_{date}"
     
-    # Check if attendance exists for this date
-    if attendance_key not in attendance:
-        return False, f"❌ No attendance record found for this course on {date}."
+    def record() -> Optional[List[Dict[str, Any]]]:
+        # Check if attendance exists for this date
+        existing = get_item('attendance', attendance_key)
+        if existing is None:
+            return None
+        
+        # Update attendance record
+        previous_data = existing.get("students", [])
+        update_item('attendance', attendance_key, {
+            "students": attendance_data,
+            "updated_by": teacher_id,
+            "updated_at": datetime.now().isoformat()
+        })
+        _update_attendance_stats(course_id, date, attendance_data, previous_data)
+        
+        # Only the attempt that commits writes the columnar store
+        after_commit(lambda: _record_day_in_store(course_id, date, attendance_data, previous_data))
+        return previous_data
     
-    # Update attendance record
-    attendance[attendance_key]["students"] = attendance_data
-    attendance[attendance_key]["updated_by"] = teacher_id
-    attendance[attendance_key]["updated_at"] = datetime.now().isoformat()
+    _ensure_attendance_stats()
     
-    save_data('attendance', attendance)
+    previous_data = run_transaction(record)
+    if previous_data is None:
+        return False, f"❌ No attendance record found for this course on {date}."
     
     return True, f"✅ Attendance updated successfully for {date}."
 
@@ -103,10 +623,7 @@ def get_attendance_by_date(course_id: str, date: str) -> Optional[Dict[str, Any]
     Returns:
         Attendance record if found, None otherwise
     """
-    attendance = get_data('attendance')
-    attendance_key = f"{course_id}_{date}"
-    
-    return attendance.get(attendance_key)
+    return get_item('attendance', f"{course_id}_{date}")
 
 def get_student_attendance(student_id: str, 
                           start_date: Optional[str] = None, 
@@ -122,38 +639,24 @@ def get_student_attendance(student_id: str,
     Returns:
         List of attendance records for the student
     """
-    attendance = get_data('attendance')
+    courses = get_data('courses', readonly=True)
     
     student_attendance = []
     
-    for attendance_key, record in attendance.items():
-        # Check if student is in this attendance record
-        for student_record in record.get("students", []):
-            if student_record.get("student_id") == student_id:
-                # Filter by date if provided
-                if start_date and record.get("date") < start_date:
-                    continue
-                
-                if end_date and record.get("date") > end_date:
-                    continue
-                
-                # Add course name to the record
-                courses = get_data('courses')
-                course_id = record.get("course_id")
-                course_name = "Unknown"
-                
-                if course_id in courses:
-                    course_name = courses[course_id].get("name", "Unknown")
-                
-                student_attendance.append({
-                    "date": record.get("date"),
-                    "course_id": course_id,
-                    "course_name": course_name,
-                    "status": student_record.get("status")
-                })
-                
-                # Break inner loop since we found this student
-                break
+    for entry in get_attendance_store().student_history(student_id, start_date, end_date):
+        # Add course name to the record
+        course_id = entry["course_id"]
+        course_name = "Unknown"
+        
+        if course_id in courses:
+            course_name = courses[course_id].get("name", "Unknown")
+        
+        student_attendance.append({
+            "date": entry["date"],
+            "course_id": course_id,
+            "course_name": course_name,
+            "status": entry["status"]
+        })
     
     # Sort by date
     student_attendance.sort(key=lambda x: x.get("date", ""))
@@ -174,32 +677,35 @@ def get_course_attendance(course_id: str,
     Returns:
         List of attendance records for the course
     """
-    attendance = get_data('attendance')
+    attendance = get_by_index('attendance', 'course_id', course_id)
     
     course_attendance = []
     
     for attendance_key, record in attendance.items():
-        if record.get("course_id") == course_id:
-            # Filter by date if provided
-            if start_date and record.get("date") < start_date:
-                continue
-            
-            if end_date and record.get("date") > end_date:
-                continue
-            
-            course_attendance.append(record)
+        # Filter by date if provided
+        if start_date and record.get("date") < start_date:
+            continue
+        
+        if end_date and record.get("date") > end_date:
+            continue
+        
+        course_attendance.append(record)
     
     # Sort by date
     course_attendance.sort(key=lambda x: x.get("date", ""))
     
     return course_attendance
 
-def generate_attendance_report(course_id: Optional[str] = None, 
-                             student_id: Optional[str] = None,
-                             start_date: Optional[str] = None, 
-                             end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+def iter_attendance_report(course_id: Optional[str] = None, 
+                           student_id: Optional[str] = None,
+                           start_date: Optional[str] = None, 
+                           end_date: Optional[str] = None) -> Iterator[Dict[str, Any]]:
     """
-    Generate an attendance report.
+    Stream attendance report rows sorted by date and student name.
+    
+    Course and student names are loaded once up front. Rows are produced
+    one date at a time by merging that date's class lists, so memory is
+    bounded by the busiest day rather than by the whole report.
     
     Args:
         course_id: Optional ID of the course to filter by
@@ -207,11 +713,9 @@ def generate_attendance_report(course_id: Optional[str] = None,
         start_date: Optional start date (YYYY-MM-DD)
         end_date: Optional end date (YYYY-MM-DD)
     
-    Returns:
-        List of attendance records for the report
+    Yields:
+        Report rows with date, course, student and status
     """
-    attendance = get_data('attendance')
-    
     # If no start_date provided, use 30 days ago
     if not start_date:
         start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
@@ -220,84 +724,232 @@ def generate_attendance_report(course_id: Optional[str] = None,
     if not end_date:
         end_date = datetime.now().strftime("%Y-%m-%d")
     
-    report_records = []
+    # Dimension tables, loaded once for the whole report
+    courses = get_data('courses', readonly=True)
+    students = get_data('students', readonly=True)
+    
+    def course_name(record_course_id: str) -> str:
+        """Look up a course's display name."""
+        if record_course_id in courses:
+            return courses[record_course_id].get("name", "Unknown")
+        return "Unknown"
+    
+    def student_name(record_student_id: str) -> str:
+        """Look up a student's display name."""
+        if record_student_id in students:
+            first_name = students[record_student_id].get("first_name", "")
+            last_name = students[record_student_id].get("last_name", "")
+            return f"{first_name} {last_name}".strip()
+        return "Unknown"
+    
+    if student_id:
+        # One student's rows come straight from the columnar store
+        name = student_name(student_id)
+        
+        for entry in get_attendance_store().student_history(student_id, start_date, end_date):
+            if course_id and entry["course_id"] != course_id:
+                continue
+            
+            yield {
+                "date": entry["date"],
+                "course_id": entry["course_id"],
+                "course_name": course_name(entry["course_id"]),
+                "student_id": student_id,
+                "student_name": name,
+                "status": entry["status"]
+            }
+        return
+    
+    if course_id:
+        attendance = get_by_index('attendance', 'course_id', course_id)
+    else:
+        attendance = get_data('attendance', readonly=True)
     
+    # Order record keys by date without touching the per-student lists
+    keys_by_date = {}
     for attendance_key, record in attendance.items():
-        # Filter by date
-        if record.get("date") < start_date or record.get("date") > end_date:
+        record_date = record.get("date") or ""
+        if record_date < start_date or record_date > end_date:
             continue
+        keys_by_date.setdefault(record_date, []).append(attendance_key)
+    
+    for record_date in sorted(keys_by_date):
+        class_lists = []
         
-        # Filter by course if provided
-        if course_id and record.get("course_id") != course_id:
-            continue
+        for attendance_key in keys_by_date[record_date]:
+            record = attendance[attendance_key]
+            record_course_id = record.get("course_id")
+            record_course_name = course_name(record_course_id)
+            
+            rows = [
+                {
+                    "date": record_date,
+                    "course_id": record_course_id,
+                    "course_name": record_course_name,
+                    "student_id": student_record.get("student_id"),
+                    "student_name": student_name(student_record.get("student_id")),
+                    "status": student_record.get("status")
+                }
+                for student_record in record.get("students", [])
+            ]
+            rows.sort(key=lambda x: x["student_name"])
+            class_lists.append(rows)
         
-        # Process each student in the attendance record
-        for student_record in record.get("students", []):
-            # Filter by student if provided
-            if student_id and student_record.get("student_id") != student_id:
+        yield from heapq.merge(*class_lists, key=lambda x: x["student_name"])
+
+def generate_attendance_report(course_id: Optional[str] = None, 
+                             student_id: Optional[str] = None,
+                             start_date: Optional[str] = None, 
+                             end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Generate an attendance report.
+    
+    Args:
+        course_id: Optional ID of the course to filter by
+        student_id: Optional ID of the student to filter by
+        start_date: Optional start date (YYYY-MM-DD)
+        end_date: Optional end date (YYYY-MM-DD)
+    
+    Returns:
+        List of attendance records for the report
+    """
+    return list(iter_attendance_report(course_id, student_id, start_date, end_date))
+
+def _stats_keys(student_id: str, course_id: str, date: str) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Get the rollup entries an attendance mark counts towards.
+    
+    Args:
+        student_id: ID of the student
+        course_id: ID of the course
+        date: Date of the mark (YYYY-MM-DD)
+    
+    Returns:
+        List of (stats_id, identifying fields) for the course and term rollups
+    """
+    term = get_term_for_date(date)
+    return [
+        (f"{student_id}|course|{course_id}", {"student_id": student_id, "course_id": course_id}),
+        (f"{student_id}|term|{term}", {"student_id": student_id, "term": term})
+    ]
+
+def _update_attendance_stats(course_id: str, date: str, 
+                             attendance_data: List[Dict[str, Any]],
+                             previous_data: Optional[List[Dict[str, Any]]] = None) -> None:
+    """
+    Apply the counter deltas of a marked or updated day to the rollups.
+    
+    Call in the transaction that writes the day's attendance record.
+    
+    Args:
+        course_id: ID of the course
+        date: Date for the attendance (YYYY-MM-DD)
+        attendance_data: New list of dictionaries with student_id and status
+        previous_data: Entries previously recorded for that day, if any
+    """
+    derived.record_write('attendance_stats', 'attendance')
+    
+    deltas = {}
+    fields = {}
+    
+    for entries, sign in ((previous_data or [], -1), (attendance_data, 1)):
+        for entry in entries:
+            status = entry.get("status")
+            if status not in STATUS_CODES:
                 continue
             
-            # Get course and student names
-            courses = get_data('courses')
-            students = get_data('students')
-            
+            for stats_id, identity in _stats_keys(entry.get("student_id"), course_id, date):
+                counts = deltas.setdefault(stats_id, {})
+                counts[status] = counts.get(status, 0) + sign
+                fields[stats_id] = identity
+    
+    for stats_id, counts in deltas.items():
+        counts = {status: delta for status, delta in counts.items() if delta}
+        if not counts:
+            continue
+        
+        current = get_item('attendance_stats', stats_id)
+        
+        if current is None:
+            add_item('attendance_stats', stats_id, {
+                **fields[stats_id],
+                **{status: max(counts.get(status, 0), 0) for status in STATUS_CODES}
+            })
+        else:
+            update_item('attendance_stats', stats_id, {
+                status: max(current.get(status, 0) + delta, 0)
+                for status, delta in counts.items()
+            })
+
+def rebuild_attendance_stats() -> None:
+    """
+    Recompute every attendance rollup from the attendance collection.
+    """
+    def rebuild() -> None:
+        # Pin the current rollups, so marks committed meanwhile make this retry
+        get_data('attendance_stats', readonly=True)
+        
+        counters = {derived.MARKER_ID: derived.build_marker(['attendance'])}
+        
+        for record in get_data('attendance', readonly=True).values():
             course_id = record.get("course_id")
-            student_id = student_record.get("student_id")
+            date = record.get("date")
             
-            course_name = "Unknown"
-            student_name = "Unknown"
-            
-            if course_id in courses:
-                course_name = courses[course_id].get("name", "Unknown")
-            
-            if student_id in students:
-                first_name = students[student_id].get("first_name", "")
-                last_name = students[student_id].get("last_name", "")
-                student_name = f"{first_name} {last_name}".strip()
-            
-            # Add to report
-            report_records.append({
-                "date": record.get("date"),
-                "course_id": course_id,
-                "course_name": course_name,
-                "student_id": student_id,
-                "student_name": student_name,
-                "status": student_record.get("status")
-            })
-    
-    # Sort by date and student name
-    report_records.sort(key=lambda x: (x.get("date", ""), x.get("student_name", "")))
+            for entry in record.get("students", []):
+                status = entry.get("status")
+                if status not in STATUS_CODES:
+                    continue
+                
+                for stats_id, identity in _stats_keys(entry.get("student_id"), course_id, date):
+                    if stats_id not in counters:
+                        counters[stats_id] = {**identity, **{s: 0 for s in STATUS_CODES}}
+                    counters[stats_id][status] += 1
+        
+        save_data('attendance_stats', counters)
     
-    return report_records
+    run_transaction(rebuild)
+
+def _ensure_attendance_stats() -> None:
+    """Rebuild the rollups if attendance changed without updating them."""
+    if not derived.is_current('attendance_stats', ['attendance']):
+        rebuild_attendance_stats()
 
 def calculate_attendance_stats(student_id: str, 
-                              course_id: Optional[str] = None) -> Dict[str, Any]:
+                              course_id: Optional[str] = None,
+                              term: Optional[str] = None) -> Dict[str, Any]:
     """
     Calculate attendance statistics for a student.
     
+    Reads the per-(student, course) and per-(student, term) rollups that
+    mark_attendance and update_attendance keep current, instead of
+    rebuilding the student's history.
+    
     Args:
         student_id: ID of the student
         course_id: Optional ID of the course to filter by
+        term: Optional term to filter by (e.g., 'Fall 2023')
     
     Returns:
         Dictionary with attendance statistics
     """
-    # Get student attendance records
-    attendance_records = get_student_attendance(student_id)
+    _ensure_attendance_stats()
     
-    # Filter by course if provided
     if course_id:
-        attendance_records = [
-            record for record in attendance_records 
-            if record.get("course_id") == course_id
+        rollups = [get_item('attendance_stats', f"{student_id}|course|{course_id}") or {}]
+    elif term:
+        rollups = [get_item('attendance_stats', f"{student_id}|term|{term}") or {}]
+    else:
+        rollups = [
+            rollup for rollup in get_by_index('attendance_stats', 'student_id', student_id).values()
+            if "course_id" in rollup
         ]
     
     # Initialize stats
-    total_days = len(attendance_records)
-    present_days = sum(1 for record in attendance_records if record.get("status") == ATTENDANCE_STATUS.PRESENT)
-    absent_days = sum(1 for record in attendance_records if record.get("status") == ATTENDANCE_STATUS.ABSENT)
-    late_days = sum(1 for record in attendance_records if record.get("status") == ATTENDANCE_STATUS.LATE)
-    excused_days = sum(1 for record in attendance_records if record.get("status") == ATTENDANCE_STATUS.EXCUSED)
+    present_days = sum(rollup.get(ATTENDANCE_STATUS.PRESENT, 0) for rollup in rollups)
+    absent_days = sum(rollup.get(ATTENDANCE_STATUS.ABSENT, 0) for rollup in rollups)
+    late_days = sum(rollup.get(ATTENDANCE_STATUS.LATE, 0) for rollup in rollups)
+    excused_days = sum(rollup.get(ATTENDANCE_STATUS.EXCUSED, 0) for rollup in rollups)
+    total_days = present_days + absent_days + late_days + excused_days
     
     # Calculate percentages
     present_percentage = (present_days / total_days * 100) if total_days > 0 else 0
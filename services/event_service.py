@@ -1,9 +1,221 @@
 """
 Event service for the School Management System
 """
+import heapq
+import threading
+from bisect import bisect_left
 from datetime import datetime
-from typing import Dict, Any, List, Tuple, Optional
-from storage.datastore import get_data, save_data, add_item
+from itertools import islice
+from typing import Dict, Any, List, Tuple, Optional, Iterator
+from storage.datastore import get_data, save_data, get_item, add_item, update_item, run_transaction
+from storage.sequences import next_id
+
+# Partition holding events every role can see
+ALL_ROLES = "all"
+
+def _to_minutes(date_str: str, time_str: str) -> Optional[int]:
+    """
+    Convert an event date and time to minutes since 0001-01-01.
+    
+    Args:
+        date_str: Date (YYYY-MM-DD)
+        time_str: Time (HH:MM), midnight if empty
+    
+    Returns:
+        Minutes, or None if the date or time is invalid
+    """
+    try:
+        moment = datetime.strptime(f"{date_str} {time_str or '00:00'}", "%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return None
+    return moment.toordinal() * 1440 + moment.hour * 60 + moment.minute
+
+def _location_key(location: str) -> str:
+    """Normalize a location so 'Room 1' and ' room 1 ' are the same place."""
+    return " ".join((location or "").lower().split())
+
+class EventCalendar:
+    """
+    Sorted interval index over the active (not cancelled) events.
+    
+    Events are kept as (start, end, event_id) tuples sorted by start, in
+    minutes. They are partitioned twice: by visibility role (with ALL_ROLES
+    for events everyone can see) for upcoming-event queries, and by
+    location for conflict detection. Each partition remembers its longest
+    event, so an overlap query only walks back that far from its end.
+    """
+    
+    def __init__(self, events: Dict[str, Dict[str, Any]]):
+        """
+        Build the calendar from the events collection.
+        
+        Args:
+            events: The events collection
+        """
+        self.events = events
+        self.by_role = {}
+        self.by_location = {}
+        
+        for event_id, event in events.items():
+            if event.get("is_cancelled", False):
+                continue
+            
+            start = _to_minutes(event.get("start_date", ""), event.get("start_time", ""))
+            if start is None:
+                continue
+            end = _to_minutes(event.get("end_date", ""), event.get("end_time", ""))
+            entry = (start, max(end if end is not None else start, start), event_id)
+            
+            visibility = event.get("visibility", [])
+            if not visibility or ALL_ROLES in visibility:
+                self.by_role.setdefault(ALL_ROLES, []).append(entry)
+            else:
+                for role in set(visibility):
+                    self.by_role.setdefault(role, []).append(entry)
+            
+            location = _location_key(event.get("location", ""))
+            if location:
+                self.by_location.setdefault(location, []).append(entry)
+        
+        self.by_role = {role: self._partition(entries) for role, entries in self.by_role.items()}
+        self.by_location = {loc: self._partition(entries) for loc, entries in self.by_location.items()}
+    
+    @staticmethod
+    def _partition(entries: List[tuple]) -> Tuple[List[tuple], int]:
+        """Sort a partition by start and find its longest event."""
+        entries.sort()
+        return entries, max((end - start for start, end, _ in entries), default=0)
+    
+    def _overlapping(self, partition: Optional[Tuple[List[tuple], int]],
+                     start: int, end: int) -> Iterator[tuple]:
+        """
+        Find the entries of a partition overlapping [start, end).
+        
+        An event starting at least `longest` minutes before `start` has
+        already ended, so only entries from there up to `end` are checked.
+        """
+        if partition is None:
+            return
+        
+        entries, longest = partition
+        first = bisect_left(entries, (start - longest,))
+        last = bisect_left(entries, (end,))
+        
+        for entry in entries[first:last]:
+            if entry[1] > start or entry[0] == start:
+                yield entry
+    
+    def _with_id(self, event_id: str) -> Dict[str, Any]:
+        """Get an event with its ID included."""
+        return {**self.events[event_id], "id": event_id}
+    
+    def upcoming(self, role: Optional[str], from_date: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Get the next events visible to a role, starting on or after a date.
+        
+        Args:
+            role: Role to get events for (None for events visible to everyone)
+            from_date: First date to include (YYYY-MM-DD)
+            limit: Maximum number of events to return
+        
+        Returns:
+            List of event dictionaries ordered by start
+        """
+        start = _to_minutes(from_date, "00:00")
+        partitions = [self.by_role.get(ALL_ROLES, ([], 0))[0]]
+        if role is not None and role != ALL_ROLES:
+            partitions.append(self.by_role.get(role, ([], 0))[0])
+        
+        streams = [entries[bisect_left(entries, (start,)):] for entries in partitions]
+        
+        return [self._with_id(event_id) for _, _, event_id in islice(heapq.merge(*streams), limit)]
+    
+    def between(self, start_date: str, end_date: str,
+                role: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the events overlapping a date range.
+        
+        Args:
+            start_date: First date of the range (YYYY-MM-DD)
+            end_date: Last date of the range, inclusive (YYYY-MM-DD)
+            role: Only include events visible to this role (None for all events)
+        
+        Returns:
+            List of event dictionaries ordered by start
+        """
+        start = _to_minutes(start_date, "00:00")
+        end = _to_minutes(end_date, "00:00") + 1440
+        
+        if role is None:
+            roles = list(self.by_role)
+        else:
+            roles = [ALL_ROLES, role]
+        
+        found = {}
+        for partition_role in roles:
+            for entry in self._overlapping(self.by_role.get(partition_role), start, end):
+                found[entry[2]] = entry
+        
+        return [self._with_id(event_id) for _, _, event_id in sorted(found.values())]
+    
+    def conflicts(self, location: str, start_date: str, start_time: str,
+                  end_date: str, end_time: str,
+                  exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the active events booked at a location during a time span.
+        
+        Args:
+            location: Location to check
+            start_date: Start date (YYYY-MM-DD)
+            start_time: Start time (HH:MM)
+            end_date: End date (YYYY-MM-DD)
+            end_time: End time (HH:MM)
+            exclude_id: ID of an event to ignore (the one being updated)
+        
+        Returns:
+            List of conflicting event dictionaries ordered by start
+        """
+        start = _to_minutes(start_date, start_time)
+        end = _to_minutes(end_date, end_time)
+        if start is None or end is None:
+            return []
+        
+        return [
+            self._with_id(event_id)
+            for _, _, event_id in self._overlapping(
+                self.by_location.get(_location_key(location)), start, max(end, start + 1)
+            )
+            if event_id != exclude_id
+        ]
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+def get_event_calendar() -> EventCalendar:
+    """
+    Get the calendar for the current events collection.
+    
+    The calendar is rebuilt only when the collection changed: the data
+    store hands out a new object for every new version of a collection.
+    
+    Returns:
+        EventCalendar over the current events
+    """
+    global _calendar
+    
+    events = get_data('events', readonly=True)
+    
+    with _calendar_lock:
+        if _calendar is None or _calendar.events is not events:
+            _calendar = EventCalendar(events)
+        return _calendar
+
+def _conflict_message(location: str, conflicts: List[Dict[str, Any]]) -> str:
+    """Describe the first event already booked at a location."""
+    other = conflicts[0]
+    return (f"❌ {location.strip()} is already booked for '{other.get('title', '')}' "
+            f"({other.get('start_date', '')} {other.get('start_time', '')} - "
+            f"{other.get('end_date', '')} {other.get('end_time', '')}).")
 
 def create_event(username: str, title: str, description: str, event_type: str,
                  start_date: str, start_time: str, end_date: str, end_time: str,
@@ -44,28 +256,36 @@ def create_event(username: str, title: str, description: str, event_type: str,
     except ValueError:
         return False, "❌ Invalid time format. Use HH:MM."
     
-    # Create event
-    events = get_data('events')
-    event_id = f"EVT{len(events) + 1:04d}"
-    
-    events[event_id] = {
-        "title": title,
-        "description": description,
-        "event_type": event_type,
-        "start_date": start_date,
-        "start_time": start_time,
-        "end_date": end_date,
-        "end_time": end_time,
-        "location": location,
-        "visibility": visibility,
-        "created_at": datetime.now().isoformat(),
-        "created_by": username,
-        "is_cancelled": False
-    }
+    event_id = next_id("EVT")
     
-    save_data('events', events)
+    def create() -> Tuple[bool, str]:
+        # Check the location isn't already booked
+        if location:
+            conflicts = get_event_calendar().conflicts(location, start_date, start_time, end_date, end_time)
+            if conflicts:
+                return False, _conflict_message(location, conflicts)
+        
+        # Create event
+        add_item('events', event_id, {
+            "title": title,
+            "description": description,
+            "event_type": event_type,
+            "start_date": start_date,
+            "start_time": start_time,
+            "end_date": end_date,
+            "end_time": end_time,
+            "location": location,
+            "visibility": visibility,
+            "created_at": datetime.now().isoformat(),
+            "created_by": username,
+            "is_cancelled": False
+        })
+        
+        return True, "✅ Event created successfully."
     
-    return True, "✅ Event created successfully."
+    # Bookings run one at a time, as the only writer, so two events can't
+    # both pass the check for the same slot
+    return run_transaction(create, retries=0)
 
 def list_events(filter_func=None) -> List[Dict[str, Any]]:
     """
@@ -118,19 +338,35 @@ def update_event(event_id: str, update_data: Dict[str, Any], username: str) -> T
     Returns:
         Tuple of (success, message)
     """
-    events = get_data('events')
-    
-    if event_id not in events:
-        return False, "❌ Event not found."
-    
-    # Update the event
-    events[event_id].update(update_data)
-    events[event_id]["modified_at"] = datetime.now().isoformat()
-    events[event_id]["modified_by"] = username
-    
-    save_data('events', events)
+    def update() -> Tuple[bool, str]:
+        event = get_item('events', event_id)
+        
+        if event is None:
+            return False, "❌ Event not found."
+        
+        # Check the (possibly moved) event doesn't clash at its location
+        updated = {**event, **update_data}
+        if updated.get("location") and not updated.get("is_cancelled", False):
+            conflicts = get_event_calendar().conflicts(
+                updated["location"],
+                updated.get("start_date", ""), updated.get("start_time", ""),
+                updated.get("end_date", ""), updated.get("end_time", ""),
+                exclude_id=event_id
+            )
+            if conflicts:
+                return False, _conflict_message(updated["location"], conflicts)
+        
+        # Update the event
+        update_item('events', event_id, {
+            **update_data,
+            "modified_at": datetime.now().isoformat(),
+            "modified_by": username
+        })
+        
+        return True, "✅ Event updated successfully."
     
-    return True, "✅ Event updated successfully."
+    # One at a time, like create_event()
+    return run_transaction(update, retries=0)
 
 def cancel_event(event_id: str, username: str) -> Tuple[bool, str]:
     """
@@ -170,22 +406,19 @@ def get_upcoming_events(role: str = None, limit: int = 5) -> List[Dict[str, Any]
     """
     today = datetime.now().strftime("%Y-%m-%d")
     
-    def filter_func(event):
-        # Check if event is in the future
-        if event.get("start_date", "") < today:
-            return False
-        
-        # Check if event is visible to the role
-        visibility = event.get("visibility", [])
-        if not visibility or "all" in visibility:
-            return True
-        
-        return role in visibility
-    
-    events = list_events(filter_func)
+    return get_event_calendar().upcoming(role, today, limit)
+
+def get_events_between(start_date: str, end_date: str, 
+                       role: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get the active events overlapping a date range.
     
-    # Sort by start date
-    events.sort(key=lambda x: (x.get("start_date", ""), x.get("start_time", "")))
+    Args:
+        start_date: First date of the range (YYYY-MM-DD)
+        end_date: Last date of the range, inclusive (YYYY-MM-DD)
+        role: Optional role the events must be visible to
     
-    # Return limited number of events
-    return events[:limit]
\ No newline at end of file
+    Returns:
+        List of event dictionaries ordered by start
+    """
+    return get_event_calendar().between(start_date, end_date, role)
\ No newline at end of file
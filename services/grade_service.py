@@ -0,0 +1,577 @@
+"""
+Grade service for the School Management System
+
+Maintains the 'gradebook' collection: one aggregate per (student, course)
+with the running sum of percentages, the grade count, weighted points and
+the latest grade, so averages are read without touching raw grade rows.
+GradeAnalytics computes class-wide reports over all grades at once.
+"""
+import csv
+import statistics
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+from storage.datastore import get_data, save_data, get_item, add_item, get_by_index, run_transaction
+from storage.sequences import reserve_ids
+from storage import derived
+from utils.constants import GRADE_POINTS
+from utils.helpers import (
+    GRADE_LETTERS, GRADE_FLOORS, calculate_grade_letter, calculate_grade_letters, grade_band,
+    get_term_for_date
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def _gradebook_key(student_id: str, course_id: str) -> str:
+    """Get the 'gradebook' key for a student's course."""
+    return f"{student_id}|{course_id}"
+
+def _empty_entry(student_id: str, course_id: str) -> Dict[str, Any]:
+    """Get a gradebook entry with no grades counted yet."""
+    return {
+        "student_id": student_id,
+        "course_id": course_id,
+        "percentage_sum": 0,
+        "count": 0,
+        "points": 0,
+        "max_points": 0,
+        "average_percentage": 0,
+        "average_letter": "N/A",
+        "latest_grade_id": None,
+        "latest_graded_at": "",
+        "latest_percentage": None,
+        "latest_letter": None
+    }
+
+def _add_grade(entry: Dict[str, Any], grade_id: str, grade: Dict[str, Any]) -> None:
+    """Fold one grade into a gradebook entry in place."""
+    percentage = grade.get("percentage", 0)
+    
+    entry["percentage_sum"] += percentage
+    entry["count"] += 1
+    entry["points"] += grade.get("points", 0)
+    entry["max_points"] += grade.get("max_points", 0)
+    entry["average_percentage"] = entry["percentage_sum"] / entry["count"]
+    entry["average_letter"] = calculate_grade_letter(entry["average_percentage"])
+    
+    graded_at = grade.get("graded_at", "")
+    if entry["latest_grade_id"] is None or graded_at >= entry["latest_graded_at"]:
+        entry["latest_grade_id"] = grade_id
+        entry["latest_graded_at"] = graded_at
+        entry["latest_percentage"] = percentage
+        entry["latest_letter"] = grade.get("letter_grade")
+
+def record_grades(new_grades: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Add newly written grades to the gradebook.
+    
+    Call in the transaction that writes the grades.
+    
+    Args:
+        new_grades: Dictionary of grade_id -> grade data just saved
+    """
+    derived.record_write('gradebook', 'grades')
+    
+    entries = {}
+    
+    for grade_id, grade in new_grades.items():
+        key = _gradebook_key(grade.get("student_id"), grade.get("course_id"))
+        
+        if key not in entries:
+            entries[key] = (get_item('gradebook', key) or
+                            _empty_entry(grade.get("student_id"), grade.get("course_id")))
+        
+        _add_grade(entries[key], grade_id, grade)
+    
+    for key, entry in entries.items():
+        add_item('gradebook', key, entry)
+
+def rebuild_gradebook() -> None:
+    """
+    Recompute every gradebook entry from the grades collection.
+    """
+    def rebuild() -> None:
+        # Pin the current gradebook, so grades recorded meanwhile make this retry
+        get_data('gradebook', readonly=True)
+        
+        gradebook = {derived.MARKER_ID: derived.build_marker(['grades'])}
+        
+        for grade_id, grade in get_data('grades', readonly=True).items():
+            key = _gradebook_key(grade.get("student_id"), grade.get("course_id"))
+            
+            if key not in gradebook:
+                gradebook[key] = _empty_entry(grade.get("student_id"), grade.get("course_id"))
+            
+            _add_grade(gradebook[key], grade_id, grade)
+        
+        save_data('gradebook', gradebook)
+    
+    run_transaction(rebuild)
+
+def _ensure_gradebook() -> None:
+    """Rebuild the gradebook if grades changed without updating it."""
+    if not derived.is_current('gradebook', ['grades']):
+        rebuild_gradebook()
+
+def get_student_gradebook(student_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Get all of a student's gradebook entries.
+    
+    Args:
+        student_id: ID of the student
+    
+    Returns:
+        Dictionary of course_id -> gradebook entry
+    """
+    _ensure_gradebook()
+    
+    return {
+        entry.get("course_id"): entry
+        for entry in get_by_index('gradebook', 'student_id', student_id).values()
+    }
+
+def read_grade_sheet(file_path: str) -> List[Tuple[int, str, str]]:
+    """
+    Read a grade sheet exported from a spreadsheet.
+    
+    The sheet is a CSV file with a header row holding 'student_id' and
+    'points' columns; other columns are ignored.
+    
+    Args:
+        file_path: Path of the CSV file
+    
+    Returns:
+        List of (line number, student ID, points as written)
+    """
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = {"student_id", "points"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{file_path} has no {' or '.join(sorted(missing))} column")
+        
+        return [
+            (reader.line_num, (row["student_id"] or "").strip(), (row["points"] or "").strip())
+            for row in reader
+        ]
+
+def enter_grade_sheets(teacher_id: str, sheets: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Enter grades for many assignments from grade sheets, without prompting.
+    
+    Every row is checked first: the student must be enrolled in the
+    assignment's course, not already graded for the assignment and listed
+    once, and the points must be a number between 0 and the assignment's
+    max points. Rows with blank points are skipped, as in enter_grades().
+    Percentages and letter grades are then computed for the whole batch at
+    once, and all grade rows are written and added to the gradebook in one
+    transaction, which repeats the duplicate check. Rejected rows are
+    returned rather than written.
+    
+    Args:
+        teacher_id: ID of the teacher entering the grades
+        sheets: Dictionary of assignment_id -> grade sheet path
+    
+    Returns:
+        Summary with the 'graded' and 'rejected' counts and the 'errors',
+        a list of (sheet path, line number, student ID, problem)
+    """
+    assignments = get_data('assignments', readonly=True)
+    courses = get_data('courses', readonly=True)
+    
+    # Students already graded for each of the assignments
+    graded = {assignment_id: set() for assignment_id in sheets}
+    for grade in get_data('grades', readonly=True).values():
+        if grade.get("assignment_id") in graded:
+            graded[grade["assignment_id"]].add(grade.get("student_id"))
+    
+    rows = []
+    origins = []
+    errors = []
+    
+    for assignment_id, file_path in sheets.items():
+        assignment = assignments.get(assignment_id)
+        course = courses.get(assignment.get("course_id")) if assignment else None
+        
+        if course is None:
+            errors.append((file_path, 0, "", f"assignment '{assignment_id}' not found"))
+            continue
+        
+        if course.get("teacher_id") != teacher_id:
+            errors.append((file_path, 0, "", f"assignment '{assignment_id}' is not in your course"))
+            continue
+        
+        max_points = float(assignment.get("max_points") or 0)
+        if max_points <= 0:
+            errors.append((file_path, 0, "", f"assignment '{assignment_id}' has no max points"))
+            continue
+        
+        try:
+            sheet = read_grade_sheet(file_path)
+        except (OSError, ValueError) as e:
+            errors.append((file_path, 0, "", str(e)))
+            continue
+        
+        enrolled = set(course.get("students", []))
+        seen = graded[assignment_id]
+        
+        for line_number, student_id, points_text in sheet:
+            if not points_text:
+                continue
+            
+            try:
+                points = float(points_text)
+            except ValueError:
+                points = None
+            
+            if student_id not in enrolled:
+                problem = "student not enrolled in the course"
+            elif student_id in seen:
+                problem = "student already graded for this assignment"
+            elif points is None or not 0 <= points <= max_points:
+                problem = f"points must be a number between 0 and {max_points:g}"
+            else:
+                seen.add(student_id)
+                rows.append((assignment_id, assignment["course_id"], student_id, points, max_points))
+                origins.append((file_path, line_number))
+                continue
+            
+            errors.append((file_path, line_number, student_id, problem))
+    
+    percentages = [points / max_points * 100 for _, _, _, points, max_points in rows]
+    letters = calculate_grade_letters(percentages)
+    graded_at = datetime.now().isoformat()
+    
+    new_grades = {
+        grade_id: {
+            "student_id": student_id,
+            "course_id": course_id,
+            "assignment_id": assignment_id,
+            "points": points,
+            "max_points": max_points,
+            "percentage": percentage,
+            "letter_grade": letter_grade,
+            "graded_by": teacher_id,
+            "graded_at": graded_at
+        }
+        for grade_id, (assignment_id, course_id, student_id, points, max_points), percentage, letter_grade
+        in zip(reserve_ids("GRD", len(rows)), rows, percentages, letters)
+    }
+    
+    origin = dict(zip(new_grades, origins))
+    
+    def save() -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, int, str, str]]]:
+        # Read the gradebook entries first: a grade entered for one of these
+        # students' courses from now on changes its entry, so the commit
+        # conflicts and the retry sees that grade in the check below
+        for grade in new_grades.values():
+            get_item('gradebook', _gradebook_key(grade["student_id"], grade["course_id"]))
+        
+        # Check again for grades entered since (e.g. by another import of the
+        # same sheet)
+        taken = set()
+        for course_id in {grade["course_id"] for grade in new_grades.values()}:
+            for grade in get_by_index('grades', 'course_id', course_id).values():
+                taken.add((grade.get("assignment_id"), grade.get("student_id")))
+        
+        written = {}
+        duplicates = []
+        
+        for grade_id, grade in new_grades.items():
+            if (grade["assignment_id"], grade["student_id"]) in taken:
+                file_path, line_number = origin[grade_id]
+                duplicates.append((file_path, line_number, grade["student_id"],
+                                   "student already graded for this assignment"))
+            else:
+                add_item('grades', grade_id, grade)
+                written[grade_id] = grade
+        
+        if written:
+            record_grades(written)
+        return written, duplicates
+    
+    if new_grades:
+        new_grades, duplicates = run_transaction(save)
+        errors.extend(duplicates)
+    
+    return {"graded": len(new_grades), "rejected": len(errors), "errors": errors}
+
+class GradeAnalytics:
+    """
+    Column-oriented snapshot of the grades collection for class-wide reports.
+    
+    Grades are read once into parallel arrays (student, course and term
+    codes, percentages), and every report is computed over those arrays in
+    grouped batch operations. Uses NumPy when it is installed and falls back
+    to plain Python otherwise.
+    """
+    
+    def __init__(self, grades: Dict[str, Dict[str, Any]],
+                 assignments: Dict[str, Dict[str, Any]]):
+        """
+        Load grades into columns.
+        
+        Args:
+            grades: The grades collection
+            assignments: The assignments collection, used to date grades into terms
+        """
+        self.student_ids = []
+        self.course_ids = []
+        self.terms = []
+        
+        student_codes = {}
+        course_codes = {}
+        term_codes = {}
+        date_terms = {}
+        
+        students = []
+        courses = []
+        terms = []
+        percentages = []
+        
+        def term_code(date: str) -> int:
+            if date not in date_terms:
+                try:
+                    term = get_term_for_date(date)
+                except ValueError:
+                    term = "Unknown"
+                if term not in term_codes:
+                    term_codes[term] = len(self.terms)
+                    self.terms.append(term)
+                date_terms[date] = term_codes[term]
+            return date_terms[date]
+        
+        # Term of each assignment, from its due date (or date, for graded entries)
+        assignment_terms = {
+            assignment_id: term_code((assignment.get("due_date") or assignment.get("date"))[:10])
+            for assignment_id, assignment in assignments.items()
+            if assignment.get("due_date") or assignment.get("date")
+        }
+        
+        for grade in grades.values():
+            student_id = grade.get("student_id")
+            course_id = grade.get("course_id")
+            
+            student = student_codes.get(student_id)
+            if student is None:
+                student = student_codes[student_id] = len(self.student_ids)
+                self.student_ids.append(student_id)
+            
+            course = course_codes.get(course_id)
+            if course is None:
+                course = course_codes[course_id] = len(self.course_ids)
+                self.course_ids.append(course_id)
+            
+            # Date a grade by its assignment, falling back to when it was graded
+            term = assignment_terms.get(grade.get("assignment_id"))
+            if term is None:
+                term = term_code(grade.get("graded_at", "")[:10])
+            
+            students.append(student)
+            courses.append(course)
+            terms.append(term)
+            percentages.append(grade.get("percentage", 0))
+        
+        if np is not None:
+            self.students = np.array(students, dtype=np.int64)
+            self.courses = np.array(courses, dtype=np.int64)
+            self.term_codes = np.array(terms, dtype=np.int64)
+            self.percentages = np.array(percentages, dtype=np.float64)
+        else:
+            self.students = students
+            self.courses = courses
+            self.term_codes = terms
+            self.percentages = percentages
+    
+    def __len__(self) -> int:
+        """Get the number of grades loaded."""
+        return len(self.percentages)
+    
+    def _group_stats(self, codes, size: int) -> List[Dict[str, Any]]:
+        """
+        Compute count, mean, median, standard deviation, range and letter
+        distribution for every group.
+        
+        Args:
+            codes: Group code of every grade
+            size: Number of groups
+        
+        Returns:
+            List of statistics, indexed by group code
+        """
+        if np is None:
+            return self._group_stats_python(codes, size)
+        
+        values = self.percentages
+        counts = np.bincount(codes, minlength=size)
+        sums = np.bincount(codes, weights=values, minlength=size)
+        squares = np.bincount(codes, weights=values * values, minlength=size)
+        
+        safe_counts = np.maximum(counts, 1)
+        means = sums / safe_counts
+        stddevs = np.sqrt(np.maximum(squares / safe_counts - means * means, 0))
+        
+        # Sort by group, then value, so each group's values are contiguous and ordered
+        ordered = values[np.lexsort((values, codes))]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        last = np.maximum(starts + counts - 1, 0)
+        
+        if len(ordered):
+            medians = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+            lows = ordered[np.minimum(starts, len(ordered) - 1)]
+            highs = ordered[last]
+        else:
+            medians = lows = highs = np.zeros(size)
+        
+        letters = np.maximum(np.searchsorted(GRADE_FLOORS, values, side="right") - 1, 0)
+        distribution = np.bincount(
+            codes * len(GRADE_LETTERS) + letters, minlength=size * len(GRADE_LETTERS)
+        ).reshape(size, len(GRADE_LETTERS))
+        
+        return [
+            {
+                "count": int(counts[code]),
+                "mean": float(means[code]),
+                "median": float(medians[code]),
+                "stddev": float(stddevs[code]),
+                "min": float(lows[code]),
+                "max": float(highs[code]),
+                "distribution": {
+                    GRADE_LETTERS[i]: int(distribution[code, i])
+                    for i in range(len(GRADE_LETTERS) - 1, -1, -1)
+                }
+            }
+            for code in range(size)
+        ]
+    
+    def _group_stats_python(self, codes: List[int], size: int) -> List[Dict[str, Any]]:
+        """Plain Python version of _group_stats."""
+        groups = [[] for _ in range(size)]
+        for code, value in zip(codes, self.percentages):
+            groups[code].append(value)
+        
+        stats = []
+        for values in groups:
+            distribution = dict.fromkeys(reversed(GRADE_LETTERS), 0)
+            for value in values:
+                distribution[GRADE_LETTERS[grade_band(value)]] += 1
+            
+            stats.append({
+                "count": len(values),
+                "mean": statistics.fmean(values) if values else 0.0,
+                "median": statistics.median(values) if values else 0.0,
+                "stddev": statistics.pstdev(values) if values else 0.0,
+                "min": min(values, default=0.0),
+                "max": max(values, default=0.0),
+                "distribution": distribution
+            })
+        
+        return stats
+    
+    def course_report(self) -> List[Dict[str, Any]]:
+        """
+        Get grade statistics for every course.
+        
+        Returns:
+            List of statistics with course_id, ordered by course ID
+        """
+        stats = self._group_stats(self.courses, len(self.course_ids))
+        report = [{"course_id": course_id, **stats[code]} for code, course_id in enumerate(self.course_ids)]
+        return sorted(report, key=lambda row: row["course_id"])
+    
+    def term_report(self) -> List[Dict[str, Any]]:
+        """
+        Get grade statistics for every term.
+        
+        Returns:
+            List of statistics with term, ordered by term start
+        """
+        stats = self._group_stats(self.term_codes, len(self.terms))
+        report = [{"term": term, **stats[code]} for code, term in enumerate(self.terms)]
+        return sorted(report, key=lambda row: _term_sort_key(row["term"]))
+    
+    def student_report(self) -> List[Dict[str, Any]]:
+        """
+        Get every student's average and GPA.
+        
+        The average is the mean of the student's course averages, and the
+        GPA is the mean of the grade points of those course averages' letters.
+        
+        Returns:
+            List with student_id, count, courses, average and gpa,
+            ordered by GPA (highest first)
+        """
+        size = len(self.student_ids)
+        points = [GRADE_POINTS.get(letter, 0.0) for letter in GRADE_LETTERS]
+        
+        if np is not None:
+            # Average every (student, course) pair, then the pairs per student
+            pairs, pair_codes = np.unique(
+                self.students * max(len(self.course_ids), 1) + self.courses, return_inverse=True
+            )
+            pair_counts = np.bincount(pair_codes)
+            pair_means = np.bincount(pair_codes, weights=self.percentages) / pair_counts
+            pair_points = np.array(points)[
+                np.maximum(np.searchsorted(GRADE_FLOORS, pair_means, side="right") - 1, 0)
+            ]
+            pair_students = pairs // max(len(self.course_ids), 1)
+            
+            counts = np.bincount(self.students, minlength=size)
+            courses = np.bincount(pair_students, minlength=size)
+            safe_courses = np.maximum(courses, 1)
+            averages = np.bincount(pair_students, weights=pair_means, minlength=size) / safe_courses
+            gpas = np.bincount(pair_students, weights=pair_points, minlength=size) / safe_courses
+            
+            report = [
+                {
+                    "student_id": student_id,
+                    "count": int(counts[code]),
+                    "courses": int(courses[code]),
+                    "average": float(averages[code]),
+                    "gpa": float(gpas[code])
+                }
+                for code, student_id in enumerate(self.student_ids)
+            ]
+        else:
+            sums = {}
+            for student, course, value in zip(self.students, self.courses, self.percentages):
+                total, count = sums.get((student, course), (0.0, 0))
+                sums[(student, course)] = (total + value, count + 1)
+            
+            per_student = [[] for _ in range(size)]
+            counts = [0] * size
+            for (student, _), (total, count) in sums.items():
+                per_student[student].append(total / count)
+                counts[student] += count
+            
+            report = [
+                {
+                    "student_id": student_id,
+                    "count": counts[code],
+                    "courses": len(per_student[code]),
+                    "average": statistics.fmean(per_student[code]),
+                    "gpa": statistics.fmean(points[grade_band(mean)] for mean in per_student[code])
+                }
+                for code, student_id in enumerate(self.student_ids)
+            ]
+        
+        return sorted(report, key=lambda row: (-row["gpa"], row["student_id"]))
+
+def _term_sort_key(term: str) -> tuple:
+    """Order terms like 'Spring 2024' chronologically."""
+    season, _, year = term.partition(" ")
+    order = {"Spring": 0, "Summer": 1, "Fall": 2}
+    return (year, order.get(season, 3), term)
+
+def load_grade_analytics() -> GradeAnalytics:
+    """
+    Load the grades and assignments collections into a GradeAnalytics.
+    
+    Returns:
+        Analytics over every grade currently stored
+    """
+    return GradeAnalytics(
+        get_data('grades', readonly=True),
+        get_data('assignments', readonly=True)
+    )
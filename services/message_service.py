@@ -0,0 +1,226 @@
+"""
+Message service for the School Management System
+
+Teacher/parent messages about a student are grouped into threads stored in
+the 'message_threads' collection, keyed "<teacher_id>|<parent_id>|<student_id>".
+Each thread keeps its message IDs ordered by sent_at and the IDs still
+unread by each participant. Threads are indexed by teacher_id and
+parent_id, which gives every participant an inbox without scanning messages.
+"""
+from bisect import insort
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from storage.datastore import (
+    get_data, save_data, get_item, add_item, update_item, get_by_index, run_transaction
+)
+from storage.sequences import next_id
+from storage import derived
+
+def thread_id_for(teacher_id: str, parent_id: str, student_id: str) -> str:
+    """
+    Get the ID of the thread between a teacher and a parent about a student.
+    
+    Args:
+        teacher_id: ID of the teacher
+        parent_id: ID of the parent
+        student_id: ID of the student
+    
+    Returns:
+        Thread ID
+    """
+    return f"{teacher_id}|{parent_id}|{student_id}"
+
+def _empty_thread(teacher_id: str, parent_id: str, student_id: str) -> Dict[str, Any]:
+    """Get a thread with no messages yet."""
+    return {
+        "teacher_id": teacher_id,
+        "parent_id": parent_id,
+        "student_id": student_id,
+        "messages": [],
+        "last_sent_at": "",
+        "unread": {teacher_id: [], parent_id: []}
+    }
+
+def _add_to_thread(thread: Dict[str, Any], message_id: str, message: Dict[str, Any]) -> None:
+    """Add a message to a thread in place."""
+    sent_at = message.get("sent_at", "")
+    
+    insort(thread["messages"], [sent_at, message_id])
+    thread["last_sent_at"] = max(thread["last_sent_at"], sent_at)
+    
+    if not message.get("read", False):
+        thread["unread"].setdefault(message.get("to_id"), []).append(message_id)
+
+def rebuild_message_threads() -> None:
+    """
+    Recompute 'message_threads' from the messages collection.
+    """
+    def rebuild() -> None:
+        # Pin the current threads, so messages sent meanwhile make this retry
+        get_data('message_threads', readonly=True)
+        
+        threads = {derived.MARKER_ID: derived.build_marker(['messages'])}
+        teachers = get_data('teachers', readonly=True)
+        
+        for message_id, message in get_data('messages', readonly=True).items():
+            from_id = message.get("from_id")
+            to_id = message.get("to_id")
+            
+            if from_id in teachers:
+                teacher_id, parent_id = from_id, to_id
+            else:
+                teacher_id, parent_id = to_id, from_id
+            
+            student_id = message.get("student_id")
+            thread_id = thread_id_for(teacher_id, parent_id, student_id)
+            
+            if thread_id not in threads:
+                threads[thread_id] = _empty_thread(teacher_id, parent_id, student_id)
+            
+            _add_to_thread(threads[thread_id], message_id, message)
+        
+        save_data('message_threads', threads)
+    
+    run_transaction(rebuild)
+
+def _ensure_threads() -> None:
+    """Rebuild the threads if messages changed without updating them."""
+    if not derived.is_current('message_threads', ['messages']):
+        rebuild_message_threads()
+
+def send_message(teacher_id: str, parent_id: str, student_id: str, sender_id: str,
+                 subject: str, message: str) -> str:
+    """
+    Send a message in the thread between a teacher and a parent.
+    
+    Args:
+        teacher_id: ID of the teacher
+        parent_id: ID of the parent
+        student_id: ID of the student the conversation is about
+        sender_id: ID of the sender (the teacher or the parent)
+        subject: Subject of the message
+        message: Message text
+    
+    Returns:
+        ID of the new message
+    """
+    message_id = next_id("MSG")
+    
+    record = {
+        "from_id": sender_id,
+        "to_id": parent_id if sender_id == teacher_id else teacher_id,
+        "student_id": student_id,
+        "subject": subject,
+        "message": message,
+        "sent_at": datetime.now().isoformat(),
+        "read": False
+    }
+    thread_id = thread_id_for(teacher_id, parent_id, student_id)
+    
+    def send() -> None:
+        derived.record_write('message_threads', 'messages')
+        add_item('messages', message_id, record)
+        
+        thread = get_item('message_threads', thread_id) or _empty_thread(teacher_id, parent_id, student_id)
+        _add_to_thread(thread, message_id, record)
+        add_item('message_threads', thread_id, thread)
+    
+    # The message and its thread commit together; a concurrent message in
+    # the same thread retries this one against the updated thread
+    run_transaction(send)
+    
+    return message_id
+
+def get_inbox(participant_id: str, role_field: str = "teacher_id") -> List[Dict[str, Any]]:
+    """
+    Get a participant's threads, most recently active first.
+    
+    Args:
+        participant_id: ID of the teacher or parent
+        role_field: 'teacher_id' or 'parent_id', whichever the participant is
+    
+    Returns:
+        List of thread dictionaries with their IDs and the participant's
+        unread count
+    """
+    _ensure_threads()
+    
+    threads = [
+        {**thread, "id": thread_id, "unread_count": len(thread.get("unread", {}).get(participant_id, []))}
+        for thread_id, thread in get_by_index('message_threads', role_field, participant_id).items()
+    ]
+    threads.sort(key=lambda thread: thread.get("last_sent_at", ""), reverse=True)
+    
+    return threads
+
+def get_thread(teacher_id: str, parent_id: str, student_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the thread between a teacher and a parent about a student.
+    
+    Args:
+        teacher_id: ID of the teacher
+        parent_id: ID of the parent
+        student_id: ID of the student
+    
+    Returns:
+        Thread dictionary if any messages were exchanged, None otherwise
+    """
+    _ensure_threads()
+    return get_item('message_threads', thread_id_for(teacher_id, parent_id, student_id))
+
+def get_thread_messages(thread: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Get a thread's messages, oldest first.
+    
+    Args:
+        thread: Thread dictionary
+    
+    Returns:
+        List of message dictionaries with IDs
+    """
+    conversation = []
+    
+    for _, message_id in thread.get("messages", []):
+        message = get_item('messages', message_id)
+        if message is not None:
+            conversation.append({"id": message_id, **message})
+    
+    return conversation
+
+def mark_thread_read(teacher_id: str, parent_id: str, student_id: str, reader_id: str) -> int:
+    """
+    Mark the messages a participant hasn't read in a thread as read.
+    
+    Only the unread messages and the thread's counter are rewritten, in one
+    transaction.
+    
+    Args:
+        teacher_id: ID of the teacher
+        parent_id: ID of the parent
+        student_id: ID of the student
+        reader_id: ID of the participant who read the thread
+    
+    Returns:
+        Number of messages marked as read
+    """
+    thread_id = thread_id_for(teacher_id, parent_id, student_id)
+    
+    def mark_read() -> int:
+        thread = get_item('message_threads', thread_id)
+        
+        if thread is None:
+            return 0
+        
+        unread = thread.get("unread", {}).get(reader_id, [])
+        if not unread:
+            return 0
+        
+        derived.record_write('message_threads', 'messages')
+        for message_id in unread:
+            update_item('messages', message_id, {"read": True})
+        
+        update_item('message_threads', thread_id, {"unread": {**thread["unread"], reader_id: []}})
+        
+        return len(unread)
+    
+    return run_transaction(mark_read)
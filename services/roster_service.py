@@ -0,0 +1,281 @@
+"""
+Roster import service for the School Management System
+
+Imports students, teachers and staff in bulk from a CSV or JSONL roster.
+Rows are streamed and validated in chunks, passwords are hashed in a
+process pool, IDs are reserved in one block per role, and every valid row
+is committed in a single transaction that writes each touched collection
+once. Rows that fail validation are written to an error report instead.
+"""
+import os
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple, Optional, Iterator, Iterable
+from auth import hash_password
+from storage.datastore import get_data, save_data, run_transaction
+from storage.sequences import reserve_ids
+from utils.constants import USER_ROLES, ROSTER_CHUNK_SIZE
+from utils.helpers import validate_email, validate_phone
+
+# Collection, ID prefix and required fields of each importable role
+ROSTER_ROLES = {
+    USER_ROLES.STUDENT: ("students", "STU", ["grade_level", "date_of_birth"]),
+    USER_ROLES.TEACHER: ("teachers", "TCH", ["department"]),
+    USER_ROLES.STAFF: ("staff", "STF", ["position", "department"])
+}
+
+# Fields every row needs
+REQUIRED_FIELDS = ["username", "password", "first_name", "last_name"]
+
+def read_roster(file_path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Stream the rows of a roster file.
+    
+    CSV files need a header row; any other extension is read as JSONL, one
+    JSON object per line.
+    
+    Args:
+        file_path: Path of the roster
+    
+    Yields:
+        Tuples of (line number, row)
+    """
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        if file_path.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                row = {"_error": f"invalid JSON: {e.msg}"}
+            yield line_number, row if isinstance(row, dict) else {"_error": "not a JSON object"}
+
+def _text(row: Dict[str, Any], field: str) -> str:
+    """Get a row field as stripped text."""
+    value = row.get(field)
+    return "" if value is None else str(value).strip()
+
+def validate_row(row: Dict[str, Any], default_role: Optional[str] = None) -> List[str]:
+    """
+    Check one roster row.
+    
+    Args:
+        row: Roster row
+        default_role: Role for rows without a 'role' field
+    
+    Returns:
+        List of problems, empty if the row is valid
+    """
+    if "_error" in row:
+        return [row["_error"]]
+    
+    role = _text(row, "role") or default_role
+    if role not in ROSTER_ROLES:
+        return [f"unknown role '{role or ''}'"]
+    
+    problems = [
+        f"missing {field}"
+        for field in REQUIRED_FIELDS + ROSTER_ROLES[role][2]
+        if not _text(row, field)
+    ]
+    
+    email = _text(row, "email")
+    if email and not validate_email(email):
+        problems.append("invalid email")
+    
+    phone = _text(row, "phone")
+    if phone and not validate_phone(phone):
+        problems.append("invalid phone")
+    
+    return problems
+
+def _chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split an iterable into lists of up to `size` items."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _subjects(value: Any) -> List[str]:
+    """Get a teacher's subjects from a JSON list or a ';'-separated string."""
+    if isinstance(value, list):
+        return [str(subject).strip() for subject in value if str(subject).strip()]
+    return [subject.strip() for subject in str(value or "").split(";") if subject.strip()]
+
+def _role_record(role: str, row: Dict[str, Any], created_at: str,
+                 admin_username: str) -> Dict[str, Any]:
+    """Build the students/teachers/staff record of a valid row."""
+    record = {
+        "username": _text(row, "username"),
+        "first_name": _text(row, "first_name"),
+        "last_name": _text(row, "last_name"),
+        "email": _text(row, "email"),
+        "phone": _text(row, "phone")
+    }
+    
+    if role == USER_ROLES.STUDENT:
+        record.update({
+            "grade_level": _text(row, "grade_level"),
+            "date_of_birth": _text(row, "date_of_birth"),
+            "enrollment_date": created_at,
+            "parent_id": "",
+            "courses": []
+        })
+    elif role == USER_ROLES.TEACHER:
+        record.update({
+            "subjects": _subjects(row.get("subjects")),
+            "department": _text(row, "department"),
+            "hire_date": created_at,
+            "classes": []
+        })
+    else:
+        record.update({
+            "position": _text(row, "position"),
+            "department": _text(row, "department"),
+            "hire_date": created_at
+        })
+    
+    record.update({"created_at": created_at, "created_by": admin_username})
+    return record
+
+def _write_error_report(report_path: str, errors: List[Tuple[int, Dict[str, Any], List[str]]]) -> None:
+    """Write rejected rows as CSV: line, username, errors."""
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["line", "username", "errors"])
+        for line_number, row, problems in errors:
+            writer.writerow([line_number, _text(row, "username"), "; ".join(problems)])
+
+def import_roster(file_path: str, admin_username: str, default_role: Optional[str] = None,
+                  error_report: Optional[str] = None,
+                  workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Import a CSV or JSONL roster of students, teachers and staff.
+    
+    Each row needs username, password, first_name and last_name, plus
+    grade_level and date_of_birth (students), department and optionally
+    subjects (teachers, ';'-separated in CSV) or position and department
+    (staff); email and phone are optional. The role comes from a 'role'
+    column or from `default_role`. Valid rows are all committed together;
+    invalid ones, and usernames already taken, go to the error report.
+    
+    Args:
+        file_path: Path of the roster (.csv, otherwise JSONL)
+        admin_username: Username of the admin running the import
+        default_role: Role for rows without a 'role' field
+        error_report: Path of the error report (default: <roster>.errors.csv)
+        workers: Number of password hashing processes (default: one per CPU)
+    
+    Returns:
+        Summary with 'imported' and 'rejected' counts and the 'error_report'
+        path (None if every row was imported)
+    """
+    taken = set(get_data('users', readonly=True))
+    valid: List[Tuple[int, str, Dict[str, Any]]] = []
+    errors: List[Tuple[int, Dict[str, Any], List[str]]] = []
+    pending_hashes = []
+    
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    
+    try:
+        for chunk in _chunks(read_roster(file_path), ROSTER_CHUNK_SIZE):
+            passwords = []
+            
+            for line_number, row in chunk:
+                problems = validate_row(row, default_role)
+                username = _text(row, "username")
+                
+                if not problems and username in taken:
+                    problems = [f"username '{username}' already exists"]
+                
+                if problems:
+                    errors.append((line_number, row, problems))
+                else:
+                    taken.add(username)
+                    valid.append((line_number, _text(row, "role") or default_role, row))
+                    passwords.append(_text(row, "password"))
+            
+            # Hash this chunk in the background while the next one is validated
+            if pool is not None:
+                chunksize = max(1, len(passwords) // (workers * 4))
+                pending_hashes.append(pool.map(hash_password, passwords, chunksize=chunksize))
+            else:
+                pending_hashes.append(map(hash_password, passwords))
+        
+        hashes = [password_hash for results in pending_hashes for password_hash in results]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    # One block of IDs per role, handed out to the rows up front
+    ids = {}
+    for role, (_, prefix, _) in ROSTER_ROLES.items():
+        count = sum(1 for _, row_role, _ in valid if row_role == role)
+        ids[role] = iter(reserve_ids(prefix, count, width=6))
+    assigned_ids = [next(ids[role]) for _, role, _ in valid]
+    
+    created_at = datetime.now().isoformat()
+    roles = {role for _, role, _ in valid}
+    
+    def save() -> List[Tuple[int, Dict[str, Any], List[str]]]:
+        users = get_data('users')
+        credentials = get_data('credentials')
+        user_ids = get_data('user_ids')
+        role_collections = {role: get_data(ROSTER_ROLES[role][0]) for role in roles}
+        collisions = []
+        
+        for (line_number, role, row), password_hash, user_id in zip(valid, hashes, assigned_ids):
+            username = _text(row, "username")
+            
+            # Taken since the check above, e.g. by a registration or another import
+            if username in users:
+                collisions.append((line_number, row, [f"username '{username}' already exists"]))
+                continue
+            
+            users[username] = {
+                "id": user_id,
+                "username": username,
+                "role": role,
+                "first_name": _text(row, "first_name"),
+                "last_name": _text(row, "last_name"),
+                "email": _text(row, "email"),
+                "phone": _text(row, "phone"),
+                "created_at": created_at,
+                "created_by": admin_username,
+                "is_active": True
+            }
+            credentials[username] = {"hash": password_hash, "updated_at": created_at}
+            user_ids[user_id] = {"username": username}
+            role_collections[role][user_id] = _role_record(role, row, created_at, admin_username)
+        
+        # One write per collection
+        save_data('users', users)
+        save_data('credentials', credentials)
+        save_data('user_ids', user_ids)
+        for role, collection in role_collections.items():
+            save_data(ROSTER_ROLES[role][0], collection)
+        
+        return collisions
+    
+    collisions = run_transaction(save) if valid else []
+    if collisions:
+        errors = sorted(errors + collisions, key=lambda error: error[0])
+    
+    report_path = None
+    if errors:
+        report_path = error_report or f"{file_path}.errors.csv"
+        _write_error_report(report_path, errors)
+    
+    return {"imported": len(valid) - len(collisions), "rejected": len(errors), "error_report": report_path}
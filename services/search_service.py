@@ -0,0 +1,202 @@
+"""
+Name search service for the School Management System
+
+Keeps an in-process trigram index over the names of a collection's items
+(users, students, ...), so a name lookup only verifies the items sharing
+the query's trigrams instead of testing every record. The index follows
+the collection as it changes: on each search, items the data store has
+replaced since the last one are re-indexed, and removed ones dropped.
+"""
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
+from storage.datastore import get_data
+
+# data_type -> {"data": collection last indexed,
+#               "items": item_id -> item object indexed,
+#               "names": item_id -> lowercased full name,
+#               "by_name": lowercased full name -> item IDs,
+#               "grams": trigram -> names, "id_grams": trigram -> item IDs}
+# People often share names, so names are indexed once however many have them.
+_indexes: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+def full_name(item: Dict[str, Any]) -> str:
+    """
+    Get the display name of a person record.
+    
+    Args:
+        item: User, student, teacher, ... record
+    
+    Returns:
+        "First Last", or whichever part is set
+    """
+    return f"{item.get('first_name', '')} {item.get('last_name', '')}".strip()
+
+def _grams(text: str) -> Set[str]:
+    """Get the trigrams of a string (the string itself if shorter)."""
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _post(postings: Dict[str, Set[str]], text: str, key: str) -> None:
+    """Add a key under each trigram of a text."""
+    for gram in _grams(text):
+        postings.setdefault(gram, set()).add(key)
+
+def _unpost(postings: Dict[str, Set[str]], text: str, key: str) -> None:
+    """Remove a key from under each trigram of a text."""
+    for gram in _grams(text):
+        keys = postings.get(gram)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del postings[gram]
+
+def _add(index: Dict[str, Any], item_id: str, item: Dict[str, Any]) -> None:
+    """Index one item."""
+    name = full_name(item).lower()
+    index["items"][item_id] = item
+    index["names"][item_id] = name
+    
+    holders = index["by_name"].setdefault(name, set())
+    if not holders:
+        _post(index["grams"], name, name)
+    holders.add(item_id)
+    
+    _post(index["id_grams"], item_id.lower(), item_id)
+
+def _remove(index: Dict[str, Any], item_id: str) -> None:
+    """Drop one item from the index."""
+    del index["items"][item_id]
+    name = index["names"].pop(item_id)
+    
+    holders = index["by_name"][name]
+    holders.discard(item_id)
+    if not holders:
+        del index["by_name"][name]
+        _unpost(index["grams"], name, name)
+    
+    _unpost(index["id_grams"], item_id.lower(), item_id)
+
+def _synced_index(data_type: str) -> Dict[str, Any]:
+    """
+    Get a collection's index, brought up to date with the data store.
+    
+    The caller must hold _lock. Cached collections replace changed items
+    rather than mutating them, so an item object already indexed is
+    unchanged and is skipped.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Up-to-date index
+    """
+    data = get_data(data_type, readonly=True)
+    index = _indexes.get(data_type)
+    
+    if index is None:
+        index = {"data": None, "items": {}, "names": {}, "by_name": {}, "grams": {}, "id_grams": {}}
+        _indexes[data_type] = index
+    
+    if index["data"] is data:
+        return index
+    
+    indexed = index["items"]
+    
+    for item_id in indexed.keys() - data.keys():
+        _remove(index, item_id)
+    
+    for item_id, item in data.items():
+        previous = indexed.get(item_id)
+        if previous is item:
+            continue
+        if previous is not None:
+            if full_name(previous) == full_name(item):
+                indexed[item_id] = item
+                continue
+            _remove(index, item_id)
+        _add(index, item_id, item)
+    
+    index["data"] = data
+    return index
+
+def _matching(postings: Dict[str, Set[str]], query: str, lower: bool = False) -> List[str]:
+    """
+    Get the keys whose text contains a query.
+    
+    Args:
+        postings: Trigram postings of the texts
+        query: Lowercased query, three characters or more
+        lower: True if a key's text is the key lowercased, False if the key itself
+    
+    Returns:
+        Matching keys
+    """
+    sets = sorted((postings.get(gram, set()) for gram in _grams(query)), key=len)
+    candidates = sets[0].intersection(*sets[1:])
+    
+    # Sharing every trigram doesn't guarantee containing the query
+    if lower:
+        return [key for key in candidates if query in key.lower()]
+    return [key for key in candidates if query in key]
+
+def _rank(query: str, name: str) -> int:
+    """
+    Rank how well a name containing a query matches it; lower is better.
+    
+    Args:
+        query: Lowercased query
+        name: Lowercased full name
+    
+    Returns:
+        0 exact name, 1 name prefix, 2 prefix of a later word, 3 elsewhere
+    """
+    if name.startswith(query):
+        return 0 if len(name) == len(query) else 1
+    if f" {query}" in name:
+        return 2
+    return 3
+
+def search_by_name(data_type: str, query: str, match_ids: bool = False,
+                   limit: Optional[int] = None) -> List[str]:
+    """
+    Find the items whose name contains a query, best matches first.
+    
+    Matching is case-insensitive and finds the query anywhere in the first
+    name, last name or full name. Exact names rank first, then names
+    starting with the query, then names with a word starting with it, then
+    any other match; ties are ordered by name and ID. Items matching only
+    by ID come last.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+        query: Text to look for
+        match_ids: Whether to also match the query against item IDs
+        limit: Maximum number of results
+    
+    Returns:
+        Matching item IDs
+    """
+    query = query.strip().lower()
+    
+    with _lock:
+        index = _synced_index(data_type)
+        by_name = index["by_name"]
+        
+        if len(query) < 3:
+            # Too short for trigrams; scan the distinct names and IDs
+            names = [name for name in by_name if query in name]
+            id_matches = [item_id for item_id in index["names"] if query in item_id.lower()] if match_ids else []
+        else:
+            names = _matching(index["grams"], query)
+            id_matches = _matching(index["id_grams"], query, lower=True) if match_ids else []
+        
+        results = []
+        for _, name in sorted((_rank(query, name), name) for name in names):
+            results.extend(sorted(by_name[name]))
+        
+        matched = set(results)
+        results.extend(sorted(item_id for item_id in id_matches if item_id not in matched))
+    
+    return results[:limit] if limit is not None else results
@@ -3,10 +3,14 @@ Staff service for the School Management System
 """
 from datetime import datetime
 from typing import Dict, Any, List, Tuple, Optional
-from storage.datastore import get_data, save_data
+from storage.datastore import get_data, save_data, add_item, get_by_index, run_transaction
+from storage.sequences import next_id
 from utils.constants import USER_ROLES
 from services.user_service import create_user
-from utils.helpers import generate_id
+from auth import rename_credentials
+from utils.helpers import (
+    generate_id, get_username_by_id, set_user_id_mapping, remove_user_id_mapping
+)
 
 def add_staff(admin_username: str, username: str, password: str,
              first_name: str, last_name: str, email: str, phone: str,
@@ -28,47 +32,52 @@ def add_staff(admin_username: str, username: str, password: str,
     Returns:
         Tuple of (success, message)
     """
-    # Create user account first
-    success, message, user_id = create_user(
-        username, 
-        password, 
-        USER_ROLES.STAFF, 
-        first_name, 
-        last_name, 
-        email, 
-        phone, 
-        admin_username
-    )
-    
-    if not success:
-        return False, message
-    
-    # Generate staff ID
-    staff_id = generate_id("STF")
-    
-    # Update user record with proper ID
-    users = get_data('users')
-    users[username]["id"] = staff_id
-    save_data('users', users)
-    
-    # Create staff record
-    staff = get_data('staff')
-    staff[staff_id] = {
-        "username": username,
-        "first_name": first_name,
-        "last_name": last_name,
-        "email": email,
-        "phone": phone,
-        "position": position,
-        "department": department,
-        "hire_date": datetime.now().isoformat(),
-        "created_at": datetime.now().isoformat(),
-        "created_by": admin_username
-    }
-    
-    save_data('staff', staff)
+    def add() -> Tuple[bool, str]:
+        # Create user account first
+        success, message, user_id = create_user(
+            username, 
+            password, 
+            USER_ROLES.STAFF, 
+            first_name, 
+            last_name, 
+            email, 
+            phone, 
+            admin_username
+        )
+        
+        if not success:
+            return False, message
+        
+        # Generate staff ID
+        staff_id = generate_id("STF")
+        
+        # Update user record with proper ID
+        users = get_data('users')
+        users[username]["id"] = staff_id
+        save_data('users', users)
+        remove_user_id_mapping(user_id)
+        set_user_id_mapping(staff_id, username)
+        
+        # Create staff record
+        staff = get_data('staff')
+        staff[staff_id] = {
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email,
+            "phone": phone,
+            "position": position,
+            "department": department,
+            "hire_date": datetime.now().isoformat(),
+            "created_at": datetime.now().isoformat(),
+            "created_by": admin_username
+        }
+        
+        save_data('staff', staff)
+        
+        return True, f"✅ Staff member '{first_name} {last_name}' added successfully."
     
-    return True, f"✅ Staff member '{first_name} {last_name}' added successfully."
+    return run_transaction(add)
 
 def get_staff_details(staff_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -119,13 +128,9 @@ def update_staff(staff_id: str, update_data: Dict[str, Any],
     # If username is in update_data, update user record as well
     if "username" in update_data:
         users = get_data('users')
-        old_username = None
         
         # Find the corresponding user
-        for username, user in users.items():
-            if user.get("id") == staff_id:
-                old_username = username
-                break
+        old_username = get_username_by_id(staff_id)
         
         if old_username and old_username != update_data["username"]:
             # Create a new entry with updated username
@@ -139,6 +144,8 @@ def update_staff(staff_id: str, update_data: Dict[str, Any],
             del users[old_username]
             
             save_data('users', users)
+            rename_credentials(old_username, new_username)
+            set_user_id_mapping(staff_id, new_username)
     
     return True, f"✅ Staff member information updated successfully."
 
@@ -191,12 +198,11 @@ def get_staff_by_department(department: str) -> List[Dict[str, Any]]:
     Returns:
         List of staff dictionaries
     """
-    staff = get_data('staff')
+    staff = get_by_index('staff', 'department', department)
     
     return [
         {**staff_member, "id": staff_id}
         for staff_id, staff_member in staff.items()
-        if staff_member.get("department") == department
     ]
 
 def get_staff_by_position(position: str) -> List[Dict[str, Any]]:
@@ -209,12 +215,11 @@ def get_staff_by_position(position: str) -> List[Dict[str, Any]]:
     Returns:
         List of staff dictionaries
     """
-    staff = get_data('staff')
+    staff = get_by_index('staff', 'position', position)
     
     return [
         {**staff_member, "id": staff_id}
         for staff_id, staff_member in staff.items()
-        if staff_member.get("position") == position
     ]
 
 def log_facility_issue(staff_id: str, issue: Dict[str, Any]) -> Tuple[bool, str]:
@@ -233,11 +238,8 @@ def log_facility_issue(staff_id: str, issue: Dict[str, Any]) -> Tuple[bool, str]
     if staff_id not in staff:
         return False, f"❌ Staff member with ID '{staff_id}' not found."
     
-    # Get facility issues data
-    facility_issues = get_data('facility_issues')
-    
     # Generate issue ID
-    issue_id = f"ISS{len(facility_issues) + 1:04d}"
+    issue_id = next_id("ISS")
     
     # Add metadata to issue
     issue["id"] = issue_id
@@ -246,8 +248,7 @@ def log_facility_issue(staff_id: str, issue: Dict[str, Any]) -> Tuple[bool, str]
     issue["status"] = "reported"
     
     # Save the issue
-    facility_issues[issue_id] = issue
-    save_data('facility_issues', facility_issues)
+    add_item('facility_issues', issue_id, issue)
     
     return True, f"✅ Facility issue logged successfully. Issue ID: {issue_id}"
 
@@ -267,11 +268,8 @@ def request_leave(staff_id: str, leave_request: Dict[str, Any]) -> Tuple[bool, s
     if staff_id not in staff:
         return False, f"❌ Staff member with ID '{staff_id}' not found."
     
-    # Get leave requests data
-    leave_requests = get_data('leave_requests')
-    
     # Generate leave request ID
-    request_id = f"LVR{len(leave_requests) + 1:04d}"
+    request_id = next_id("LVR")
     
     # Add metadata to leave request
     leave_request["id"] = request_id
@@ -280,7 +278,6 @@ def request_leave(staff_id: str, leave_request: Dict[str, Any]) -> Tuple[bool, s
     leave_request["status"] = "pending"
     
     # Save the leave request
-    leave_requests[request_id] = leave_request
-    save_data('leave_requests', leave_requests)
+    add_item('leave_requests', request_id, leave_request)
     
     return True, f"✅ Leave request submitted successfully. Request ID: {request_id}"
\ No newline at end of file
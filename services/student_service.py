@@ -2,11 +2,14 @@
 Student service for the School Management System
 """
 from datetime import datetime
-from typing import Dict, Any, List, Tuple, Optional
-from storage.datastore import get_data, save_data
+from typing import Dict, Any, List, Tuple, Optional, Iterable, Set
+from storage.datastore import get_data, save_data, get_item, get_by_index, run_transaction
 from utils.constants import USER_ROLES
 from services.user_service import create_user
-from utils.helpers import generate_id
+from auth import rename_credentials
+from utils.helpers import (
+    generate_id, get_username_by_id, set_user_id_mapping, remove_user_id_mapping
+)
 
 def add_student(admin_username: str, username: str, password: str,
                 first_name: str, last_name: str, email: str, phone: str,
@@ -28,49 +31,54 @@ def add_student(admin_username: str, username: str, password: str,
     Returns:
         Tuple of (success, message)
     """
-    # Create user account first
-    success, message, user_id = create_user(
-        username, 
-        password, 
-        USER_ROLES.STUDENT, 
-        first_name, 
-        last_name, 
-        email, 
-        phone, 
-        admin_username
-    )
-    
-    if not success:
-        return False, message
-    
-    # Generate student ID
-    student_id = generate_id("STU")
-    
-    # Update user record with proper ID
-    users = get_data('users')
-    users[username]["id"] = student_id
-    save_data('users', users)
-    
-    # Create student record
-    students = get_data('students')
-    students[student_id] = {
-        "username": username,
-        "first_name": first_name,
-        "last_name": last_name,
-        "email": email,
-        "phone": phone,
-        "grade_level": grade_level,
-        "date_of_birth": date_of_birth,
-        "enrollment_date": datetime.now().isoformat(),
-        "parent_id": "",
-        "courses": [],
-        "created_at": datetime.now().isoformat(),
-        "created_by": admin_username
-    }
-    
-    save_data('students', students)
+    def add() -> Tuple[bool, str]:
+        # Create user account first
+        success, message, user_id = create_user(
+            username, 
+            password, 
+            USER_ROLES.STUDENT, 
+            first_name, 
+            last_name, 
+            email, 
+            phone, 
+            admin_username
+        )
+        
+        if not success:
+            return False, message
+        
+        # Generate student ID
+        student_id = generate_id("STU")
+        
+        # Update user record with proper ID
+        users = get_data('users')
+        users[username]["id"] = student_id
+        save_data('users', users)
+        remove_user_id_mapping(user_id)
+        set_user_id_mapping(student_id, username)
+        
+        # Create student record
+        students = get_data('students')
+        students[student_id] = {
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email,
+            "phone": phone,
+            "grade_level": grade_level,
+            "date_of_birth": date_of_birth,
+            "enrollment_date": datetime.now().isoformat(),
+            "parent_id": "",
+            "courses": [],
+            "created_at": datetime.now().isoformat(),
+            "created_by": admin_username
+        }
+        
+        save_data('students', students)
+        
+        return True, f"✅ Student '{first_name} {last_name}' added successfully."
     
-    return True, f"✅ Student '{first_name} {last_name}' added successfully."
+    return run_transaction(add)
 
 def get_student_details(student_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -121,13 +129,9 @@ def update_student(student_id: str, update_data: Dict[str, Any],
     # If username is in update_data, update user record as well
     if "username" in update_data:
         users = get_data('users')
-        old_username = None
         
         # Find the corresponding user
-        for username, user in users.items():
-            if user.get("id") == student_id:
-                old_username = username
-                break
+        old_username = get_username_by_id(student_id)
         
         if old_username and old_username != update_data["username"]:
             # Create a new entry with updated username
@@ -141,6 +145,8 @@ def update_student(student_id: str, update_data: Dict[str, Any],
             del users[old_username]
             
             save_data('users', users)
+            rename_credentials(old_username, new_username)
+            set_user_id_mapping(student_id, new_username)
     
     return True, f"✅ Student information updated successfully."
 
@@ -157,43 +163,149 @@ def enroll_student_in_course(student_id: str, course_id: str,
     Returns:
         Tuple of (success, message)
     """
-    students = get_data('students')
-    courses = get_data('courses')
+    def enroll() -> Tuple[bool, str]:
+        students = get_data('students')
+        courses = get_data('courses')
+        
+        if student_id not in students:
+            return False, f"❌ Student with ID '{student_id}' not found."
+        
+        if course_id not in courses:
+            return False, f"❌ Course with ID '{course_id}' not found."
+        
+        # Check if student is already enrolled
+        if course_id in students[student_id].get("courses", []):
+            return False, f"❌ Student is already enrolled in this course."
+        
+        # Add course to student's courses
+        if "courses" not in students[student_id]:
+            students[student_id]["courses"] = []
+        
+        students[student_id]["courses"].append(course_id)
+        students[student_id]["modified_at"] = datetime.now().isoformat()
+        students[student_id]["modified_by"] = enrolling_username
+        
+        save_data('students', students)
+        
+        # Add student to course's students
+        if "students" not in courses[course_id]:
+            courses[course_id]["students"] = []
+        
+        courses[course_id]["students"].append(student_id)
+        courses[course_id]["modified_at"] = datetime.now().isoformat()
+        courses[course_id]["modified_by"] = enrolling_username
+        
+        save_data('courses', courses)
+        
+        student_name = f"{students[student_id].get('first_name', '')} {students[student_id].get('last_name', '')}".strip()
+        course_name = courses[course_id].get('name', '')
+        
+        return True, f"✅ {student_name} enrolled in {course_name} successfully."
     
-    if student_id not in students:
-        return False, f"❌ Student with ID '{student_id}' not found."
+    return run_transaction(enroll)
+
+def bulk_enroll(pairs: Iterable[Tuple[str, str]],
+                enrolling_username: str) -> Tuple[bool, str]:
+    """
+    Enroll many students in many courses at once.
     
-    if course_id not in courses:
-        return False, f"❌ Course with ID '{course_id}' not found."
+    Both sides of every enrollment are updated in memory and students and
+    courses are each saved once, rather than once per enrollment. Duplicate
+    pairs and enrollments that already exist are skipped, as are pairs
+    naming an unknown student or course.
     
-    # Check if student is already enrolled
-    if course_id in students[student_id].get("courses", []):
-        return False, f"❌ Student is already enrolled in this course."
+    Args:
+        pairs: (student_id, course_id) pairs to enroll
+        enrolling_username: Username of the user making the enrollments
     
-    # Add course to student's courses
-    if "courses" not in students[student_id]:
-        students[student_id]["courses"] = []
+    Returns:
+        Tuple of (success, message)
+    """
+    pairs = sorted(set(pairs))
     
-    students[student_id]["courses"].append(course_id)
-    students[student_id]["modified_at"] = datetime.now().isoformat()
-    students[student_id]["modified_by"] = enrolling_username
+    def enroll() -> Tuple[bool, str]:
+        students = get_data('students')
+        courses = get_data('courses')
+        
+        student_courses: Dict[str, Set[str]] = {}
+        course_students: Dict[str, Set[str]] = {}
+        changed_students: Set[str] = set()
+        changed_courses: Set[str] = set()
+        enrolled = unknown = 0
+        
+        for student_id, course_id in pairs:
+            student = students.get(student_id)
+            course = courses.get(course_id)
+            
+            if student is None or course is None:
+                unknown += 1
+                continue
+            
+            if student_id not in student_courses:
+                student_courses[student_id] = set(student.setdefault("courses", []))
+            if course_id not in course_students:
+                course_students[course_id] = set(course.setdefault("students", []))
+            
+            if course_id not in student_courses[student_id]:
+                student_courses[student_id].add(course_id)
+                student["courses"].append(course_id)
+                changed_students.add(student_id)
+                enrolled += 1
+            
+            # Also repairs courses missing an existing enrollment
+            if student_id not in course_students[course_id]:
+                course_students[course_id].add(student_id)
+                course["students"].append(student_id)
+                changed_courses.add(course_id)
+        
+        now = datetime.now().isoformat()
+        
+        for student_id in changed_students:
+            students[student_id]["modified_at"] = now
+            students[student_id]["modified_by"] = enrolling_username
+        
+        for course_id in changed_courses:
+            courses[course_id]["modified_at"] = now
+            courses[course_id]["modified_by"] = enrolling_username
+        
+        if changed_students:
+            save_data('students', students)
+        if changed_courses:
+            save_data('courses', courses)
+        
+        skipped = len(pairs) - enrolled - unknown
+        message = f"✅ {enrolled} enrollment(s) added"
+        if skipped:
+            message += f", {skipped} already enrolled"
+        if unknown:
+            message += f", {unknown} skipped (unknown student or course)"
+        
+        return True, message + "."
     
-    save_data('students', students)
+    return run_transaction(enroll)
+
+def enroll_grade_in_course(grade_level: str, course_id: str,
+                           enrolling_username: str) -> Tuple[bool, str]:
+    """
+    Enroll every student in a grade level in a course.
     
-    # Add student to course's students
-    if "students" not in courses[course_id]:
-        courses[course_id]["students"] = []
+    Args:
+        grade_level: Grade level to enroll
+        course_id: ID of the course
+        enrolling_username: Username of the user making the enrollments
     
-    courses[course_id]["students"].append(student_id)
-    courses[course_id]["modified_at"] = datetime.now().isoformat()
-    courses[course_id]["modified_by"] = enrolling_username
+    Returns:
+        Tuple of (success, message)
+    """
+    if get_item('courses', course_id) is None:
+        return False, f"❌ Course with ID '{course_id}' not found."
     
-    save_data('courses', courses)
+    student_ids = get_by_index('students', 'grade_level', grade_level)
     
-    student_name = f"{students[student_id].get('first_name', '')} {students[student_id].get('last_name', '')}".strip()
-    course_name = courses[course_id].get('name', '')
+    if not student_ids:
+        return False, f"❌ No students found in grade {grade_level}."
     
-    return True, f"✅ {student_name} enrolled in {course_name} successfully."
+    return bulk_enroll(((student_id, course_id) for student_id in student_ids), enrolling_username)
 
 def unenroll_student_from_course(student_id: str, course_id: str, 
                                unenrolling_username: str) -> Tuple[bool, str]:
@@ -208,38 +320,41 @@ def unenroll_student_from_course(student_id: str, course_id: str,
     Returns:
         Tuple of (success, message)
     """
-    students = get_data('students')
-    courses = get_data('courses')
-    
-    if student_id not in students:
-        return False, f"❌ Student with ID '{student_id}' not found."
-    
-    if course_id not in courses:
-        return False, f"❌ Course with ID '{course_id}' not found."
-    
-    # Check if student is enrolled
-    if course_id not in students[student_id].get("courses", []):
-        return False, f"❌ Student is not enrolled in this course."
-    
-    # Remove course from student's courses
-    students[student_id]["courses"].remove(course_id)
-    students[student_id]["modified_at"] = datetime.now().isoformat()
-    students[student_id]["modified_by"] = unenrolling_username
-    
-    save_data('students', students)
-    
-    # Remove student from course's students
-    if "students" in courses[course_id] and student_id in courses[course_id]["students"]:
-        courses[course_id]["students"].remove(student_id)
-        courses[course_id]["modified_at"] = datetime.now().isoformat()
-        courses[course_id]["modified_by"] = unenrolling_username
+    def unenroll() -> Tuple[bool, str]:
+        students = get_data('students')
+        courses = get_data('courses')
         
-        save_data('courses', courses)
-    
-    student_name = f"{students[student_id].get('first_name', '')} {students[student_id].get('last_name', '')}".strip()
-    course_name = courses[course_id].get('name', '')
+        if student_id not in students:
+            return False, f"❌ Student with ID '{student_id}' not found."
+        
+        if course_id not in courses:
+            return False, f"❌ Course with ID '{course_id}' not found."
+        
+        # Check if student is enrolled
+        if course_id not in students[student_id].get("courses", []):
+            return False, f"❌ Student is not enrolled in this course."
+        
+        # Remove course from student's courses
+        students[student_id]["courses"].remove(course_id)
+        students[student_id]["modified_at"] = datetime.now().isoformat()
+        students[student_id]["modified_by"] = unenrolling_username
+        
+        save_data('students', students)
+        
+        # Remove student from course's students
+        if "students" in courses[course_id] and student_id in courses[course_id]["students"]:
+            courses[course_id]["students"].remove(student_id)
+            courses[course_id]["modified_at"] = datetime.now().isoformat()
+            courses[course_id]["modified_by"] = unenrolling_username
+            
+            save_data('courses', courses)
+        
+        student_name = f"{students[student_id].get('first_name', '')} {students[student_id].get('last_name', '')}".strip()
+        course_name = courses[course_id].get('name', '')
+        
+        return True, f"✅ {student_name} unenrolled from {course_name} successfully."
     
-    return True, f"✅ {student_name} unenrolled from {course_name} successfully."
+    return run_transaction(unenroll)
 
 def get_students_by_grade(grade_level: str) -> List[Dict[str, Any]]:
     """
@@ -251,12 +366,11 @@ def get_students_by_grade(grade_level: str) -> List[Dict[str, Any]]:
     Returns:
         List of student dictionaries
     """
-    students = get_data('students')
+    students = get_by_index('students', 'grade_level', grade_level)
     
     return [
         {**student, "id": student_id}
         for student_id, student in students.items()
-        if student.get("grade_level") == grade_level
     ]
 
 def get_student_courses(student_id: str) -> List[Dict[str, Any]]:
@@ -269,19 +383,19 @@ def get_student_courses(student_id: str) -> List[Dict[str, Any]]:
     Returns:
         List of course dictionaries
     """
-    students = get_data('students')
-    courses = get_data('courses')
+    student = get_item('students', student_id)
     
-    if student_id not in students:
+    if student is None:
         return []
     
-    student_courses = students[student_id].get("courses", [])
+    student_courses = []
     
-    return [
-        {**courses[course_id], "id": course_id}
-        for course_id in student_courses
-        if course_id in courses
-    ]
+    for course_id in student.get("courses", []):
+        course = get_item('courses', course_id)
+        if course is not None:
+            student_courses.append({**course, "id": course_id})
+    
+    return student_courses
 
 def get_student_grades(student_id: str) -> List[Dict[str, Any]]:
     """
@@ -293,10 +407,9 @@ def get_student_grades(student_id: str) -> List[Dict[str, Any]]:
     Returns:
         List of grade dictionaries
     """
-    grades = get_data('grades')
+    grades = get_by_index('grades', 'student_id', student_id)
     
     return [
         {**grade, "id": grade_id}
         for grade_id, grade in grades.items()
-        if grade.get("student_id") == student_id
     ]
\ No newline at end of file
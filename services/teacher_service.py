@@ -3,10 +3,13 @@ Teacher service for the School Management System
 """
 from datetime import datetime
 from typing import Dict, Any, List, Tuple, Optional
-from storage.datastore import get_data, save_data
+from storage.datastore import get_data, save_data, get_by_index, run_transaction
 from utils.constants import USER_ROLES
 from services.user_service import create_user
-from utils.helpers import generate_id
+from auth import rename_credentials
+from utils.helpers import (
+    generate_id, get_username_by_id, set_user_id_mapping, remove_user_id_mapping
+)
 
 def add_teacher(admin_username: str, username: str, password: str,
                first_name: str, last_name: str, email: str, phone: str,
@@ -28,48 +31,53 @@ def add_teacher(admin_username: str, username: str, password: str,
     Returns:
         Tuple of (success, message)
     """
-    # Create user account first
-    success, message, user_id = create_user(
-        username, 
-        password, 
-        USER_ROLES.TEACHER, 
-        first_name, 
-        last_name, 
-        email, 
-        phone, 
-        admin_username
-    )
-    
-    if not success:
-        return False, message
-    
-    # Generate teacher ID
-    teacher_id = generate_id("TCH")
-    
-    # Update user record with proper ID
-    users = get_data('users')
-    users[username]["id"] = teacher_id
-    save_data('users', users)
-    
-    # Create teacher record
-    teachers = get_data('teachers')
-    teachers[teacher_id] = {
-        "username": username,
-        "first_name": first_name,
-        "last_name": last_name,
-        "email": email,
-        "phone": phone,
-        "subjects": subjects,
-        "department": department,
-        "hire_date": datetime.now().isoformat(),
-        "classes": [],
-        "created_at": datetime.now().isoformat(),
-        "created_by": admin_username
-    }
-    
-    save_data('teachers', teachers)
+    def add() -> Tuple[bool, str]:
+        # Create user account first
+        success, message, user_id = create_user(
+            username, 
+            password, 
+            USER_ROLES.TEACHER, 
+            first_name, 
+            last_name, 
+            email, 
+            phone, 
+            admin_username
+        )
+        
+        if not success:
+            return False, message
+        
+        # Generate teacher ID
+        teacher_id = generate_id("TCH")
+        
+        # Update user record with proper ID
+        users = get_data('users')
+        users[username]["id"] = teacher_id
+        save_data('users', users)
+        remove_user_id_mapping(user_id)
+        set_user_id_mapping(teacher_id, username)
+        
+        # Create teacher record
+        teachers = get_data('teachers')
+        teachers[teacher_id] = {
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email,
+            "phone": phone,
+            "subjects": subjects,
+            "department": department,
+            "hire_date": datetime.now().isoformat(),
+            "classes": [],
+            "created_at": datetime.now().isoformat(),
+            "created_by": admin_username
+        }
+        
+        save_data('teachers', teachers)
+        
+        return True, f"✅ Teacher '{first_name} {last_name}' added successfully."
     
-    return True, f"✅ Teacher '{first_name} {last_name}' added successfully."
+    return run_transaction(add)
 
 def get_teacher_details(teacher_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -120,13 +128,9 @@ def update_teacher(teacher_id: str, update_data: Dict[str, Any],
     # If username is in update_data, update user record as well
     if "username" in update_data:
         users = get_data('users')
-        old_username = None
         
         # Find the corresponding user
-        for username, user in users.items():
-            if user.get("id") == teacher_id:
-                old_username = username
-                break
+        old_username = get_username_by_id(teacher_id)
         
         if old_username and old_username != update_data["username"]:
             # Create a new entry with updated username
@@ -140,6 +144,8 @@ def update_teacher(teacher_id: str, update_data: Dict[str, Any],
             del users[old_username]
             
             save_data('users', users)
+            rename_credentials(old_username, new_username)
+            set_user_id_mapping(teacher_id, new_username)
     
     return True, f"✅ Teacher information updated successfully."
 
@@ -156,40 +162,43 @@ def assign_class_to_teacher(teacher_id: str, course_id: str,
     Returns:
         Tuple of (success, message)
     """
-    teachers = get_data('teachers')
-    courses = get_data('courses')
-    
-    if teacher_id not in teachers:
-        return False, f"❌ Teacher with ID '{teacher_id}' not found."
-    
-    if course_id not in courses:
-        return False, f"❌ Course with ID '{course_id}' not found."
-    
-    # Check if teacher is already assigned to this class
-    if course_id in teachers[teacher_id].get("classes", []):
-        return False, f"❌ Teacher is already assigned to this class."
-    
-    # Add class to teacher's classes
-    if "classes" not in teachers[teacher_id]:
-        teachers[teacher_id]["classes"] = []
-    
-    teachers[teacher_id]["classes"].append(course_id)
-    teachers[teacher_id]["modified_at"] = datetime.now().isoformat()
-    teachers[teacher_id]["modified_by"] = assigning_username
-    
-    save_data('teachers', teachers)
-    
-    # Update course's teacher
-    courses[course_id]["teacher_id"] = teacher_id
-    courses[course_id]["modified_at"] = datetime.now().isoformat()
-    courses[course_id]["modified_by"] = assigning_username
-    
-    save_data('courses', courses)
-    
-    teacher_name = f"{teachers[teacher_id].get('first_name', '')} {teachers[teacher_id].get('last_name', '')}".strip()
-    course_name = courses[course_id].get('name', '')
+    def assign() -> Tuple[bool, str]:
+        teachers = get_data('teachers')
+        courses = get_data('courses')
+        
+        if teacher_id not in teachers:
+            return False, f"❌ Teacher with ID '{teacher_id}' not found."
+        
+        if course_id not in courses:
+            return False, f"❌ Course with ID '{course_id}' not found."
+        
+        # Check if teacher is already assigned to this class
+        if course_id in teachers[teacher_id].get("classes", []):
+            return False, f"❌ Teacher is already assigned to this class."
+        
+        # Add class to teacher's classes
+        if "classes" not in teachers[teacher_id]:
+            teachers[teacher_id]["classes"] = []
+        
+        teachers[teacher_id]["classes"].append(course_id)
+        teachers[teacher_id]["modified_at"] = datetime.now().isoformat()
+        teachers[teacher_id]["modified_by"] = assigning_username
+        
+        save_data('teachers', teachers)
+        
+        # Update course's teacher
+        courses[course_id]["teacher_id"] = teacher_id
+        courses[course_id]["modified_at"] = datetime.now().isoformat()
+        courses[course_id]["modified_by"] = assigning_username
+        
+        save_data('courses', courses)
+        
+        teacher_name = f"{teachers[teacher_id].get('first_name', '')} {teachers[teacher_id].get('last_name', '')}".strip()
+        course_name = courses[course_id].get('name', '')
+        
+        return True, f"✅ Assigned {course_name} to {teacher_name} successfully."
     
-    return True, f"✅ Assigned {course_name} to {teacher_name} successfully."
+    return run_transaction(assign)
 
 def unassign_class_from_teacher(teacher_id: str, course_id: str, 
                               unassigning_username: str) -> Tuple[bool, str]:
@@ -204,41 +213,44 @@ def unassign_class_from_teacher(teacher_id: str, course_id: str,
     Returns:
         Tuple of (success, message)
     """
-    teachers = get_data('teachers')
-    courses = get_data('courses')
-    
-    if teacher_id not in teachers:
-        return False, f"❌ Teacher with ID '{teacher_id}' not found."
-    
-    if course_id not in courses:
-        return False, f"❌ Course with ID '{course_id}' not found."
-    
-    # Check if teacher is assigned to this class
-    if course_id not in teachers[teacher_id].get("classes", []):
-        return False, f"❌ Teacher is not assigned to this class."
-    
-    # Check if this is the correct teacher for the course
-    if courses[course_id].get("teacher_id") != teacher_id:
-        return False, f"❌ This teacher is not the primary teacher for this course."
-    
-    # Remove class from teacher's classes
-    teachers[teacher_id]["classes"].remove(course_id)
-    teachers[teacher_id]["modified_at"] = datetime.now().isoformat()
-    teachers[teacher_id]["modified_by"] = unassigning_username
-    
-    save_data('teachers', teachers)
-    
-    # Update course's teacher
-    courses[course_id]["teacher_id"] = None
-    courses[course_id]["modified_at"] = datetime.now().isoformat()
-    courses[course_id]["modified_by"] = unassigning_username
-    
-    save_data('courses', courses)
-    
-    teacher_name = f"{teachers[teacher_id].get('first_name', '')} {teachers[teacher_id].get('last_name', '')}".strip()
-    course_name = courses[course_id].get('name', '')
+    def unassign() -> Tuple[bool, str]:
+        teachers = get_data('teachers')
+        courses = get_data('courses')
+        
+        if teacher_id not in teachers:
+            return False, f"❌ Teacher with ID '{teacher_id}' not found."
+        
+        if course_id not in courses:
+            return False, f"❌ Course with ID '{course_id}' not found."
+        
+        # Check if teacher is assigned to this class
+        if course_id not in teachers[teacher_id].get("classes", []):
+            return False, f"❌ Teacher is not assigned to this class."
+        
+        # Check if this is the correct teacher for the course
+        if courses[course_id].get("teacher_id") != teacher_id:
+            return False, f"❌ This teacher is not the primary teacher for this course."
+        
+        # Remove class from teacher's classes
+        teachers[teacher_id]["classes"].remove(course_id)
+        teachers[teacher_id]["modified_at"] = datetime.now().isoformat()
+        teachers[teacher_id]["modified_by"] = unassigning_username
+        
+        save_data('teachers', teachers)
+        
+        # Update course's teacher
+        courses[course_id]["teacher_id"] = None
+        courses[course_id]["modified_at"] = datetime.now().isoformat()
+        courses[course_id]["modified_by"] = unassigning_username
+        
+        save_data('courses', courses)
+        
+        teacher_name = f"{teachers[teacher_id].get('first_name', '')} {teachers[teacher_id].get('last_name', '')}".strip()
+        course_name = courses[course_id].get('name', '')
+        
+        return True, f"✅ Unassigned {course_name} from {teacher_name} successfully."
     
-    return True, f"✅ Unassigned {course_name} from {teacher_name} successfully."
+    return run_transaction(unassign)
 
 def get_teachers_by_department(department: str) -> List[Dict[str, Any]]:
     """
@@ -250,12 +262,11 @@ def get_teachers_by_department(department: str) -> List[Dict[str, Any]]:
     Returns:
         List of teacher dictionaries
     """
-    teachers = get_data('teachers')
+    teachers = get_by_index('teachers', 'department', department)
     
     return [
         {**teacher, "id": teacher_id}
         for teacher_id, teacher in teachers.items()
-        if teacher.get("department") == department
     ]
 
 def get_teachers_by_subject(subject: str) -> List[Dict[str, Any]]:
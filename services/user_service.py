@@ -3,10 +3,10 @@ User service for the School Management System
 """
 from datetime import datetime
 from typing import Dict, Any, List, Tuple, Optional
-from auth import hash_password
-from storage.datastore import get_data, save_data
+from auth import set_password
+from storage.datastore import get_data, save_data, get_item, add_item, run_transaction
 from utils.constants import USER_ROLES
-from utils.helpers import validate_email, validate_phone
+from utils.helpers import validate_email, validate_phone, set_user_id_mapping
 
 def create_user(username: str, password: str, role: str, 
                 first_name: str = "", last_name: str = "", 
@@ -38,33 +38,34 @@ def create_user(username: str, password: str, role: str,
     if phone and not validate_phone(phone):
         return False, "❌ Invalid phone number format.", None
     
-    # Check if username already exists
-    users = get_data('users')
-    if username in users:
-        return False, "❌ Username already exists.", None
-    
-    # Generate user ID based on role
-    import uuid
-    user_id = str(uuid.uuid4())
-    
-    # Create user
-    users[username] = {
-        "id": user_id,
-        "username": username,
-        "password": hash_password(password),
-        "role": role,
-        "first_name": first_name,
-        "last_name": last_name,
-        "email": email,
-        "phone": phone,
-        "created_at": datetime.now().isoformat(),
-        "created_by": created_by,
-        "is_active": True
-    }
-    
-    save_data('users', users)
-    
-    return True, f"✅ User '{username}' created successfully.", user_id
+    def create() -> Tuple[bool, str, Optional[str]]:
+        # Check if username already exists
+        if get_item('users', username) is not None:
+            return False, "❌ Username already exists.", None
+        
+        # Generate user ID based on role
+        import uuid
+        user_id = str(uuid.uuid4())
+        
+        # Create the user, password and ID mapping together
+        add_item('users', username, {
+            "id": user_id,
+            "username": username,
+            "role": role,
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email,
+            "phone": phone,
+            "created_at": datetime.now().isoformat(),
+            "created_by": created_by,
+            "is_active": True
+        })
+        set_password(username, password)
+        set_user_id_mapping(user_id, username)
+        
+        return True, f"✅ User '{username}' created successfully.", user_id
+    
+    return run_transaction(create)
 
 def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     """
@@ -76,8 +77,7 @@ def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     Returns:
         User data if found, None otherwise
     """
-    users = get_data('users')
-    return users.get(username)
+    return get_item('users', username)
 
 def list_users_by_role(role: str) -> List[Dict[str, Any]]:
     """
@@ -148,7 +148,7 @@ def update_user_password(username: str, new_password: str,
         return False, f"❌ User '{username}' not found."
     
     # Update password
-    users[username]["password"] = hash_password(new_password)
+    set_password(username, new_password)
     
     # Update modification metadata
     users[username]["modified_at"] = datetime.now().isoformat()
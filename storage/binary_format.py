@@ -0,0 +1,574 @@
+"""
+Compact binary snapshot format for the School Management System data store
+
+A collection (item_id -> JSON value) is stored as:
+    header
+    records     one per item, in insertion order
+    constants   every distinct scalar (string, number, bool, None) once
+    shapes      every distinct tuple of dict keys once
+    index       item IDs, their record offsets and the IDs' sorted order
+
+Inside a record every value is a little-endian u32 word. A word below
+NESTED refers to the constants table; otherwise the low bits are the offset,
+from the start of the record, of a node:
+    dict    <shape id> <one word per key>
+    list    LIST <count> <one word per element>
+    table   TABLE <shape id> <count> <count * keys words>
+
+A table is a list of dicts that share their keys and hold only scalars,
+such as the 'students' of an attendance record. Repeated strings like
+'student_id' or 'present' are therefore stored once and cost four bytes
+per use, and decoding builds dicts with C-level zip/map calls instead of
+parsing text.
+"""
+import sys
+import struct
+from array import array
+from itertools import repeat
+from typing import Dict, Any, List, Tuple, Optional, Iterator
+
+MAGIC = b"SMSB"
+FORMAT_VERSION = 1
+
+# Header: magic, version, record count, constant count, shape count,
+# constants offset, shapes offset, index offset
+_HEADER = struct.Struct("<4sHxxQQQQQQ")
+
+# Words at or above NESTED point at a node; LIST and TABLE mark node kinds
+NESTED = 0x80000000
+LIST = 0xFFFFFFFF
+TABLE = 0xFFFFFFFE
+
+# Constant types
+_STR, _INT, _FLOAT, _BIGINT, _TRUE, _FALSE, _NONE = range(7)
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_INT_MIN, _INT_MAX = -(2 ** 63), 2 ** 63 - 1
+
+def is_binary(head: bytes) -> bool:
+    """
+    Check whether file contents start like a binary snapshot.
+    
+    Args:
+        head: First bytes of the file
+    
+    Returns:
+        True for the binary format, False otherwise (e.g. JSON)
+    """
+    return head[:len(MAGIC)] == MAGIC
+
+class _Encoder:
+    """Builds the constants, shapes and records of one snapshot."""
+    
+    def __init__(self) -> None:
+        self.const_ids: Dict[Tuple[type, Any], int] = {}
+        self.types = bytearray()
+        self.slots: List[int] = []
+        self.by_type: List[List[Any]] = [[] for _ in range(7)]
+        self.shape_ids: Dict[Tuple[str, ...], int] = {}
+        self.shapes: List[Tuple[int, ...]] = []
+    
+    def const(self, value: Any) -> int:
+        """Get the constant ref of a scalar, adding it if new."""
+        key = (value.__class__, value)
+        ref = self.const_ids.get(key)
+        if ref is not None:
+            return ref
+        
+        if value is True:
+            kind = _TRUE
+        elif value is False:
+            kind = _FALSE
+        elif value is None:
+            kind = _NONE
+        elif isinstance(value, str):
+            kind = _STR
+        elif isinstance(value, int):
+            kind = _INT if _INT_MIN <= value <= _INT_MAX else _BIGINT
+        elif isinstance(value, float):
+            kind = _FLOAT
+        else:
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        
+        ref = len(self.types)
+        if ref >= NESTED:
+            raise ValueError("Too many distinct values for the binary format")
+        
+        self.const_ids[key] = ref
+        self.types.append(kind)
+        self.slots.append(len(self.by_type[kind]))
+        self.by_type[kind].append(value)
+        return ref
+    
+    def shape(self, keys: Tuple[str, ...]) -> int:
+        """Get the id of a tuple of dict keys, adding it if new."""
+        shape_id = self.shape_ids.get(keys)
+        if shape_id is None:
+            shape_id = len(self.shapes)
+            if shape_id >= TABLE:
+                raise ValueError("Too many distinct dict shapes for the binary format")
+            self.shape_ids[keys] = shape_id
+            self.shapes.append(tuple(self.const(key) for key in keys))
+        return shape_id
+    
+    def value(self, value: Any, record: bytearray) -> int:
+        """
+        Encode a value of a record.
+        
+        Args:
+            value: JSON value
+            record: Record being built; nested nodes are appended to it
+        
+        Returns:
+            Word referring to the value
+        """
+        if isinstance(value, dict):
+            keys = tuple(key if isinstance(key, str) else str(key) for key in value)
+            offset = len(record)
+            record.extend(bytes(4 * (len(keys) + 1)))
+            words = [self.value(item, record) for item in value.values()]
+            struct.pack_into(f"<{len(words) + 1}I", record, offset, self.shape(keys), *words)
+            return NESTED + offset
+        
+        if isinstance(value, (list, tuple)):
+            offset = len(record)
+            
+            if _is_table(value):
+                keys = tuple(value[0])
+                words = [self.const(item) for row in value for item in row.values()]
+                record.extend(struct.pack(f"<3I{len(words)}I", TABLE, self.shape(keys), len(value), *words))
+                return NESTED + offset
+            
+            record.extend(bytes(4 * (len(value) + 2)))
+            words = [self.value(item, record) for item in value]
+            struct.pack_into(f"<{len(words) + 2}I", record, offset, LIST, len(words), *words)
+            return NESTED + offset
+        
+        return self.const(value)
+
+def _is_table(rows: Any) -> bool:
+    """Check whether a list holds two or more dicts with equal keys and scalar values."""
+    if len(rows) < 2 or not isinstance(rows[0], dict):
+        return False
+    
+    keys = list(rows[0])
+    if not keys or not all(isinstance(key, str) for key in keys):
+        return False
+    
+    for row in rows:
+        if not isinstance(row, dict) or list(row) != keys:
+            return False
+        for item in row.values():
+            if isinstance(item, (dict, list, tuple)):
+                return False
+    
+    return True
+
+def _pack_strings(strings: List[str]) -> bytes:
+    """Pack strings as (count + 1) u64 byte offsets followed by their UTF-8."""
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = [0]
+    for chunk in encoded:
+        offsets.append(offsets[-1] + len(chunk))
+    return struct.pack(f"<{len(offsets)}Q", *offsets) + b"".join(encoded)
+
+def encode(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize a collection to the binary format.
+    
+    Args:
+        data: Collection data (item_id -> JSON value)
+    
+    Returns:
+        Encoded snapshot
+    """
+    encoder = _Encoder()
+    chunks = []
+    offsets = []
+    position = _HEADER.size
+    
+    for item_id, item in data.items():
+        record = bytearray(4)
+        _U32.pack_into(record, 0, encoder.value(item, record))
+        offsets.append(position)
+        position += len(record)
+        chunks.append(record)
+    
+    ids = [item_id if isinstance(item_id, str) else str(item_id) for item_id in data]
+    
+    # Constants: types and per-type slots, then each type's payload
+    by_type = encoder.by_type
+    constants = b"".join([
+        struct.pack(f"<{len(by_type)}Q", *(len(values) for values in by_type)),
+        bytes(encoder.types),
+        struct.pack(f"<{len(encoder.slots)}I", *encoder.slots),
+        _pack_strings(by_type[_STR]),
+        struct.pack(f"<{len(by_type[_INT])}q", *by_type[_INT]),
+        struct.pack(f"<{len(by_type[_FLOAT])}d", *by_type[_FLOAT]),
+        _pack_strings([str(value) for value in by_type[_BIGINT]])
+    ])
+    constants_offset = position
+    position += len(constants)
+    
+    shapes = b"".join(
+        struct.pack(f"<I{len(keys)}I", len(keys), *keys) for keys in encoder.shapes
+    )
+    shapes_offset = position
+    position += len(shapes)
+    
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    index = b"".join([
+        _pack_strings(ids),
+        struct.pack(f"<{len(offsets)}Q", *offsets),
+        struct.pack(f"<{len(order)}I", *order)
+    ])
+    
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(ids), len(encoder.types),
+                          len(encoder.shapes), constants_offset, shapes_offset, position)
+    
+    return b"".join([header, *chunks, constants, shapes, index])
+
+class Snapshot:
+    """
+    Read access to an encoded snapshot held in any buffer (bytes, mmap).
+    
+    Constants and IDs are decoded on first use, one at a time, so looking up
+    a few items of a large snapshot only touches the bytes they need.
+    """
+    
+    def __init__(self, buffer: Any) -> None:
+        header = _HEADER.unpack_from(buffer, 0)
+        if header[0] != MAGIC:
+            raise ValueError("Not a binary snapshot")
+        if header[1] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary snapshot version {header[1]}")
+        
+        self.buffer = buffer
+        (_, _, self.count, self.const_count, self.shape_count,
+         self.constants_offset, self.shapes_offset, index_offset) = header
+        constants_offset = self.constants_offset
+        
+        # Constants section layout
+        counts = struct.unpack_from("<7Q", buffer, constants_offset)
+        self.type_counts = counts
+        self.types_offset = constants_offset + 56
+        self.slots_offset = self.types_offset + self.const_count
+        self.strings = self.slots_offset + 4 * self.const_count
+        self.strings_data = self.strings + 8 * (counts[_STR] + 1)
+        self.ints_offset = self.strings_data + _U64.unpack_from(buffer, self.strings + 8 * counts[_STR])[0]
+        self.floats_offset = self.ints_offset + 8 * counts[_INT]
+        self.bigints = self.floats_offset + 8 * counts[_FLOAT]
+        self.bigints_data = self.bigints + 8 * (counts[_BIGINT] + 1)
+        
+        # Index section layout
+        self.ids = index_offset
+        self.ids_data = index_offset + 8 * (self.count + 1)
+        self.offsets_offset = self.ids_data + _U64.unpack_from(buffer, index_offset + 8 * self.count)[0]
+        self.order_offset = self.offsets_offset + 8 * self.count
+        
+        self._consts: Dict[int, Any] = {}
+        self._shapes: Optional[List[Tuple[str, ...]]] = None
+    
+    # Lazy access
+    
+    def _string(self, table: int, data: int, slot: int) -> str:
+        """Decode one string of a packed string list."""
+        start, end = struct.unpack_from("<2Q", self.buffer, table + 8 * slot)
+        return bytes(self.buffer[data + start:data + end]).decode("utf-8")
+    
+    def _const(self, ref: int) -> Any:
+        """Decode one constant."""
+        value = self._consts.get(ref, self)
+        if value is not self:
+            return value
+        
+        kind = self.buffer[self.types_offset + ref]
+        slot = _U32.unpack_from(self.buffer, self.slots_offset + 4 * ref)[0]
+        
+        if kind == _STR:
+            value = self._string(self.strings, self.strings_data, slot)
+        elif kind == _INT:
+            value = struct.unpack_from("<q", self.buffer, self.ints_offset + 8 * slot)[0]
+        elif kind == _FLOAT:
+            value = struct.unpack_from("<d", self.buffer, self.floats_offset + 8 * slot)[0]
+        elif kind == _BIGINT:
+            value = int(self._string(self.bigints, self.bigints_data, slot))
+        else:
+            value = {_TRUE: True, _FALSE: False, _NONE: None}[kind]
+        
+        self._consts[ref] = value
+        return value
+    
+    def _load_shapes(self, const: Any) -> List[Tuple[str, ...]]:
+        """Decode the shapes table, once."""
+        if self._shapes is None:
+            shapes = []
+            offset = self.shapes_offset
+            for _ in range(self.shape_count):
+                size = _U32.unpack_from(self.buffer, offset)[0]
+                shapes.append(tuple(map(const, struct.unpack_from(f"<{size}I", self.buffer, offset + 4))))
+                offset += 4 * (size + 1)
+            self._shapes = shapes
+        return self._shapes
+    
+    def _shape(self, shape_id: int) -> Tuple[str, ...]:
+        """Get the keys of a shape."""
+        return self._load_shapes(self._const)[shape_id]
+    
+    def item_id(self, position: int) -> str:
+        """
+        Get the ID of the item at a position.
+        
+        Args:
+            position: Position of the item in insertion order
+        
+        Returns:
+            Item ID
+        """
+        return self._string(self.ids, self.ids_data, position)
+    
+    def find(self, item_id: str) -> Optional[int]:
+        """
+        Binary search the index for an item.
+        
+        Args:
+            item_id: ID of the item
+        
+        Returns:
+            Position of the item in insertion order, or None if absent
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            position = _U32.unpack_from(self.buffer, self.order_offset + 4 * middle)[0]
+            candidate = self.item_id(position)
+            
+            if candidate == item_id:
+                return position
+            if candidate < item_id:
+                low = middle + 1
+            else:
+                high = middle
+        
+        return None
+    
+    def get(self, item_id: str) -> Optional[Any]:
+        """
+        Decode a single item.
+        
+        Args:
+            item_id: ID of the item
+        
+        Returns:
+            Item value, or None if absent
+        """
+        position = self.find(item_id)
+        if position is None:
+            return None
+        return self.record(position, self._const, self._shape)
+    
+    def _words(self, start: int, end: int) -> array:
+        """Read a run of u32 words as an array."""
+        words = array("I")
+        words.frombytes(self.buffer[start:end])
+        if sys.byteorder == "big":
+            words.byteswap()
+        return words
+    
+    def _record_end(self, position: int) -> int:
+        """Get the offset just past the record at a position."""
+        if position + 1 < self.count:
+            return _U64.unpack_from(self.buffer, self.offsets_offset + 8 * (position + 1))[0]
+        return self.constants_offset
+    
+    def record(self, position: int, const: Any, shape: Any) -> Any:
+        """
+        Decode the item at a position.
+        
+        Args:
+            position: Position of the item in insertion order
+            const: Function mapping a constant ref to its value
+            shape: Function mapping a shape id to its keys
+        
+        Returns:
+            Item value
+        """
+        start = _U64.unpack_from(self.buffer, self.offsets_offset + 8 * position)[0]
+        words = self._words(start, self._record_end(position))
+        return _value(words, words[0], 0, const, shape)
+    
+    # Bulk access
+    
+    def _all_strings(self, table: int, data: int, count: int) -> List[str]:
+        """Decode a whole packed string list."""
+        offsets = struct.unpack_from(f"<{count + 1}Q", self.buffer, table)
+        raw = bytes(self.buffer[data:data + offsets[-1]])
+        text = raw.decode("utf-8")
+        
+        if len(text) == len(raw):
+            # ASCII: byte offsets are character offsets
+            return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        return [raw[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+    
+    def constants(self) -> List[Any]:
+        """
+        Decode the whole constants table.
+        
+        Returns:
+            List of every constant, indexed by ref
+        """
+        counts = self.type_counts
+        per_type = [
+            iter(self._all_strings(self.strings, self.strings_data, counts[_STR])),
+            iter(struct.unpack_from(f"<{counts[_INT]}q", self.buffer, self.ints_offset)),
+            iter(struct.unpack_from(f"<{counts[_FLOAT]}d", self.buffer, self.floats_offset)),
+            map(int, self._all_strings(self.bigints, self.bigints_data, counts[_BIGINT])),
+            repeat(True),
+            repeat(False),
+            repeat(None)
+        ]
+        types = bytes(self.buffer[self.types_offset:self.types_offset + self.const_count])
+        return list(map(next, map(per_type.__getitem__, types)))
+    
+    def ids_in_order(self) -> List[str]:
+        """
+        Decode every item ID.
+        
+        Returns:
+            Item IDs in insertion order
+        """
+        return self._all_strings(self.ids, self.ids_data, self.count)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Decode the whole collection.
+        
+        Returns:
+            Collection data (item_id -> value)
+        """
+        const = self.constants().__getitem__
+        shapes = self._load_shapes(const)
+        shape = shapes.__getitem__
+        
+        # All records as one word array, and each record's first word in it
+        words = self._words(_HEADER.size, self.constants_offset)
+        offsets = array("Q")
+        offsets.frombytes(self.buffer[self.offsets_offset:self.offsets_offset + 8 * self.count])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        
+        ids = self.ids_in_order()
+        data = _decode_uniform(words, self.count, ids, const, shapes)
+        if data is not None:
+            return data
+        
+        data = {}
+        for item_id, offset in zip(ids, offsets):
+            base = (offset - _HEADER.size) >> 2
+            word = words[base]
+            
+            # Fast path for the common case of a flat dict
+            if word >= NESTED:
+                node = base + ((word - NESTED) >> 2)
+                head = words[node]
+                if head < TABLE:
+                    keys = shapes[head]
+                    values = words[node + 1:node + 1 + len(keys)]
+                    if not values or max(values) < NESTED:
+                        data[item_id] = dict(zip(keys, map(const, values)))
+                        continue
+            
+            data[item_id] = _value(words, word, base, const, shape)
+        
+        return data
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids_in_order())
+
+def _decode_uniform(words: array, count: int, ids: List[str], const: Any,
+                    shapes: List[Tuple[str, ...]]) -> Optional[Dict[str, Any]]:
+    """
+    Decode a collection whose items are all flat dicts with the same keys,
+    such as grades or submissions, column by column.
+    
+    Args:
+        words: Word array holding every record
+        count: Number of records
+        ids: Item IDs in insertion order
+        const: Function mapping a constant ref to its value
+        shapes: Keys of every shape
+    
+    Returns:
+        Collection data, or None if the records are not uniform
+    """
+    if not count or len(words) % count or words[0] != NESTED + 4:
+        return None
+    
+    stride = len(words) // count
+    head = words[1]
+    # Empty dicts have no columns to rebuild the rows from
+    if head >= TABLE or stride == 2 or len(shapes[head]) != stride - 2:
+        return None
+    if words[0::stride].count(NESTED + 4) != count or words[1::stride].count(head) != count:
+        return None
+    
+    columns = [words[column::stride] for column in range(2, stride)]
+    if any(max(column) >= NESTED for column in columns):
+        return None
+    
+    rows = zip(*[map(const, column) for column in columns])
+    return dict(zip(ids, map(dict, map(zip, repeat(shapes[head]), rows))))
+
+def _value(words: array, word: int, base: int, const: Any, shape: Any) -> Any:
+    """
+    Decode the value a word refers to.
+    
+    Args:
+        words: Word array holding the record
+        word: Word referring to the value
+        base: Index of the record's first word in the array
+        const: Function mapping a constant ref to its value
+        shape: Function mapping a shape id to its keys
+    
+    Returns:
+        Decoded value
+    """
+    if word < NESTED:
+        return const(word)
+    
+    node = base + ((word - NESTED) >> 2)
+    head = words[node]
+    
+    if head == LIST:
+        items = words[node + 2:node + 2 + words[node + 1]]
+        if not items or max(items) < NESTED:
+            return list(map(const, items))
+        return [const(item) if item < NESTED else _value(words, item, base, const, shape) for item in items]
+    
+    if head == TABLE:
+        keys = shape(words[node + 1])
+        width = len(keys)
+        start = node + 3
+        values = iter(map(const, words[start:start + width * words[node + 2]]))
+        return list(map(dict, map(zip, repeat(keys), zip(*[values] * width))))
+    
+    keys = shape(head)
+    items = words[node + 1:node + 1 + len(keys)]
+    if not items or max(items) < NESTED:
+        return dict(zip(keys, map(const, items)))
+    return dict(zip(keys, [
+        const(item) if item < NESTED else _value(words, item, base, const, shape) for item in items
+    ]))
+
+def decode(buffer: Any) -> Dict[str, Any]:
+    """
+    Deserialize a binary snapshot.
+    
+    Args:
+        buffer: Encoded snapshot (bytes or any buffer)
+    
+    Returns:
+        Collection data (item_id -> JSON value)
+    """
+    return Snapshot(buffer).to_dict()
@@ -1,10 +1,83 @@
 """
 Data storage module for the School Management System
+
+Several processes may share one data directory. Reads hold a shared lock
+on the collection and writes an exclusive one (see storage.locks), and
+every write bumps the collection's version. A collection read with
+get_data() and written back with save_data() is merged with whatever other
+writers committed in between, item by item; changing an item someone else
+changed in the meantime raises ConcurrentUpdateError instead of losing
+their write.
 """
 import os
+import copy
 import json
-from typing import Dict, Any, Optional, List
-from utils.constants import DATA_DIR
+import mmap
+import time
+import struct
+import uuid
+import pickle
+import random
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Callable, Iterable
+from utils.constants import (
+    DATA_DIR, JOURNAL_COMPACT_BYTES, STORAGE_BACKEND, CAS_MAX_RETRIES, CAS_BACKOFF_SECONDS,
+    SNAPSHOT_FORMATS, DEFAULT_SNAPSHOT_FORMAT
+)
+from storage import journal, indexes, locks, fileio, binary_format
+
+# In-process read cache shared by every caller of get_data().
+# Maps data_type -> {"stamp": snapshot stamp, "journal": (inode, offset) replayed,
+#                    "state": (version, generation) from storage.locks,
+#                    "data": parsed data, "blob": pickled copy,
+#                    "indexes": secondary indexes over data, if declared}
+_cache: Dict[str, Dict[str, Any]] = {}
+_cache_stats = {"hits": 0, "misses": 0}
+_cache_lock = threading.RLock()
+
+# Memory-mapped binary snapshots, for reading single items of collections
+# that aren't cached in full. Maps data_type ->
+#   {"stamp", "journal", "state": as in _cache,
+#    "snapshot": binary_format.Snapshot over the mapping,
+#    "pending": {item_id: journal records for the item, in order}}
+_mapped: Dict[str, Dict[str, Any]] = {}
+
+# Collections with a background compaction in flight
+_compacting = set()
+
+# Collections already imported into the SQLite engine by this process
+_sqlite_ready = set()
+
+# Per-thread unit of work opened by transaction()
+_tx_state = threading.local()
+
+# Per-thread (version, data) of the collections last copied out by get_data(),
+# used to merge the copy back in save_data()
+_read_state = threading.local()
+
+# Commit manifest for multi-collection transactions (see transaction())
+_TX_MANIFEST = ".transaction.json"
+
+# Lock serializing commit manifests across processes
+_TX_LOCK = ".transaction"
+
+# File extension of each snapshot format
+_SNAPSHOT_EXTENSIONS = {"json": ".json", "binary": ".bin"}
+
+# Lock every writer holds shared; an exclusive holder has the store to itself
+_WRITE_QUEUE = ".writers"
+
+class ConcurrentUpdateError(Exception):
+    """
+    Raised when a write would overwrite items another writer changed
+    since they were read.
+    """
+    
+    def __init__(self, data_type: str, item_ids: List[str]) -> None:
+        self.data_type = data_type
+        self.item_ids = item_ids
+        super().__init__(f"Concurrent update to '{data_type}': {', '.join(item_ids[:5])}")
 
 def initialize_data_store() -> None:
     """
@@ -15,62 +88,835 @@ def initialize_data_store() -> None:
         os.makedirs(DATA_DIR)
     
     # Create each data file if it doesn't exist
-    data_files = [
-        'users.json',
-        'students.json',
-        'teachers.json',
-        'staff.json',
-        'parents.json',
-        'courses.json',
-        'assignments.json',
-        'attendance.json',
-        'events.json',
-        'announcements.json',
-        'fees.json',
-        'grades.json',
-        'messages.json'
+    data_types = [
+        'users',
+        'credentials',
+        'students',
+        'teachers',
+        'staff',
+        'parents',
+        'courses',
+        'assignments',
+        'attendance',
+        'events',
+        'announcements',
+        'fees',
+        'grades',
+        'messages',
+        'user_ids',
+        'attendance_stats',
+        'submission_index',
+        'course_assignments',
+        'gradebook',
+        'message_threads'
     ]
     
-    for file_name in data_files:
-        file_path = os.path.join(DATA_DIR, file_name)
-        if not os.path.exists(file_path):
-            with open(file_path, 'w') as f:
-                json.dump({}, f)
+    # Finish a transaction commit interrupted by a crash
+    with locks.locked(_TX_LOCK, exclusive=True):
+        _recover_transaction()
+    
+    _remove_stray_temp_files()
+    
+    for data_type in data_types:
+        try:
+            # Exclusive create, so a concurrent first write is never clobbered
+            fd = os.open(_file_path(data_type), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            continue
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_serialize(data_type, {}))
+
+def _remove_stray_temp_files() -> None:
+    """
+    Remove temp files left behind by writers that crashed mid-write.
+    
+    Each temp file is only written under its collection's writer lock, so
+    one found while holding that lock belongs to no live writer.
+    """
+    suffixes = [extension + fileio.TEMP_SUFFIX for extension in _SNAPSHOT_EXTENSIONS.values()]
+    suffixes.append(".json.compact")
+    
+    for file_name in os.listdir(DATA_DIR):
+        for suffix in suffixes:
+            if file_name.endswith(suffix):
+                data_type = file_name[:-len(suffix)]
+                if data_type.endswith(".index"):
+                    data_type = data_type[:-len(".index")]
+                
+                with _writing(data_type):
+                    try:
+                        os.remove(os.path.join(DATA_DIR, file_name))
+                    except FileNotFoundError:
+                        pass
+
+def _snapshot_format(data_type: str) -> str:
+    """
+    Get the format a collection's snapshot is written in.
+    
+    The configured format applies to new snapshots; an existing one keeps
+    its format until converted with convert_snapshot().
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        "json" or "binary"
+    """
+    configured = SNAPSHOT_FORMATS.get(data_type, DEFAULT_SNAPSHOT_FORMAT)
+    if os.path.exists(_file_path(data_type, configured)):
+        return configured
+    
+    for snapshot_format in _SNAPSHOT_EXTENSIONS:
+        if snapshot_format != configured and os.path.exists(_file_path(data_type, snapshot_format)):
+            return snapshot_format
+    return configured
+
+def _file_path(data_type: str, snapshot_format: Optional[str] = None) -> str:
+    """
+    Get the path of the file backing a collection.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+        snapshot_format: Format of the file, the collection's own by default
+    
+    Returns:
+        Absolute path of the collection file
+    """
+    extension = _SNAPSHOT_EXTENSIONS[snapshot_format or _snapshot_format(data_type)]
+    return os.path.join(DATA_DIR, f"{data_type}{extension}")
+
+def _serialize(data_type: str, data: Dict[str, Any]) -> bytes:
+    """
+    Encode a collection in its snapshot format.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+        data: Collection data
+    
+    Returns:
+        File contents
+    """
+    return _encode(_snapshot_format(data_type), data)
+
+def _encode(snapshot_format: str, data: Dict[str, Any]) -> bytes:
+    """
+    Encode a collection in a given snapshot format.
+    
+    Args:
+        snapshot_format: "json" or "binary"
+        data: Collection data
+    
+    Returns:
+        File contents
+    """
+    if snapshot_format == "binary":
+        return binary_format.encode(data)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+def _read_snapshot(file_path: str) -> Dict[str, Any]:
+    """
+    Read a snapshot file in either format.
+    
+    Args:
+        file_path: Path of the file
+    
+    Returns:
+        Collection data, empty if the file is empty or invalid
+    
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    
+    try:
+        if binary_format.is_binary(raw):
+            return binary_format.decode(raw)
+        return json.loads(raw)
+    except (ValueError, struct.error):
+        # If file is empty/invalid, start from an empty snapshot
+        return {}
+
+def convert_snapshot(data_type: str) -> bool:
+    """
+    Rewrite a collection's snapshot in its configured format.
+    
+    The snapshot in the other format is removed, so only run it when the
+    format is meant to change (see tools.convert_data).
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+    
+    Returns:
+        bool: True if the snapshot was converted
+    """
+    configured = SNAPSHOT_FORMATS.get(data_type, DEFAULT_SNAPSHOT_FORMAT)
+    
+    with _writing(data_type):
+        file_path = _file_path(data_type)
+        target_path = _file_path(data_type, configured)
+        if file_path == target_path or not os.path.exists(file_path):
+            return False
+        
+        fileio.write_bytes_atomic(target_path, _encode(configured, _read_snapshot(file_path)))
+        os.remove(file_path)
+        locks.bump_generation(data_type)
+        _cache.pop(data_type, None)
+    return True
+
+def _file_stamp(file_path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Get a stamp identifying the current version of a file on disk.
+    
+    Args:
+        file_path: Path of the file
+    
+    Returns:
+        Tuple of (mtime_ns, size, inode), or None if the file doesn't exist
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _copy_data(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Make a private deep copy of a cached collection.
+    
+    The cached data only ever holds JSON types, so a pickle round trip gives
+    the same result as copy.deepcopy() at a fraction of the cost. The pickled
+    form is kept on the cache entry so repeated hits only pay for the load.
+    
+    Args:
+        entry: Cache entry holding the parsed data
+    
+    Returns:
+        Deep copy of the cached data
+    """
+    if entry.get("blob") is None:
+        entry["blob"] = pickle.dumps(entry["data"], pickle.HIGHEST_PROTOCOL)
+    return pickle.loads(entry["blob"])
+
+def _uses_sqlite(data_type: str) -> bool:
+    """
+    Check whether a collection lives in the SQLite engine.
+    
+    The first time a collection is used with the SQLite engine, its JSON
+    snapshot and journal (if any) are imported into the database.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        True if the collection is stored in SQLite, False for JSON files
+    """
+    if STORAGE_BACKEND != "sqlite":
+        return False
+    
+    if data_type in _sqlite_ready:
+        return True
+    
+    from storage import sqlite_backend
+    
+    with _cache_lock:
+        if not sqlite_backend.has_collection(data_type):
+            entry = _load_entry(data_type)
+            sqlite_backend.replace_all(data_type, entry["data"] if entry else {})
+            _cache.pop(data_type, None)
+        _sqlite_ready.add(data_type)
+    
+    return True
+
+def _load_entry(data_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a collection from its snapshot and replay its journal.
+    
+    Args:
+        data_type: Type of data to load (e.g., 'users', 'students')
+    
+    Returns:
+        New cache entry, or None if there is neither a snapshot nor a journal
+    """
+    file_path = _file_path(data_type)
+    stamp = _file_stamp(file_path)
+    
+    try:
+        data = _read_snapshot(file_path)
+    except FileNotFoundError:
+        data = {}
+    
+    records, journal_state = journal.read_records(data_type)
+    
+    if stamp is None and journal_state is None:
+        return None
+    
+    collection_indexes = None
+    if indexes.indexed_fields(data_type):
+        collection_indexes = indexes.load(data_type, stamp)
+        if collection_indexes is None:
+            collection_indexes = indexes.build(data_type, data)
+    
+    _replay(data, collection_indexes, records)
+    
+    return {
+        "stamp": stamp,
+        "journal": journal_state,
+        "data": data,
+        "blob": None,
+        "indexes": collection_indexes
+    }
 
-def get_data(data_type: str) -> Dict[str, Any]:
+def _replay(data: Dict[str, Any], collection_indexes: Optional[indexes.Indexes],
+            records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply journal records to a collection and keep its indexes in step.
+    
+    Args:
+        data: Collection data (modified in place)
+        collection_indexes: Indexes over data, or None if it has none
+        records: Journal records in append order
+    
+    Returns:
+        The updated collection data
+    """
+    if not collection_indexes:
+        return journal.apply_records(data, records)
+    
+    for record in records:
+        item_id = record.get("id")
+        old_item = data.get(item_id)
+        journal.apply_records(data, [record])
+        indexes.update(collection_indexes, item_id, old_item, data.get(item_id))
+    
+    return data
+
+def _refresh_entry(data_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Bring the cached copy of a collection up to date.
+    
+    A cached entry is reused while the snapshot's stamp is unchanged. If the
+    journal only grew, just the new records are replayed on top of it.
+    Anything but an exact hit is read under the collection's reader lock,
+    so a snapshot is never paired with a journal from another version.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Up-to-date cache entry, or None if the collection doesn't exist
+    """
+    if _uses_sqlite(data_type):
+        return _refresh_sqlite_entry(data_type)
+    
+    stamp = _file_stamp(_file_path(data_type))
+    journal_state = journal.journal_state(data_type)
+    
+    with _cache_lock:
+        entry = _cache.get(data_type)
+        
+        if (entry is not None and entry["stamp"] == stamp and entry["journal"] == journal_state
+                and entry.get("state") == locks.peek_state(data_type)):
+            _cache_stats["hits"] += 1
+            return entry
+        
+        with locks.locked(data_type):
+            return _reload_entry(data_type)
+
+def _reload_entry(data_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Bring a JSON collection's cache entry up to date from disk.
+    
+    The caller must hold _cache_lock and the collection's lock.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Up-to-date cache entry, or None if the collection doesn't exist
+    """
+    stamp = _file_stamp(_file_path(data_type))
+    journal_state = journal.journal_state(data_type)
+    state = locks.read_state(data_type)
+    
+    entry = _cache.get(data_type)
+    
+    # File stamps can repeat (coarse mtimes, reused inodes); the generation
+    # in the lock file tells whether the snapshot is still the cached one
+    if entry is not None and entry["stamp"] == stamp and entry.get("state", (0, -1))[1] == state[1]:
+        replayed = entry["journal"]
+        
+        if replayed == journal_state and entry["state"] == state:
+            _cache_stats["hits"] += 1
+            return entry
+        
+        if (replayed is not None and journal_state is not None
+                and replayed[0] == journal_state[0]
+                and replayed[1] <= journal_state[1]):
+            # Same journal, new records appended: replay only the tail
+            records, new_state = journal.read_records(data_type, replayed[1])
+            if new_state is not None and new_state[0] == replayed[0]:
+                _cache_stats["hits"] += 1
+                entry = {**entry, "state": state}
+                if records:
+                    entry.update({
+                        "journal": new_state,
+                        "data": _replay(dict(entry["data"]), entry["indexes"], records),
+                        "blob": None
+                    })
+                _cache[data_type] = entry
+                return entry
+    
+    _cache_stats["misses"] += 1
+    entry = _load_entry(data_type)
+    
+    if entry is None:
+        _cache.pop(data_type, None)
+    else:
+        entry["state"] = state
+        _cache[data_type] = entry
+    
+    return entry
+
+def _refresh_sqlite_entry(data_type: str) -> Dict[str, Any]:
+    """
+    Bring the cached copy of a SQLite-backed collection up to date.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Up-to-date cache entry
+    """
+    from storage import sqlite_backend
+    
+    stamp = ("sqlite", sqlite_backend.get_version(data_type))
+    
+    with _cache_lock:
+        entry = _cache.get(data_type)
+        
+        if entry is not None and entry["stamp"] == stamp:
+            _cache_stats["hits"] += 1
+            return entry
+        
+        _cache_stats["misses"] += 1
+        data, version = sqlite_backend.load_all(data_type)
+        entry = {
+            "stamp": ("sqlite", version),
+            "journal": None,
+            "data": data,
+            "blob": None,
+            "indexes": None
+        }
+        _cache[data_type] = entry
+        
+        return entry
+
+def get_data(data_type: str, readonly: bool = False) -> Dict[str, Any]:
     """
     Get data from storage.
     
+    Parsed collections are cached in-process and revalidated against the
+    file's (mtime_ns, size, inode) on every call, so changes written by
+    other processes are picked up on the next read.
+    
+    A private copy remembers the version it was taken from, so passing it
+    back to save_data() merges it with concurrent writes.
+    
     Args:
         data_type: Type of data to get (e.g., 'users', 'students')
+        readonly: If True, return the shared cached object instead of a
+            private copy. The caller must not modify the returned data.
     
     Returns:
         Dictionary containing the requested data
     """
-    file_path = os.path.join(DATA_DIR, f"{data_type}.json")
+    tx = _current_transaction()
+    if tx is not None:
+        data = _tx_snapshot(tx, data_type)
+        return data if readonly else pickle.loads(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
     
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # If file doesn't exist or is empty/invalid, return empty dict
-        return {}
+    if readonly:
+        with _cache_lock:
+            entry = _refresh_entry(data_type)
+            # If file doesn't exist or is empty/invalid, return empty dict
+            return entry["data"] if entry is not None else {}
+    
+    data, _ = get_data_versioned(data_type)
+    return data
 
-def save_data(data_type: str, data: Dict[str, Any]) -> None:
+def get_data_versioned(data_type: str) -> Tuple[Dict[str, Any], int]:
     """
-    Save data to storage.
+    Get a private copy of a collection together with its version.
+    
+    Args:
+        data_type: Type of data to get (e.g., 'users', 'students')
+    
+    Returns:
+        Tuple of (data, version) for use with compare_and_swap()
+    """
+    with _cache_lock:
+        entry, version = _versioned_entry(data_type)
+        
+        if entry is None:
+            _remember_read(data_type, version, {})
+            return {}, version
+        
+        _remember_read(data_type, version, entry["data"])
+        return _copy_data(entry), version
+
+def _versioned_entry(data_type: str) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    Get a collection's up-to-date cache entry and the version it holds.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Tuple of (cache entry or None, version)
+    """
+    with _cache_lock:
+        if _uses_sqlite(data_type):
+            entry = _refresh_entry(data_type)
+            return entry, entry["stamp"][1]
+        
+        with locks.locked(data_type):
+            return _refresh_entry(data_type), locks.read_version(data_type)
+
+def get_version(data_type: str) -> int:
+    """
+    Get a collection's version, which increases on every write.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Current version
+    """
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        return sqlite_backend.get_version(data_type)
+    
+    with locks.locked(data_type):
+        return locks.read_version(data_type)
+
+def _current_version(data_type: str) -> int:
+    """Get a collection's version while holding its lock."""
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        return sqlite_backend.get_version(data_type)
+    return locks.read_version(data_type)
+
+def _remember_read(data_type: str, version: int, data: Dict[str, Any]) -> None:
+    """Record the version a copy handed out by get_data() was taken from."""
+    if not hasattr(_read_state, "reads"):
+        _read_state.reads = {}
+    _read_state.reads[data_type] = (version, data)
+
+def _take_read(data_type: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """Consume the version recorded by _remember_read(), if any."""
+    return getattr(_read_state, "reads", {}).pop(data_type, None)
+
+def _rebase(data_type: str, base: Tuple[int, Dict[str, Any]], data: Dict[str, Any],
+            item_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Replay the changes made to a copy of a collection on its current version.
+    
+    The caller must hold the collection's writer lock.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+        base: (version, data) the copy was taken from
+        data: The modified copy
+        item_ids: IDs of the changed items, found by comparing with the
+            base if not given
+    
+    Returns:
+        Data to write: `data` itself if nobody else wrote in the meantime,
+        otherwise the current data with the copy's changes applied
+    
+    Raises:
+        ConcurrentUpdateError: If another writer changed the same items
+    """
+    version, base_data = base
+    if _current_version(data_type) == version:
+        return data
+    
+    entry = _refresh_entry(data_type)
+    current = entry["data"] if entry is not None else {}
+    
+    if item_ids is None:
+        item_ids = [
+            item_id for item_id in base_data.keys() | data.keys()
+            if base_data.get(item_id) != data.get(item_id)
+        ]
+    
+    # Even an identical value counts: it may be the same increment made twice
+    conflicts = sorted(item_id for item_id in item_ids if current.get(item_id) != base_data.get(item_id))
+    if conflicts:
+        raise ConcurrentUpdateError(data_type, conflicts)
+    
+    merged = dict(current)
+    for item_id in item_ids:
+        if item_id in data:
+            merged[item_id] = data[item_id]
+        else:
+            merged.pop(item_id, None)
+    
+    return merged
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Get read cache statistics.
+    
+    Returns:
+        Dictionary with hit/miss counters and the number of cached collections
+    """
+    with _cache_lock:
+        return {**_cache_stats, "collections": len(_cache)}
+
+def clear_cache(data_type: Optional[str] = None) -> None:
+    """
+    Drop cached collections and reset the hit/miss counters.
+    
+    Args:
+        data_type: Optional collection to drop; all collections if omitted
+    """
+    with _cache_lock:
+        if data_type is None:
+            _cache.clear()
+            _mapped.clear()
+            _cache_stats["hits"] = 0
+            _cache_stats["misses"] = 0
+        else:
+            _cache.pop(data_type, None)
+            _mapped.pop(data_type, None)
+
+def _write_snapshot(data_type: str, data: Dict[str, Any],
+                    collection_indexes: Optional[indexes.Indexes] = None) -> None:
+    """
+    Write a full snapshot of a collection and retire its journal.
     
     Args:
         data_type: Type of data to save (e.g., 'users', 'students')
         data: Dictionary containing the data to save
+        collection_indexes: Indexes over data, built here if not given
     """
-    file_path = os.path.join(DATA_DIR, f"{data_type}.json")
+    file_path = _file_path(data_type)
     
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    # A crash mid-write leaves the previous snapshot, never a truncated one
+    fileio.write_bytes_atomic(file_path, _serialize(data_type, data))
+    
+    # Everything in the journal is now part of the snapshot
+    journal.remove_journal(data_type)
+    
+    if indexes.indexed_fields(data_type):
+        if collection_indexes is None:
+            collection_indexes = indexes.build(data_type, data)
+        indexes.save(data_type, _file_stamp(file_path), collection_indexes)
+
+def save_data(data_type: str, data: Dict[str, Any]) -> None:
+    """
+    Save data to storage.
+    
+    Args:
+        data_type: Type of data to save (e.g., 'users', 'students')
+        data: Dictionary containing the data to save
+    """
+    tx = _current_transaction()
+    if tx is not None:
+        base = _take_read(data_type)
+        if tx["bases"].get(data_type) is None:
+            tx["bases"][data_type] = base
+        tx["data"][data_type] = data
+        tx["replaced"].add(data_type)
+        tx["changed"].pop(data_type, None)
+        tx["items"].pop(data_type, None)
+        return
+    
+    base = _take_read(data_type)
+    
+    with _writing(data_type):
+        if base is not None:
+            data = _rebase(data_type, base, data)
+        _write_collection(data_type, data)
+
+def _write_collection(data_type: str, data: Dict[str, Any]) -> None:
+    """
+    Replace a collection and bump its version.
+    
+    The caller must hold _cache_lock and the collection's writer lock.
+    
+    Args:
+        data_type: Type of data to save (e.g., 'users', 'students')
+        data: Dictionary containing the data to save
+    """
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        sqlite_backend.replace_all(data_type, data)
+    else:
+        _write_snapshot(data_type, data)
+        locks.bump_version(data_type, new_snapshot=True)
+    
+    # The caller keeps ownership of `data`, so drop the entry rather
+    # than caching an object that may still be mutated.
+    _cache.pop(data_type, None)
+
+def compare_and_swap(data_type: str, expected_version: int, data: Dict[str, Any]) -> bool:
+    """
+    Replace a collection only if nobody wrote it since a given version.
+    
+    Args:
+        data_type: Type of data to save (e.g., 'users', 'students')
+        expected_version: Version the data was derived from
+        data: Dictionary containing the data to save
+    
+    Returns:
+        True if the data was written, False if the version had moved on
+    """
+    with _writing(data_type):
+        if _current_version(data_type) != expected_version:
+            return False
+        _write_collection(data_type, data)
+        return True
+
+@contextmanager
+def _writing(data_types: Any) -> Iterator[None]:
+    """
+    Hold writer locks on one or more collections.
+    
+    Args:
+        data_types: Collection name or names
+    """
+    with _cache_lock, locks.locked(_WRITE_QUEUE), locks.locked(data_types, exclusive=True):
+        yield
+
+@contextmanager
+def _sole_writer(enabled: bool = True) -> Iterator[None]:
+    """
+    Keep every other writer, in any process, waiting while the block runs.
+    
+    Args:
+        enabled: If False, do nothing
+    """
+    if not enabled:
+        yield
+        return
+    
+    with _cache_lock, locks.locked(_WRITE_QUEUE, exclusive=True):
+        yield
+
+def _backoff(attempt: int) -> None:
+    """Sleep before retrying a conflicting write, with randomized exponential backoff."""
+    time.sleep(CAS_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+def update_data(data_type: str, mutate: Callable[[Dict[str, Any]], Any],
+                retries: int = CAS_MAX_RETRIES) -> Any:
+    """
+    Apply a change to a collection with compare-and-swap, retrying on conflict.
+    
+    `mutate` runs without any lock held and may run more than once, so it
+    must only modify the data it is given. After `retries` conflicts the
+    last attempt runs as the only writer, so it cannot fail.
+    
+    Args:
+        data_type: Type of data to update (e.g., 'fees')
+        mutate: Function that modifies the collection in place
+        retries: Number of optimistic attempts before queueing
+    
+    Returns:
+        Return value of the successful call to `mutate`
+    """
+    for attempt in range(retries + 1):
+        with _sole_writer(attempt == retries):
+            data, version = get_data_versioned(data_type)
+            _take_read(data_type)
+            
+            result = mutate(data)
+            if compare_and_swap(data_type, version, data):
+                return result
+        
+        _backoff(attempt)
+    
+    raise ConcurrentUpdateError(data_type, [])
+
+def compact_collection(data_type: str) -> None:
+    """
+    Fold a collection's journal into a new snapshot.
+    
+    Args:
+        data_type: Type of data to compact (e.g., 'attendance')
+    """
+    if _uses_sqlite(data_type):
+        return
+    
+    with _writing(data_type):
+        entry = _refresh_entry(data_type)
+        
+        if entry is None or entry["journal"] is None:
+            return
+        
+        fileio.write_bytes_atomic(_file_path(data_type), _serialize(data_type, entry["data"]))
+        journal.remove_journal(data_type)
+        locks.bump_generation(data_type)
+        
+        if entry["indexes"]:
+            indexes.save(data_type, _file_stamp(_file_path(data_type)), entry["indexes"])
+        
+        # The cached data is exactly what was written, so keep it
+        _cache[data_type] = {
+            **entry,
+            "stamp": _file_stamp(_file_path(data_type)),
+            "journal": None,
+            "state": locks.read_state(data_type)
+        }
+
+def _compact_in_background(data_type: str) -> None:
+    """
+    Run compact_collection() on a daemon thread, once per collection.
+    
+    Args:
+        data_type: Type of data to compact (e.g., 'attendance')
+    """
+    with _cache_lock:
+        if data_type in _compacting:
+            return
+        _compacting.add(data_type)
+    
+    def run() -> None:
+        try:
+            compact_collection(data_type)
+        finally:
+            with _cache_lock:
+                _compacting.discard(data_type)
+    
+    threading.Thread(target=run, name=f"compact-{data_type}", daemon=True).start()
+
+def _append(data_type: str, op: str, item_id: str,
+            item_data: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Append a mutation to a collection's journal.
+    
+    The caller must hold the collection's writer lock.
+    
+    Args:
+        data_type: Type of data to update (e.g., 'students')
+        op: Journal operation (put, update or delete)
+        item_id: ID of the item
+        item_data: Item data for put, changed fields for update
+    """
+    record = {"op": op, "id": item_id}
+    if item_data is not None:
+        record["data"] = item_data
+    
+    size = journal.append_record(data_type, record)
+    locks.bump_version(data_type)
+    
+    if size >= JOURNAL_COMPACT_BYTES:
+        _compact_in_background(data_type)
 
 def add_item(data_type: str, item_id: str, item_data: Dict[str, Any]) -> None:
     """
@@ -81,9 +927,19 @@ def add_item(data_type: str, item_id: str, item_data: Dict[str, Any]) -> None:
         item_id: ID for the item
         item_data: Data for the item
     """
-    data = get_data(data_type)
-    data[item_id] = item_data
-    save_data(data_type, data)
+    tx = _current_transaction()
+    if tx is not None:
+        _tx_write(tx, data_type, item_id, item_data)
+        return
+    
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        with _writing(data_type):
+            sqlite_backend.put_item(data_type, item_id, item_data)
+        return
+    
+    with _writing(data_type):
+        _append(data_type, journal.OP_PUT, item_id, item_data)
 
 def update_item(data_type: str, item_id: str, 
                 update_data: Dict[str, Any]) -> bool:
@@ -98,14 +954,25 @@ def update_item(data_type: str, item_id: str,
     Returns:
         True if successful, False if item not found
     """
-    data = get_data(data_type)
-    
-    if item_id in data:
-        data[item_id].update(update_data)
-        save_data(data_type, data)
+    tx = _current_transaction()
+    if tx is not None:
+        current = _tx_item(tx, data_type, item_id)
+        if current is None:
+            return False
+        _tx_write(tx, data_type, item_id, {**current, **update_data})
         return True
     
-    return False
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        with _writing(data_type):
+            return sqlite_backend.update_item(data_type, item_id, update_data)
+    
+    with _writing(data_type):
+        if item_id not in get_data(data_type, readonly=True):
+            return False
+        
+        _append(data_type, journal.OP_UPDATE, item_id, update_data)
+        return True
 
 def delete_item(data_type: str, item_id: str) -> bool:
     """
@@ -118,14 +985,24 @@ def delete_item(data_type: str, item_id: str) -> bool:
     Returns:
         True if successful, False if item not found
     """
-    data = get_data(data_type)
-    
-    if item_id in data:
-        del data[item_id]
-        save_data(data_type, data)
+    tx = _current_transaction()
+    if tx is not None:
+        if _tx_item(tx, data_type, item_id) is None:
+            return False
+        _tx_write(tx, data_type, item_id, None)
         return True
     
-    return False
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        with _writing(data_type):
+            return sqlite_backend.delete_item(data_type, item_id)
+    
+    with _writing(data_type):
+        if item_id not in get_data(data_type, readonly=True):
+            return False
+        
+        _append(data_type, journal.OP_DELETE, item_id)
+        return True
 
 def get_item(data_type: str, item_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -138,8 +1015,138 @@ def get_item(data_type: str, item_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Item data if found, None otherwise
     """
-    data = get_data(data_type)
-    return data.get(item_id)
+    tx = _current_transaction()
+    if tx is not None:
+        item = _tx_item(tx, data_type, item_id)
+        return copy.deepcopy(item) if item is not None else None
+    
+    return _read_item(data_type, item_id)
+
+def _read_item(data_type: str, item_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the committed version of one item, ignoring any open transaction.
+    
+    Args:
+        data_type: Type of data (e.g., 'students')
+        item_id: ID of the item to get
+    
+    Returns:
+        Private copy of the item, or None if it doesn't exist
+    """
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        return sqlite_backend.get_item(data_type, item_id)
+    
+    with _cache_lock:
+        if _snapshot_format(data_type) == "binary" and data_type not in _cache:
+            # Decode just this item rather than loading the whole collection
+            entry = _mapped_entry(data_type)
+            if entry is not None:
+                return _mapped_item(entry, item_id)
+        
+        entry = _refresh_entry(data_type)
+        item = entry["data"].get(item_id) if entry is not None else None
+    
+    return copy.deepcopy(item) if item is not None else None
+
+def _mapped_entry(data_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Bring the memory-mapped snapshot of a collection up to date.
+    
+    The caller must hold _cache_lock.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+    
+    Returns:
+        Up-to-date entry of _mapped, or None if the snapshot isn't binary
+    """
+    stamp = _file_stamp(_file_path(data_type))
+    entry = _mapped.get(data_type)
+    
+    if (entry is not None and entry["stamp"] == stamp
+            and entry["journal"] == journal.journal_state(data_type)
+            and entry["state"] == locks.peek_state(data_type)):
+        return entry
+    
+    with locks.locked(data_type):
+        return _remap_entry(data_type)
+
+def _remap_entry(data_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Map a collection's binary snapshot and index its journal by item.
+    
+    The caller must hold _cache_lock and the collection's lock. A mapping
+    whose snapshot is unchanged is kept, and only new journal records read.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+    
+    Returns:
+        Up-to-date entry of _mapped, or None if the snapshot isn't binary
+    """
+    file_path = _file_path(data_type)
+    stamp = _file_stamp(file_path)
+    state = locks.read_state(data_type)
+    entry = _mapped.get(data_type)
+    
+    if entry is None or entry["stamp"] != stamp or entry["state"][1] != state[1]:
+        _mapped.pop(data_type, None)
+        
+        try:
+            with open(file_path, 'rb') as f:
+                # The mapping stays valid after the file is closed or replaced
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # Missing or empty file
+            return None
+        
+        if not binary_format.is_binary(buffer[:len(binary_format.MAGIC)]):
+            buffer.close()
+            return None
+        
+        entry = {
+            "stamp": stamp,
+            "journal": None,
+            "snapshot": binary_format.Snapshot(buffer),
+            "pending": {}
+        }
+    
+    replayed = entry["journal"]
+    if replayed is not None and replayed[0] == (journal.journal_state(data_type) or (None,))[0]:
+        # Same journal: only records appended since are new
+        records, journal_state = journal.read_records(data_type, replayed[1])
+    else:
+        entry["pending"] = {}
+        records, journal_state = journal.read_records(data_type)
+    
+    for record in records:
+        entry["pending"].setdefault(record.get("id"), []).append(record)
+    
+    entry["journal"] = journal_state
+    entry["state"] = state
+    _mapped[data_type] = entry
+    return entry
+
+def _mapped_item(entry: Dict[str, Any], item_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Decode one item of a memory-mapped snapshot, with its journaled writes.
+    
+    Args:
+        entry: Entry of _mapped
+        item_id: ID of the item
+    
+    Returns:
+        Private copy of the item, or None if it doesn't exist
+    """
+    item = entry["snapshot"].get(item_id)
+    records = entry["pending"].get(item_id)
+    
+    if records:
+        current = {item_id: item} if item is not None else {}
+        item = copy.deepcopy(journal.apply_records(current, records).get(item_id))
+    
+    return item
 
 def get_filtered_items(data_type: str, 
                        filter_func) -> Dict[str, Dict[str, Any]]:
@@ -153,8 +1160,54 @@ def get_filtered_items(data_type: str,
     Returns:
         Dictionary of filtered items
     """
-    data = get_data(data_type)
-    return {id_: item for id_, item in data.items() if filter_func(id_, item)}
+    if _uses_sqlite(data_type) and not _in_transaction(data_type):
+        from storage import sqlite_backend
+        return {
+            id_: item
+            for id_, item in sqlite_backend.iter_items(data_type)
+            if filter_func(id_, item)
+        }
+    
+    data = get_data(data_type, readonly=True)
+    return {
+        id_: copy.deepcopy(item)
+        for id_, item in data.items()
+        if filter_func(id_, item)
+    }
+
+def get_by_index(data_type: str, field: str, 
+                 value: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the items whose field equals a value, using a secondary index.
+    
+    Fields not declared in INDEXED_FIELDS fall back to a full scan.
+    
+    Args:
+        data_type: Type of data (e.g., 'grades')
+        field: Field to match (e.g., 'student_id')
+        value: Value the field must equal
+    
+    Returns:
+        Dictionary of matching items
+    """
+    if field not in indexes.indexed_fields(data_type) or _in_transaction(data_type):
+        return get_filtered_items(data_type, lambda id_, item: item.get(field) == value)
+    
+    if _uses_sqlite(data_type):
+        from storage import sqlite_backend
+        return sqlite_backend.get_by_field(data_type, field, value)
+    
+    with _cache_lock:
+        entry = _refresh_entry(data_type)
+        
+        if entry is None:
+            return {}
+        
+        data = entry["data"]
+        return {
+            id_: copy.deepcopy(data[id_])
+            for id_ in indexes.lookup(entry["indexes"], field, value)
+        }
 
 def get_all_items(data_type: str) -> Dict[str, Dict[str, Any]]:
     """
@@ -182,4 +1235,375 @@ def get_items_list(data_type: str) -> List[Dict[str, Any]]:
     return [
         {**item, "id": id_} 
         for id_, item in data.items()
-    ]
\ No newline at end of file
+    ]
+
+def _current_transaction() -> Optional[Dict[str, Any]]:
+    """
+    Get the transaction open on this thread.
+    
+    Returns:
+        Transaction state, or None outside of transaction()
+    """
+    return getattr(_tx_state, "tx", None)
+
+def _in_transaction(data_type: str) -> bool:
+    """
+    Check whether a collection has been touched by this thread's transaction.
+    
+    Args:
+        data_type: Type of data (e.g., 'students')
+    
+    Returns:
+        True if reads must be served from the transaction's snapshot
+    """
+    tx = _current_transaction()
+    return tx is not None and (data_type in tx["data"] or data_type in tx["bases"]
+                               or data_type in tx["changed"])
+
+def _tx_snapshot(tx: Dict[str, Any], data_type: str) -> Dict[str, Any]:
+    """
+    Get the version of a collection a transaction sees.
+    
+    The first read pins the collection's current version; later reads start
+    from that same version, so the commit can tell what changed underneath
+    the transaction. Items the transaction changed one by one are overlaid.
+    
+    Args:
+        tx: Transaction state
+        data_type: Type of data (e.g., 'students')
+    
+    Returns:
+        Read-only view of the collection
+    
+    Raises:
+        ConcurrentUpdateError: If items the transaction already read have
+            changed since
+    """
+    if data_type in tx["data"]:
+        return tx["data"][data_type]
+    
+    base = tx["bases"].get(data_type)
+    if base is None:
+        entry, version = _versioned_entry(data_type)
+        base = (version, entry["data"] if entry is not None else {})
+        
+        moved = sorted(
+            item_id for item_id, (read, _) in tx["items"].get(data_type, {}).items()
+            if base[1].get(item_id) != read
+        )
+        if moved:
+            raise ConcurrentUpdateError(data_type, moved)
+        
+        tx["bases"][data_type] = base
+    
+    changed = tx["changed"].get(data_type)
+    if not changed:
+        return base[1]
+    
+    view = dict(base[1])
+    for item_id in changed:
+        item = tx["items"][data_type][item_id][1]
+        if item is None:
+            view.pop(item_id, None)
+        else:
+            view[item_id] = item
+    return view
+
+def _tx_item(tx: Dict[str, Any], data_type: str,
+             item_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get one item as a transaction sees it, without loading its collection.
+    
+    The value first read is remembered, so the commit can check that
+    nobody changed the item in the meantime.
+    
+    Args:
+        tx: Transaction state
+        data_type: Type of data (e.g., 'students')
+        item_id: ID of the item
+    
+    Returns:
+        Read-only view of the item, or None if it doesn't exist
+    """
+    if data_type in tx["data"]:
+        return tx["data"][data_type].get(item_id)
+    
+    items = tx["items"].setdefault(data_type, {})
+    
+    if item_id not in items:
+        base = tx["bases"].get(data_type)
+        item = base[1].get(item_id) if base is not None else _read_item(data_type, item_id)
+        # (value read, value the transaction will write)
+        items[item_id] = (item, item)
+    
+    return items[item_id][1]
+
+def _tx_write(tx: Dict[str, Any], data_type: str, item_id: str,
+              item: Optional[Dict[str, Any]]) -> None:
+    """
+    Stage a single-item change in a transaction.
+    
+    Args:
+        tx: Transaction state
+        data_type: Type of data (e.g., 'students')
+        item_id: ID of the item
+        item: New item data, or None to delete the item
+    """
+    if data_type in tx["data"]:
+        # The whole collection is being replaced; change the working copy
+        if item is None:
+            tx["data"][data_type].pop(item_id, None)
+        else:
+            tx["data"][data_type][item_id] = item
+        return
+    
+    # Remember the value the change is based on
+    _tx_item(tx, data_type, item_id)
+    read = tx["items"][data_type][item_id][0]
+    tx["items"][data_type][item_id] = (read, item)
+    tx["changed"].setdefault(data_type, set()).add(item_id)
+
+@contextmanager
+def transaction() -> Iterator[None]:
+    """
+    Group reads and writes across collections into one unit of work.
+    
+    Inside the block, get_data/save_data and the item functions work on
+    in-memory copies; everything is written when the block exits, and
+    nothing is written if it raises. Nested blocks join the outermost
+    transaction. Collections passed to save_data() get a new snapshot;
+    items changed with add_item/update_item/delete_item are read and
+    written one by one and committed as journal records, so a transaction
+    touching a few items of a large collection never rewrites it.
+    
+    For snapshot files the new snapshots and journal records are staged as
+    temp files and listed in a commit manifest before any of them is
+    applied, so a crash leaves either none or (after initialize_data_store)
+    all of them applied. SQLite collections are written in a single
+    database transaction.
+    
+    The commit holds writer locks on every touched collection. Changes are
+    merged with whatever other processes wrote since the collections were
+    read; if they changed the same items, ConcurrentUpdateError is raised
+    and nothing is written (see run_transaction() to retry).
+    
+    Example:
+        with transaction():
+            students = get_data('students')
+            ...
+            save_data('students', students)
+            save_data('courses', courses)
+    """
+    if _current_transaction() is not None:
+        yield
+        return
+    
+    tx = {"data": {}, "replaced": set(), "changed": {}, "bases": {}, "items": {}, "callbacks": []}
+    _tx_state.tx = tx
+    try:
+        yield
+    finally:
+        _tx_state.tx = None
+    
+    _commit_transaction(tx)
+
+def _commit_transaction(tx: Dict[str, Any]) -> None:
+    """
+    Flush every collection written in a transaction.
+    
+    Args:
+        tx: Transaction state
+    """
+    dirty = sorted(tx["replaced"] | set(tx["changed"]))
+    if not dirty:
+        for callback in tx["callbacks"]:
+            callback()
+        return
+    
+    with _writing(dirty):
+        # Check every collection before writing any of them
+        for data_type in sorted(tx["replaced"]):
+            base = tx["bases"].get(data_type)
+            if base is not None:
+                tx["data"][data_type] = _rebase(data_type, base, tx["data"][data_type])
+        
+        changes = {}
+        for data_type, item_ids in tx["changed"].items():
+            items = tx["items"][data_type]
+            
+            # Even an identical value counts: it may be the same increment made twice
+            conflicts = sorted(
+                item_id for item_id in item_ids
+                if _read_item(data_type, item_id) != items[item_id][0]
+            )
+            if conflicts:
+                raise ConcurrentUpdateError(data_type, conflicts)
+            
+            changes[data_type] = {item_id: items[item_id][1] for item_id in sorted(item_ids)}
+        
+        if STORAGE_BACKEND == "sqlite":
+            from storage import sqlite_backend
+            
+            batch = {}
+            for data_type in dirty:
+                _uses_sqlite(data_type)
+                if data_type in tx["replaced"]:
+                    batch[data_type] = {"replace": tx["data"][data_type]}
+                else:
+                    batch[data_type] = {
+                        "put": {id_: item for id_, item in changes[data_type].items() if item is not None},
+                        "delete": [id_ for id_, item in changes[data_type].items() if item is None]
+                    }
+            sqlite_backend.apply_batch(batch)
+        else:
+            _commit_files({data_type: tx["data"][data_type] for data_type in tx["replaced"]}, changes)
+            for data_type in dirty:
+                locks.bump_version(data_type, new_snapshot=data_type in tx["replaced"])
+        
+        # Journaled collections pick the new records up on the next read
+        for data_type in tx["replaced"]:
+            _cache.pop(data_type, None)
+        
+        for callback in tx["callbacks"]:
+            callback()
+
+def after_commit(callback: Callable[[], Any]) -> None:
+    """
+    Run a function once the current transaction has committed.
+    
+    The function runs while the transaction still holds the writer locks on
+    the collections it wrote, so state kept outside the data store follows
+    the commits in order, and it doesn't run at all if the transaction
+    fails or is retried. Outside of a transaction it runs immediately.
+    
+    Args:
+        callback: Function to run
+    """
+    tx = _current_transaction()
+    if tx is None:
+        callback()
+        return
+    
+    tx["callbacks"].append(callback)
+
+def run_transaction(func: Callable[..., Any], *args: Any,
+                    retries: int = CAS_MAX_RETRIES, **kwargs: Any) -> Any:
+    """
+    Run a function in a transaction, retrying it if the commit conflicts.
+    
+    The function may run more than once, so it should only read and write
+    through the data store. After `retries` conflicts the last attempt runs
+    as the only writer, so it cannot conflict; other writers queue behind it.
+    
+    Args:
+        func: Function to run
+        *args: Positional arguments for func
+        retries: Number of optimistic attempts before queueing
+        **kwargs: Keyword arguments for func
+    
+    Returns:
+        Return value of the committed call to func
+    
+    Raises:
+        ConcurrentUpdateError: If called inside a transaction whose commit
+            conflicts
+    """
+    for attempt in range(retries + 1):
+        try:
+            with _sole_writer(attempt == retries), transaction():
+                return func(*args, **kwargs)
+        except ConcurrentUpdateError:
+            if attempt == retries or _current_transaction() is not None:
+                raise
+            _backoff(attempt)
+
+def _commit_files(snapshots: Dict[str, Dict[str, Any]],
+                  changes: Dict[str, Dict[str, Optional[Dict[str, Any]]]]) -> None:
+    """
+    Atomically apply a transaction's writes to the collection files.
+    
+    Args:
+        snapshots: Mapping of data_type to the collection's new data, for
+            collections replaced as a whole
+        changes: Mapping of data_type to {item_id: new item, or None if
+            deleted}, for collections changed item by item
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tx_id = uuid.uuid4().hex
+    
+    # One manifest at a time: another process's recovery would otherwise
+    # discard our staged files, or our manifest overwrite theirs
+    with locks.locked(_TX_LOCK, exclusive=True):
+        # Stage every snapshot next to its target, and every record next to its journal
+        for data_type, data in snapshots.items():
+            fileio.write_bytes(f"{_file_path(data_type)}.tx", _serialize(data_type, data))
+        
+        for data_type, items in changes.items():
+            journal.stage_records(data_type, [
+                {"op": journal.OP_PUT, "id": item_id, "data": item} if item is not None
+                else {"op": journal.OP_DELETE, "id": item_id}
+                for item_id, item in items.items()
+            ], tx_id)
+        
+        # The manifest appearing is the commit point
+        fileio.write_json_atomic(os.path.join(DATA_DIR, _TX_MANIFEST), {
+            "id": tx_id,
+            "snapshots": sorted(snapshots),
+            "journals": sorted(changes)
+        })
+        
+        _recover_transaction(tx_id)
+    
+    for data_type, data in snapshots.items():
+        if indexes.indexed_fields(data_type):
+            indexes.save(data_type, _file_stamp(_file_path(data_type)),
+                         indexes.build(data_type, data))
+    
+    for data_type in changes:
+        journal_state = journal.journal_state(data_type)
+        if journal_state is not None and journal_state[1] >= JOURNAL_COMPACT_BYTES:
+            _compact_in_background(data_type)
+
+def _recover_transaction(tx_id: Optional[str] = None) -> None:
+    """
+    Apply a committed transaction manifest, or discard staged files without one.
+    
+    Args:
+        tx_id: ID of the transaction this process just committed, whose
+            manifest is known not to have been applied yet
+    """
+    manifest_path = os.path.join(DATA_DIR, _TX_MANIFEST)
+    
+    try:
+        with open(manifest_path, 'r') as f:
+            committed = json.load(f)
+    except FileNotFoundError:
+        committed = None
+    except json.JSONDecodeError:
+        # Only a fully written manifest is renamed into place
+        committed = None
+    
+    if isinstance(committed, list):
+        # Manifest from before transactions could append journal records
+        committed = {"id": None, "snapshots": committed, "journals": []}
+    
+    if committed is not None:
+        for data_type in committed["snapshots"]:
+            staged_path = f"{_file_path(data_type)}.tx"
+            if os.path.exists(staged_path):
+                fileio.replace(staged_path, _file_path(data_type))
+                journal.remove_journal(data_type)
+        
+        for data_type in committed["journals"]:
+            # A manifest left by a crash may have been partly applied already
+            journal.apply_staged(data_type, committed["id"], resume=committed["id"] != tx_id)
+        
+        os.remove(manifest_path)
+    elif os.path.isdir(DATA_DIR):
+        # Staged files without a manifest belong to an uncommitted transaction
+        suffixes = tuple(f"{extension}.tx" for extension in _SNAPSHOT_EXTENSIONS.values())
+        suffixes += (".journal" + journal.STAGED_SUFFIX,)
+        
+        for file_name in os.listdir(DATA_DIR):
+            if file_name.endswith(suffixes):
+                os.remove(os.path.join(DATA_DIR, file_name))
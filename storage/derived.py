@@ -0,0 +1,79 @@
+"""
+Build markers for derived collections
+
+A derived collection (e.g. 'attendance_stats' or 'gradebook') is computed
+from source collections, then kept up to date by the code writing those
+sources, in the same transaction. Its marker item records the version of
+every source it reflects. When a source is written any other way (e.g.
+replaced by an import, or by a process that died halfway), the versions no
+longer match and the derived collection has to be rebuilt.
+"""
+from datetime import datetime
+from typing import Dict, Any, Iterable
+from storage.datastore import get_item, add_item, get_version
+
+# ID of the marker item; it lives in the derived collection, so it goes
+# away with it
+MARKER_ID = "_built"
+
+def build_marker(sources: Iterable[str]) -> Dict[str, Any]:
+    """
+    Get the marker for a derived collection about to be built.
+    
+    Call it before reading the sources: a write landing in between then
+    makes the marker look stale rather than current.
+    
+    Args:
+        sources: Collections the derived collection is built from
+    
+    Returns:
+        Marker item to store under MARKER_ID
+    """
+    return {
+        "built_at": datetime.now().isoformat(),
+        "versions": {source: get_version(source) for source in sources}
+    }
+
+def is_current(data_type: str, sources: Iterable[str]) -> bool:
+    """
+    Check whether a derived collection reflects its sources as they are now.
+    
+    Args:
+        data_type: Derived collection (e.g., 'gradebook')
+        sources: Collections it is built from
+    
+    Returns:
+        True if its marker matches every source's version
+    """
+    marker = get_item(data_type, MARKER_ID)
+    if marker is None:
+        return False
+    
+    versions = marker.get("versions", {})
+    return all(versions.get(source) == get_version(source) for source in sources)
+
+def record_write(data_type: str, source: str) -> None:
+    """
+    Count a write to a source in a derived collection's marker.
+    
+    Call it inside the transaction that writes the source and updates the
+    derived collection. The commit bumps the source's version by one, so a
+    marker that was current stays current; one that was already stale is
+    left alone and stays stale.
+    
+    Args:
+        data_type: Derived collection (e.g., 'gradebook')
+        source: Source collection written in the transaction
+    """
+    marker = get_item(data_type, MARKER_ID)
+    if marker is None:
+        return
+    
+    versions = marker.get("versions", {})
+    version = get_version(source)
+    
+    # Already counted earlier in this transaction, or stale
+    if versions.get(source) != version:
+        return
+    
+    add_item(data_type, MARKER_ID, {**marker, "versions": {**versions, source: version + 1}})
@@ -0,0 +1,192 @@
+"""
+Crash-safe file writes for the School Management System data store
+
+Files are written to a temp file next to the target and renamed over it,
+so a crash mid-write leaves the previous version in place rather than a
+truncated file. When the data reaches the disk is governed by FSYNC_POLICY:
+
+- "always": every write is fsynced before it is renamed into place
+- "batch": fsyncs are deferred and done together every FSYNC_BATCH_WRITES writes
+- "interval": deferred fsyncs are done at most FSYNC_INTERVAL_SECONDS apart
+
+The deferred policies still never expose a partial file after a process
+crash; they only risk the most recent writes on a power failure.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from typing import Any, Optional, Set
+from utils.constants import FSYNC_POLICY, FSYNC_BATCH_WRITES, FSYNC_INTERVAL_SECONDS
+
+# Suffix of the temp files written by write_json_atomic() and write_bytes_atomic()
+TEMP_SUFFIX = ".tmp"
+
+# Files written since the last fsync, and when that was
+_pending: Set[str] = set()
+_state = {"writes": 0, "last_flush": time.monotonic(), "timer": None}
+_lock = threading.Lock()
+
+def _fsync_path(path: str) -> None:
+    """fsync a file or directory by path, ignoring ones removed since."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def flush() -> None:
+    """
+    fsync every file written since the last flush, and their directories.
+    """
+    with _lock:
+        paths = sorted(_pending)
+        _pending.clear()
+        _state["writes"] = 0
+        _state["last_flush"] = time.monotonic()
+        _state["timer"] = None
+    
+    for path in paths:
+        _fsync_path(path)
+    
+    for directory in sorted({os.path.dirname(path) for path in paths}):
+        _fsync_path(directory)
+
+atexit.register(flush)
+
+def _defer(path: str) -> None:
+    """
+    Queue a written file for the next flush, flushing now if the policy says so.
+    
+    Args:
+        path: Path of the file written
+    """
+    with _lock:
+        _pending.add(path)
+        _state["writes"] += 1
+        
+        if FSYNC_POLICY == "batch":
+            due = _state["writes"] >= FSYNC_BATCH_WRITES
+        else:
+            elapsed = time.monotonic() - _state["last_flush"]
+            due = elapsed >= FSYNC_INTERVAL_SECONDS
+            
+            if not due and _state["timer"] is None:
+                # Don't leave a quiet burst unsynced until the next write
+                timer = threading.Timer(FSYNC_INTERVAL_SECONDS - elapsed, flush)
+                timer.daemon = True
+                timer.start()
+                _state["timer"] = timer
+    
+    if due:
+        flush()
+
+def synced(fd: int, path: str) -> None:
+    """
+    Make a file written in place (e.g. an append) durable per the policy.
+    
+    Args:
+        fd: Open descriptor of the file, after its buffers were flushed
+        path: Path of the file
+    """
+    if FSYNC_POLICY == "always":
+        os.fsync(fd)
+    else:
+        _defer(path)
+
+def replace(temp_path: str, path: str, durable: bool = True) -> None:
+    """
+    Atomically move a fully written temp file over its target.
+    
+    With the "always" policy the temp file must already be fsynced; the
+    directory entry is synced here.
+    
+    Args:
+        temp_path: Path of the temp file
+        path: Path of the target
+        durable: If False, never fsync (for files that can be rebuilt)
+    """
+    os.replace(temp_path, path)
+    
+    if not durable:
+        return
+    
+    if FSYNC_POLICY == "always":
+        _fsync_path(os.path.dirname(path))
+    else:
+        _defer(path)
+
+def write_json(path: str, data: Any, indent: Optional[int] = None,
+               durable: bool = True) -> None:
+    """
+    Write JSON to a file in place, syncing it under the "always" policy.
+    
+    Args:
+        path: Path of the file
+        data: JSON-serializable data
+        indent: Indentation passed to json.dump
+        durable: If False, never fsync (for files that can be rebuilt)
+    """
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        
+        if durable and FSYNC_POLICY == "always":
+            f.flush()
+            os.fsync(f.fileno())
+
+def write_bytes(path: str, data: bytes, durable: bool = True) -> None:
+    """
+    Write bytes to a file in place, syncing it under the "always" policy.
+    
+    Args:
+        path: Path of the file
+        data: File contents
+        durable: If False, never fsync (for files that can be rebuilt)
+    """
+    with open(path, 'wb') as f:
+        f.write(data)
+        
+        if durable and FSYNC_POLICY == "always":
+            f.flush()
+            os.fsync(f.fileno())
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None,
+                      durable: bool = True) -> None:
+    """
+    Replace a file with JSON so that readers and crashes see the old or the
+    new contents, never a mix.
+    
+    Concurrent writers of the same file must be serialized by the caller,
+    since they share the temp file.
+    
+    Args:
+        path: Path of the file
+        data: JSON-serializable data
+        indent: Indentation passed to json.dump
+        durable: If False, never fsync (for files that can be rebuilt)
+    """
+    temp_path = path + TEMP_SUFFIX
+    write_json(temp_path, data, indent, durable)
+    replace(temp_path, path, durable)
+
+def write_bytes_atomic(path: str, data: bytes, durable: bool = True) -> None:
+    """
+    Replace a file with bytes so that readers and crashes see the old or the
+    new contents, never a mix.
+    
+    Concurrent writers of the same file must be serialized by the caller,
+    since they share the temp file.
+    
+    Args:
+        path: Path of the file
+        data: File contents
+        durable: If False, never fsync (for files that can be rebuilt)
+    """
+    temp_path = path + TEMP_SUFFIX
+    write_bytes(temp_path, data, durable)
+    replace(temp_path, path, durable)
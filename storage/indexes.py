@@ -0,0 +1,185 @@
+"""
+Secondary indexes for the School Management System data store
+
+An index maps the value of one field to the IDs of the items holding it,
+e.g. grades.student_id -> {"STU123456": ["GRD0001", "GRD0007"]}. Indexed
+fields are declared per collection in INDEXED_FIELDS and are persisted
+next to the collection (e.g. data/grades.index.json).
+"""
+import os
+import json
+from typing import Dict, Any, List, Optional
+from utils.constants import DATA_DIR, INDEXED_FIELDS
+from storage import fileio
+
+# field -> value key -> ordered set of item IDs (dict keys, values unused)
+Indexes = Dict[str, Dict[str, Dict[str, None]]]
+
+# Version of the value_key() scheme; index files written with another one
+# are rebuilt
+KEY_FORMAT = 2
+
+def index_path(data_type: str) -> str:
+    """
+    Get the path of a collection's persisted indexes.
+    
+    Args:
+        data_type: Type of data (e.g., 'grades')
+    
+    Returns:
+        Absolute path of the index file
+    """
+    return os.path.join(DATA_DIR, f"{data_type}.index.json")
+
+def indexed_fields(data_type: str) -> List[str]:
+    """
+    Get the fields declared as indexed for a collection.
+    
+    Args:
+        data_type: Type of data (e.g., 'grades')
+    
+    Returns:
+        List of indexed field names
+    """
+    return INDEXED_FIELDS.get(data_type, [])
+
+def value_key(value: Any) -> Optional[str]:
+    """
+    Get the key an indexed value is stored under.
+    
+    Strings are stored quoted and numbers bare, so "7" and 7 get different
+    keys; numbers that compare equal (7, 7.0, True == 1) share one, as they
+    do with ==.
+    
+    Args:
+        value: Field value
+    
+    Returns:
+        Index key, or None for values that aren't indexed (missing, lists, dicts)
+    """
+    if isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, (bool, int)):
+        return str(int(value))
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    return None
+
+def build(data_type: str, data: Dict[str, Any]) -> Indexes:
+    """
+    Build a collection's indexes from its data.
+    
+    Args:
+        data_type: Type of data (e.g., 'grades')
+        data: Collection data
+    
+    Returns:
+        Indexes for every declared field
+    """
+    indexes = {field: {} for field in indexed_fields(data_type)}
+    
+    for item_id, item in data.items():
+        update(indexes, item_id, None, item)
+    
+    return indexes
+
+def update(indexes: Indexes, item_id: str,
+           old_item: Optional[Dict[str, Any]],
+           new_item: Optional[Dict[str, Any]]) -> None:
+    """
+    Move an item's entries after it was added, changed or removed.
+    
+    Args:
+        indexes: Indexes to update in place
+        item_id: ID of the item
+        old_item: Item before the change, None if it was added
+        new_item: Item after the change, None if it was removed
+    """
+    for field, index in indexes.items():
+        old_key = value_key(old_item.get(field)) if old_item else None
+        new_key = value_key(new_item.get(field)) if new_item else None
+        
+        if old_item is not None and new_item is not None and old_key == new_key:
+            continue
+        
+        if old_key is not None and old_key in index:
+            index[old_key].pop(item_id, None)
+            if not index[old_key]:
+                del index[old_key]
+        
+        if new_key is not None:
+            index.setdefault(new_key, {})[item_id] = None
+
+def lookup(indexes: Indexes, field: str, value: Any) -> List[str]:
+    """
+    Get the IDs of the items whose field equals a value.
+    
+    Args:
+        indexes: Indexes of the collection
+        field: Indexed field name
+        value: Value to look up
+    
+    Returns:
+        List of matching item IDs
+    """
+    key = value_key(value)
+    if key is None:
+        return []
+    return list(indexes.get(field, {}).get(key, {}))
+
+def load(data_type: str, stamp: Any) -> Optional[Indexes]:
+    """
+    Load persisted indexes if they were written for the given snapshot.
+    
+    Args:
+        data_type: Type of data (e.g., 'grades')
+        stamp: Stamp of the snapshot currently on disk
+    
+    Returns:
+        Indexes, or None if missing, stale, keyed differently or declared
+        differently
+    """
+    try:
+        with open(index_path(data_type), 'r') as f:
+            stored = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    
+    if stamp is None or stored.get("stamp") != list(stamp):
+        return None
+    
+    if stored.get("key_format") != KEY_FORMAT:
+        return None
+    
+    fields = stored.get("fields", {})
+    if sorted(fields) != sorted(indexed_fields(data_type)):
+        return None
+    
+    return {
+        field: {key: dict.fromkeys(ids) for key, ids in index.items()}
+        for field, index in fields.items()
+    }
+
+def save(data_type: str, stamp: Any, indexes: Indexes) -> None:
+    """
+    Persist a collection's indexes for the snapshot just written.
+    
+    Args:
+        data_type: Type of data (e.g., 'grades')
+        stamp: Stamp of the snapshot the indexes describe
+        indexes: Indexes to persist
+    """
+    if not indexes:
+        return
+    
+    stored = {
+        "stamp": list(stamp),
+        "key_format": KEY_FORMAT,
+        "fields": {
+            field: {key: list(ids) for key, ids in index.items()}
+            for field, index in indexes.items()
+        }
+    }
+    
+    # Indexes are rebuilt when missing, so they are never fsynced
+    fileio.write_json_atomic(index_path(data_type), stored, durable=False)
@@ -0,0 +1,222 @@
+"""
+Append-only write-ahead journal for the School Management System data store
+
+Each collection may have a journal file next to its snapshot
+(e.g. data/attendance.journal). Every add/update/delete appends one JSON
+line to it, and readers replay those lines over the last snapshot.
+Transactions stage their records next to the journal and append them all
+at once when they commit.
+"""
+import os
+import json
+from typing import Dict, Any, List, Optional, Tuple
+from utils.constants import DATA_DIR
+from storage import fileio
+
+# Journal operations
+OP_PUT = "put"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+# Suffix of the records a transaction stages before its commit point
+STAGED_SUFFIX = ".tx"
+
+def journal_path(data_type: str) -> str:
+    """
+    Get the path of a collection's journal file.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+    
+    Returns:
+        Absolute path of the journal file
+    """
+    return os.path.join(DATA_DIR, f"{data_type}.journal")
+
+def journal_state(data_type: str) -> Optional[Tuple[int, int]]:
+    """
+    Get the identity and length of a collection's journal.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+    
+    Returns:
+        Tuple of (inode, size), or None if there is no journal
+    """
+    try:
+        stat = os.stat(journal_path(data_type))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size)
+
+def _append_bytes(data_type: str, data: bytes) -> int:
+    """
+    Append complete record lines to a collection's journal in one write.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+        data: Newline-terminated JSON lines
+    
+    Returns:
+        Size of the journal in bytes after the append
+    """
+    path = journal_path(data_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    # A single write() on an O_APPEND file keeps concurrent appends whole
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        fileio.synced(f.fileno(), path)
+        return f.tell()
+
+def append_record(data_type: str, record: Dict[str, Any]) -> int:
+    """
+    Append one mutation record to a collection's journal.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+        record: Record with "op", "id" and, for put/update, "data"
+    
+    Returns:
+        Size of the journal in bytes after the append
+    """
+    line = json.dumps(record, separators=(",", ":")) + "\n"
+    return _append_bytes(data_type, line.encode("utf-8"))
+
+def stage_records(data_type: str, records: List[Dict[str, Any]], tx_id: str) -> None:
+    """
+    Write a transaction's records for a collection next to its journal.
+    
+    They are appended by apply_staged() once the transaction commits. Each
+    record is tagged with the transaction's ID, so a commit interrupted
+    halfway through the append can be resumed without repeating records.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+        records: Records with "op", "id" and, for put, "data"
+        tx_id: ID of the transaction
+    """
+    lines = "".join(
+        json.dumps({**record, "tx": tx_id}, separators=(",", ":")) + "\n"
+        for record in records
+    )
+    fileio.write_bytes(journal_path(data_type) + STAGED_SUFFIX, lines.encode("utf-8"))
+
+def apply_staged(data_type: str, tx_id: Optional[str], resume: bool = False) -> None:
+    """
+    Append a committed transaction's staged records to a collection's journal.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+        tx_id: ID of the transaction
+        resume: True when finishing a commit a crashed process may have
+            partly applied; records already in the journal are skipped
+    """
+    staged_path = journal_path(data_type) + STAGED_SUFFIX
+    
+    try:
+        with open(staged_path, 'rb') as f:
+            lines = f.read().splitlines(keepends=True)
+    except FileNotFoundError:
+        return
+    
+    if resume:
+        records, _ = read_records(data_type)
+        lines = lines[sum(1 for record in records if record.get("tx") == tx_id):]
+        
+        # End a record torn by the crash, so it is skipped rather than joined
+        try:
+            with open(journal_path(data_type), 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines.insert(0, b"\n")
+        except OSError:
+            # No journal yet, or an empty one
+            pass
+    
+    if lines:
+        _append_bytes(data_type, b"".join(lines))
+    os.remove(staged_path)
+
+def read_records(data_type: str,
+                 offset: int = 0) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+    """
+    Read journal records starting at a byte offset.
+    
+    A trailing line without a newline is a write still in progress and is
+    left for the next read.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+        offset: Byte offset to start reading from
+    
+    Returns:
+        Tuple of (records, (inode, offset after the last complete record)),
+        or ([], None) if there is no journal
+    """
+    try:
+        f = open(journal_path(data_type), 'rb')
+    except FileNotFoundError:
+        return [], None
+    
+    with f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(offset)
+        chunk = f.read()
+    
+    end = chunk.rfind(b"\n") + 1
+    records = []
+    
+    for line in chunk[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            # A torn record from a crash mid-append; skip it
+            continue
+    
+    return records, (inode, offset + end)
+
+def apply_records(data: Dict[str, Any],
+                  records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply journal records to a collection.
+    
+    Replaying is idempotent, so applying records that are already folded
+    into the snapshot is harmless. Changed items are replaced rather than
+    mutated, which keeps previously returned read-only views stable.
+    
+    Args:
+        data: Collection data to apply the records to (modified in place)
+        records: Journal records in append order
+    
+    Returns:
+        The updated collection data
+    """
+    for record in records:
+        op = record.get("op")
+        item_id = record.get("id")
+        
+        if op == OP_PUT:
+            data[item_id] = record.get("data", {})
+        elif op == OP_UPDATE:
+            if item_id in data:
+                data[item_id] = {**data[item_id], **record.get("data", {})}
+        elif op == OP_DELETE:
+            data.pop(item_id, None)
+    
+    return data
+
+def remove_journal(data_type: str) -> None:
+    """
+    Remove a collection's journal once it has been folded into a snapshot.
+    
+    Args:
+        data_type: Type of data (e.g., 'attendance')
+    """
+    try:
+        os.remove(journal_path(data_type))
+    except FileNotFoundError:
+        pass
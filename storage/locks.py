@@ -0,0 +1,213 @@
+"""
+Cross-process reader/writer locks for the School Management System data store
+
+Every collection has a lock file in data/.locks/. Readers take a shared
+flock on it and writers an exclusive one, so any number of processes can
+read a collection at once while writers queue behind each other. The lock
+file also holds the collection's state: its version, a counter bumped by
+every write, and its generation, bumped whenever the snapshot is replaced.
+
+Locks are reentrant within a process: nested acquisitions of a collection
+reuse the lock the process already holds.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Iterable, Iterator, Optional, Tuple, Union
+from utils.constants import DATA_DIR
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks on this platform; only threads are serialized
+    fcntl = None
+
+# name -> [file descriptor, held exclusively, nesting depth]
+_held: Dict[str, List] = {}
+_lock = threading.RLock()
+
+def lock_path(name: str) -> str:
+    """
+    Get the path of a lock file.
+    
+    Args:
+        name: Collection name (e.g., 'attendance') or other lock name
+    
+    Returns:
+        Absolute path of the lock file
+    """
+    return os.path.join(DATA_DIR, ".locks", f"{name}.lock")
+
+def _acquire(name: str, exclusive: bool) -> Optional[bool]:
+    """
+    Take a lock, or join the one this process already holds.
+    
+    Args:
+        name: Lock name
+        exclusive: True for a writer lock, False for a reader lock
+    
+    Returns:
+        The previous mode if an existing lock was joined, None if it was new
+    """
+    entry = _held.get(name)
+    
+    if entry is None:
+        path = lock_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        
+        _held[name] = [fd, exclusive, 1]
+        return None
+    
+    previous = entry[1]
+    if exclusive and not previous:
+        # Upgrading is not atomic; callers take the writer lock up front
+        if fcntl is not None:
+            fcntl.flock(entry[0], fcntl.LOCK_EX)
+        entry[1] = True
+    
+    entry[2] += 1
+    return previous
+
+def _release(name: str, previous: Optional[bool]) -> None:
+    """
+    Undo one _acquire().
+    
+    Args:
+        name: Lock name
+        previous: Value returned by the matching _acquire()
+    """
+    entry = _held[name]
+    entry[2] -= 1
+    
+    if entry[2] == 0:
+        # Closing the descriptor drops the flock
+        os.close(entry[0])
+        del _held[name]
+    elif previous is False and entry[1]:
+        if fcntl is not None:
+            fcntl.flock(entry[0], fcntl.LOCK_SH)
+        entry[1] = False
+
+@contextmanager
+def locked(names: Union[str, Iterable[str]], exclusive: bool = False) -> Iterator[None]:
+    """
+    Hold reader or writer locks on one or more collections.
+    
+    Several locks are always taken in sorted order, so processes locking
+    overlapping sets of collections cannot deadlock.
+    
+    Args:
+        names: Collection name or names
+        exclusive: True for writer locks, False for reader locks
+    
+    Example:
+        with locked(['attendance', 'attendance_stats'], exclusive=True):
+            ...
+    """
+    if isinstance(names, str):
+        names = [names]
+    
+    with _lock:
+        acquired: List[Tuple[str, Optional[bool]]] = []
+        try:
+            for name in sorted(set(names)):
+                acquired.append((name, _acquire(name, exclusive)))
+            yield
+        finally:
+            for name, previous in reversed(acquired):
+                _release(name, previous)
+
+def _parse_state(raw: bytes) -> Tuple[int, int]:
+    """Decode the "<version> <generation>" stored in a lock file."""
+    try:
+        version, generation = raw.decode("ascii").split()
+        return int(version), int(generation)
+    except ValueError:
+        return 0, 0
+
+def read_state(name: str) -> Tuple[int, int]:
+    """
+    Read a collection's state. The caller must hold its lock.
+    
+    Args:
+        name: Collection name
+    
+    Returns:
+        Tuple of (version, generation), (0, 0) for a collection never written
+    """
+    return _parse_state(os.pread(_held[name][0], 64, 0))
+
+def peek_state(name: str) -> Tuple[int, int]:
+    """
+    Read a collection's state without locking, to validate a cached copy.
+    
+    Args:
+        name: Collection name
+    
+    Returns:
+        Tuple of (version, generation), (0, 0) for a collection never written
+    """
+    try:
+        fd = os.open(lock_path(name), os.O_RDONLY)
+    except FileNotFoundError:
+        return 0, 0
+    
+    try:
+        return _parse_state(os.pread(fd, 64, 0))
+    finally:
+        os.close(fd)
+
+def read_version(name: str) -> int:
+    """
+    Read a collection's version. The caller must hold its lock.
+    
+    Args:
+        name: Collection name
+    
+    Returns:
+        Current version, 0 for a collection never written
+    """
+    return read_state(name)[0]
+
+def bump_version(name: str, new_snapshot: bool = False) -> int:
+    """
+    Increase a collection's version. The caller must hold its writer lock.
+    
+    Args:
+        name: Collection name
+        new_snapshot: True if the write replaced the collection's snapshot
+    
+    Returns:
+        New version
+    """
+    version, generation = read_state(name)
+    version += 1
+    _write_state(name, version, generation + 1 if new_snapshot else generation)
+    return version
+
+def bump_generation(name: str) -> None:
+    """
+    Record that a collection's snapshot was rewritten without changing its
+    contents (e.g. by compaction). The caller must hold its writer lock.
+    
+    Args:
+        name: Collection name
+    """
+    version, generation = read_state(name)
+    _write_state(name, version, generation + 1)
+
+def _write_state(name: str, version: int, generation: int) -> None:
+    """Store a collection's state in its lock file."""
+    entry = _held[name]
+    if not entry[1]:
+        raise RuntimeError(f"Writer lock on '{name}' is not held")
+    
+    # Both numbers only grow, so the contents never get shorter and an
+    # unlocked reader never sees stale trailing digits
+    encoded = f"{version} {generation}".encode("ascii")
+    os.pwrite(entry[0], encoded, 0)
+    os.ftruncate(entry[0], len(encoded))
@@ -0,0 +1,170 @@
+"""
+Persisted ID sequences for the School Management System data store
+
+Each ID prefix (e.g. 'EVT') has a monotonic counter in data/sequences.json.
+A process reserves a block of numbers at a time under an exclusive file
+lock and hands them out from memory, so allocating an ID never loads the
+collection it is for and concurrent writers never get the same number.
+"""
+import os
+import re
+import json
+import threading
+from typing import Dict, List, Tuple
+from utils.constants import DATA_DIR, SEQUENCE_BLOCK_SIZE, SEQUENCE_COLLECTIONS
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks on this platform; only threads are serialized
+    fcntl = None
+
+# prefix -> [next value, end of the reserved block (exclusive)]
+_blocks: Dict[str, List[int]] = {}
+_lock = threading.Lock()
+
+def sequences_path() -> str:
+    """
+    Get the path of the persisted sequence counters.
+    
+    Returns:
+        Absolute path of the sequences file
+    """
+    return os.path.join(DATA_DIR, "sequences.json")
+
+def _highest_existing(prefix: str) -> int:
+    """
+    Find the highest number already used with a prefix, so a new sequence
+    starts above IDs created before sequences existed.
+    
+    Args:
+        prefix: ID prefix (e.g., 'EVT')
+    
+    Returns:
+        Highest numeric suffix in the prefix's collection, or 0
+    """
+    data_type = SEQUENCE_COLLECTIONS.get(prefix)
+    if data_type is None:
+        return 0
+    
+    from storage.datastore import get_data
+    
+    pattern = re.compile(rf"^{re.escape(prefix)}(\d+)$")
+    highest = 0
+    
+    for item_id in get_data(data_type, readonly=True):
+        match = pattern.match(item_id)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    
+    return highest
+
+def _reserve_block(prefix: str, count: int) -> Tuple[int, int]:
+    """
+    Reserve the next `count` numbers of a sequence in the persisted counters.
+    
+    Args:
+        prefix: ID prefix (e.g., 'EVT')
+        count: Number of values to reserve
+    
+    Returns:
+        Tuple of (first value, end value exclusive)
+    """
+    path = sequences_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    with open(path + ".lock", 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        
+        try:
+            try:
+                with open(path, 'r') as f:
+                    counters = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                counters = {}
+            
+            if prefix not in counters:
+                counters[prefix] = _highest_existing(prefix)
+            
+            first = counters[prefix] + 1
+            counters[prefix] += count
+            
+            temp_path = path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(counters, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    return first, first + count
+
+def next_value(prefix: str) -> int:
+    """
+    Get the next number of a sequence.
+    
+    Args:
+        prefix: ID prefix (e.g., 'EVT')
+    
+    Returns:
+        A number never returned before for this prefix
+    """
+    with _lock:
+        block = _blocks.get(prefix)
+        
+        if block is None or block[0] >= block[1]:
+            block = list(_reserve_block(prefix, SEQUENCE_BLOCK_SIZE))
+            _blocks[prefix] = block
+        
+        value = block[0]
+        block[0] += 1
+        return value
+
+def next_id(prefix: str, width: int = 4) -> str:
+    """
+    Allocate a new ID.
+    
+    Args:
+        prefix: ID prefix (e.g., 'EVT')
+        width: Minimum number of digits
+    
+    Returns:
+        New ID (e.g., 'EVT0042')
+    """
+    return f"{prefix}{next_value(prefix):0{width}d}"
+
+def reserve_ids(prefix: str, count: int, width: int = 4) -> List[str]:
+    """
+    Allocate many IDs at once with a single reservation.
+    
+    Args:
+        prefix: ID prefix (e.g., 'GRD')
+        count: Number of IDs to allocate
+        width: Minimum number of digits
+    
+    Returns:
+        List of new, increasing IDs
+    """
+    if count <= 0:
+        return []
+    
+    with _lock:
+        first, end = _reserve_block(prefix, count)
+    
+    return [f"{prefix}{value:0{width}d}" for value in range(first, end)]
+
+def reset() -> None:
+    """
+    Forget all sequences, e.g. after the data directory was replaced.
+    
+    They are re-seeded from the existing IDs on next use.
+    """
+    with _lock:
+        _blocks.clear()
+        try:
+            os.remove(sequences_path())
+        except FileNotFoundError:
+            pass
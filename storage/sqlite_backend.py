@@ -0,0 +1,330 @@
+"""
+SQLite storage engine for the School Management System
+
+Keeps every collection in one local SQLite database with one row per item,
+so point lookups and single-item updates are keyed statements instead of
+whole-collection loads. Selected with STORAGE_BACKEND = "sqlite".
+"""
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, Any, Optional, Iterator, Tuple
+from utils.constants import SQLITE_DB_PATH
+
+_local = threading.local()
+
+# Fields that already have an expression index in this process
+_indexed_fields = set()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+) WITHOUT ROWID;
+"""
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get this thread's connection to the database, opening it on first use.
+    
+    Returns:
+        SQLite connection in autocommit mode
+    """
+    conn = getattr(_local, "conn", None)
+    
+    if conn is None:
+        os.makedirs(os.path.dirname(SQLITE_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(SQLITE_DB_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    
+    return conn
+
+def _encode(item: Dict[str, Any]) -> str:
+    """Serialize an item for the data column."""
+    return json.dumps(item, separators=(",", ":"))
+
+def _bump_version(conn: sqlite3.Connection, data_type: str) -> None:
+    """Increase a collection's version inside the current transaction."""
+    conn.execute(
+        "INSERT INTO collections (name, version) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+        (data_type,)
+    )
+
+def has_collection(data_type: str) -> bool:
+    """
+    Check whether a collection has been created in the database.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        True if the collection exists, False otherwise
+    """
+    row = get_connection().execute(
+        "SELECT 1 FROM collections WHERE name = ?", (data_type,)
+    ).fetchone()
+    return row is not None
+
+def get_version(data_type: str) -> int:
+    """
+    Get a collection's version, which increases on every write.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Current version, or 0 if the collection doesn't exist
+    """
+    row = get_connection().execute(
+        "SELECT version FROM collections WHERE name = ?", (data_type,)
+    ).fetchone()
+    return row[0] if row else 0
+
+def load_all(data_type: str) -> Tuple[Dict[str, Any], int]:
+    """
+    Load a whole collection.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Returns:
+        Tuple of (data, version the data was read at)
+    """
+    conn = get_connection()
+    
+    # Read the rows and the version in one snapshot
+    conn.execute("BEGIN")
+    try:
+        version = get_version(data_type)
+        rows = conn.execute(
+            "SELECT id, data FROM items WHERE collection = ?", (data_type,)
+        ).fetchall()
+    finally:
+        conn.execute("COMMIT")
+    
+    return {item_id: json.loads(data) for item_id, data in rows}, version
+
+def iter_items(data_type: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream the items of a collection without loading them all at once.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+    
+    Yields:
+        Tuples of (item_id, item)
+    """
+    cursor = get_connection().execute(
+        "SELECT id, data FROM items WHERE collection = ?", (data_type,)
+    )
+    for item_id, data in cursor:
+        yield item_id, json.loads(data)
+
+def replace_all(data_type: str, data: Dict[str, Any]) -> None:
+    """
+    Replace the contents of a collection.
+    
+    Args:
+        data_type: Type of data (e.g., 'users', 'students')
+        data: Dictionary containing the data to save
+    """
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM items WHERE collection = ?", (data_type,))
+        conn.executemany(
+            "INSERT INTO items (collection, id, data) VALUES (?, ?, ?)",
+            ((data_type, item_id, _encode(item)) for item_id, item in data.items())
+        )
+        _bump_version(conn, data_type)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def apply_batch(batch: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Apply changes to several collections in one database transaction.
+    
+    Args:
+        batch: Mapping of data_type to either {"replace": data} or
+            {"put": {item_id: item}, "delete": [item_id, ...]}
+    """
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for data_type, changes in batch.items():
+            if "replace" in changes:
+                conn.execute("DELETE FROM items WHERE collection = ?", (data_type,))
+                puts = changes["replace"]
+            else:
+                puts = changes.get("put", {})
+                conn.executemany(
+                    "DELETE FROM items WHERE collection = ? AND id = ?",
+                    ((data_type, item_id) for item_id in changes.get("delete", []))
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO items (collection, id, data) VALUES (?, ?, ?)",
+                ((data_type, item_id, _encode(item)) for item_id, item in puts.items())
+            )
+            _bump_version(conn, data_type)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def get_item(data_type: str, item_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a single item by its ID.
+    
+    Args:
+        data_type: Type of data (e.g., 'students')
+        item_id: ID of the item to get
+    
+    Returns:
+        Item data if found, None otherwise
+    """
+    row = get_connection().execute(
+        "SELECT data FROM items WHERE collection = ? AND id = ?",
+        (data_type, item_id)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+def put_item(data_type: str, item_id: str, item_data: Dict[str, Any]) -> None:
+    """
+    Insert or replace a single item.
+    
+    Args:
+        data_type: Type of data (e.g., 'students')
+        item_id: ID for the item
+        item_data: Data for the item
+    """
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO items (collection, id, data) VALUES (?, ?, ?)",
+            (data_type, item_id, _encode(item_data))
+        )
+        _bump_version(conn, data_type)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def update_item(data_type: str, item_id: str, update_data: Dict[str, Any]) -> bool:
+    """
+    Merge fields into a single item.
+    
+    Args:
+        data_type: Type of data (e.g., 'students')
+        item_id: ID of the item to update
+        update_data: New data to update
+    
+    Returns:
+        True if successful, False if item not found
+    """
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT data FROM items WHERE collection = ? AND id = ?",
+            (data_type, item_id)
+        ).fetchone()
+        
+        if row is None:
+            conn.execute("ROLLBACK")
+            return False
+        
+        item = json.loads(row[0])
+        item.update(update_data)
+        conn.execute(
+            "UPDATE items SET data = ? WHERE collection = ? AND id = ?",
+            (_encode(item), data_type, item_id)
+        )
+        _bump_version(conn, data_type)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return True
+
+def delete_item(data_type: str, item_id: str) -> bool:
+    """
+    Delete a single item.
+    
+    Args:
+        data_type: Type of data (e.g., 'students')
+        item_id: ID of the item to delete
+    
+    Returns:
+        True if successful, False if item not found
+    """
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.execute(
+            "DELETE FROM items WHERE collection = ? AND id = ?",
+            (data_type, item_id)
+        )
+        if cursor.rowcount == 0:
+            conn.execute("ROLLBACK")
+            return False
+        _bump_version(conn, data_type)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return True
+
+def ensure_field_index(field: str) -> None:
+    """
+    Create an expression index on a JSON field of the items table.
+    
+    Args:
+        field: Field name (must be a plain identifier)
+    """
+    if field in _indexed_fields:
+        return
+    
+    if not field.isidentifier():
+        raise ValueError(f"Invalid index field: {field!r}")
+    
+    get_connection().execute(
+        f"CREATE INDEX IF NOT EXISTS idx_items_{field} "
+        f"ON items (collection, json_extract(data, '$.{field}'))"
+    )
+    _indexed_fields.add(field)
+
+def get_by_field(data_type: str, field: str, value: Any) -> Dict[str, Any]:
+    """
+    Get the items whose field equals a value through its expression index.
+    
+    Args:
+        data_type: Type of data (e.g., 'grades')
+        field: Indexed field name
+        value: Value the field must equal
+    
+    Returns:
+        Dictionary of matching items
+    """
+    ensure_field_index(field)
+    
+    rows = get_connection().execute(
+        f"SELECT id, data FROM items INDEXED BY idx_items_{field} "
+        f"WHERE collection = ? AND json_extract(data, '$.{field}') = ?",
+        (data_type, value)
+    ).fetchall()
+    
+    return {item_id: json.loads(data) for item_id, data in rows}
@@ -0,0 +1,54 @@
+"""
+Support for tests that need a data store of their own
+
+The data directory is fixed when utils.constants is first imported, so
+each scenario runs in a fresh interpreter pointed at a temporary
+directory and reports its results as JSON on the last line of output.
+"""
+import os
+import sys
+import json
+import subprocess
+import textwrap
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_script(data_dir: str, script: str, **env: str) -> Any:
+    """
+    Run a script against a data directory.
+    
+    The data store is initialized before the script runs, and the script
+    prints its results with report().
+    
+    Args:
+        data_dir: Data directory to use
+        script: Python source to run
+        **env: Extra environment variables (e.g. SMS_STORAGE_BACKEND)
+    
+    Returns:
+        The value passed to report()
+    """
+    prelude = (
+        "import json\n"
+        "from storage.datastore import initialize_data_store\n"
+        "initialize_data_store()\n"
+        "def report(value):\n"
+        "    print(json.dumps(value))\n"
+    )
+    environment = {
+        **os.environ,
+        "SMS_DATA_DIR": data_dir,
+        "SMS_PBKDF2_ITERATIONS": "1000",
+        "PYTHONPATH": ROOT,
+        **env
+    }
+    
+    result = subprocess.run(
+        [sys.executable, "-c", prelude + textwrap.dedent(script)],
+        cwd=data_dir, env=environment, capture_output=True, text=True, timeout=300
+    )
+    if result.returncode != 0:
+        raise AssertionError(f"script failed:\n{result.stderr}")
+    
+    return json.loads(result.stdout.strip().splitlines()[-1])
@@ -0,0 +1,77 @@
+"""
+Tests for the assignment and submission lookups
+"""
+import shutil
+import tempfile
+import unittest
+from store_support import run_script
+
+SETUP = """
+from storage.datastore import add_item, run_transaction
+from services.assignment_service import add_course_assignment, record_submission
+
+def create():
+    add_item('assignments', 'A1', {"title": "Quiz", "course_id": "C1", "due_date": "2026-09-10"})
+    add_course_assignment('C1', 'A1', '2026-09-10')
+    add_item('submissions', 'SUB1', {"assignment_id": "A1", "student_id": "S1", "status": "submitted"})
+    record_submission('A1', 'S1', 'SUB1')
+
+run_transaction(create)
+"""
+
+class AssignmentLookupTest(unittest.TestCase):
+    """The lookups must follow the assignments and submissions, however they change."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def lookups(self, script=""):
+        return run_script(self.data_dir, script + """
+            from services.assignment_service import get_course_assignments, get_submission
+            report([get_course_assignments('C1'), get_submission('A1', 'S2')])
+        """)
+    
+    def test_writes_are_recorded(self):
+        lookups = self.lookups("""
+            from storage.datastore import add_item, run_transaction
+            from services.assignment_service import add_course_assignment, record_submission
+            
+            def create():
+                add_item('assignments', 'A2', {"title": "Test", "course_id": "C1", "due_date": "2026-09-05"})
+                add_course_assignment('C1', 'A2', '2026-09-05')
+                add_item('submissions', 'SUB2', {"assignment_id": "A1", "student_id": "S2"})
+                record_submission('A1', 'S2', 'SUB2')
+            
+            run_transaction(create)
+        """)
+        
+        self.assertEqual(lookups, [
+            [["2026-09-05", "A2"], ["2026-09-10", "A1"]],
+            {"submission_id": "SUB2", "status": "submitted"}
+        ])
+    
+    def test_rebuilt_after_the_collections_are_replaced(self):
+        lookups = self.lookups("""
+            from storage.datastore import save_data
+            save_data('assignments', {})
+            save_data('submissions', {})
+        """)
+        
+        self.assertEqual(lookups, [[], None])
+    
+    def test_rebuilt_after_writes_they_missed(self):
+        lookups = self.lookups("""
+            from storage.datastore import add_item
+            add_item('assignments', 'A2', {"title": "Test", "course_id": "C1", "due_date": "2026-09-20"})
+            add_item('submissions', 'SUB2', {"assignment_id": "A1", "student_id": "S2", "status": "graded"})
+        """)
+        
+        self.assertEqual(lookups, [
+            [["2026-09-10", "A1"], ["2026-09-20", "A2"]],
+            {"submission_id": "SUB2", "status": "graded"}
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
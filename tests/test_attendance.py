@@ -0,0 +1,136 @@
+"""
+Tests for the columnar attendance store and the attendance rollups
+"""
+import shutil
+import tempfile
+import unittest
+from store_support import run_script
+
+SETUP = """
+from storage.datastore import add_item
+from services.attendance_service import mark_attendance
+add_item('courses', 'C1', {"name": "Algebra", "teacher_id": "T1", "students": ["S1", "S2"]})
+for student_id in ('S1', 'S2'):
+    add_item('students', student_id, {"first_name": student_id, "courses": ["C1"]})
+mark_attendance('T1', 'C1', '2026-09-01', [
+    {"student_id": "S1", "status": "late"},
+    {"student_id": "S2", "status": "present"}
+])
+"""
+
+class AttendanceStoreTest(unittest.TestCase):
+    """The columnar store must follow the 'attendance' collection, however it changes."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def history(self, script=""):
+        return run_script(self.data_dir, script + """
+            from services.attendance_service import get_student_attendance
+            report([(entry["date"], entry["status"]) for entry in get_student_attendance('S1')])
+        """)
+    
+    def test_marks_are_read_back(self):
+        self.assertEqual(self.history(), [["2026-09-01", "late"]])
+    
+    def test_updates_replace_the_day(self):
+        history = self.history("""
+            from services.attendance_service import update_attendance
+            update_attendance('T1', 'C1', '2026-09-01', [{"student_id": "S1", "status": "excused"}])
+        """)
+        
+        self.assertEqual(history, [["2026-09-01", "excused"]])
+    
+    def test_rebuilt_after_the_collection_is_replaced(self):
+        history = self.history("""
+            from storage.datastore import save_data
+            save_data('attendance', {})
+        """)
+        
+        self.assertEqual(history, [])
+    
+    def test_rebuilt_after_a_write_it_missed(self):
+        # As if the process died between the commit and the store update
+        history = self.history("""
+            from storage.datastore import add_item
+            add_item('attendance', 'C1_2026-09-02', {
+                "course_id": "C1", "date": "2026-09-02", "students": [{"student_id": "S1", "status": "absent"}]
+            })
+        """)
+        
+        self.assertEqual(history, [["2026-09-01", "late"], ["2026-09-02", "absent"]])
+    
+    def test_other_processes_see_a_rebuild(self):
+        result = run_script(self.data_dir, """
+            import multiprocessing
+            from storage.datastore import save_data
+            from services.attendance_service import get_student_attendance
+            
+            before = [entry["status"] for entry in get_student_attendance('S1')]
+            
+            # Another process replaces the collection and rebuilds the store
+            process = multiprocessing.get_context("fork").Process(target=lambda: (
+                save_data('attendance', {}), get_student_attendance('S1')
+            ))
+            process.start()
+            process.join()
+            
+            report([before, [entry["status"] for entry in get_student_attendance('S1')]])
+        """)
+        
+        self.assertEqual(result, [["late"], []])
+
+class AttendanceStatsTest(unittest.TestCase):
+    """The rollups must count exactly the attendance records that exist."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def stats(self, script=""):
+        return run_script(self.data_dir, script + """
+            from services.attendance_service import calculate_attendance_stats
+            stats = calculate_attendance_stats('S1')
+            report([stats["total_days"], stats["late_days"], stats["absent_days"]])
+        """)
+    
+    def test_marks_are_counted(self):
+        self.assertEqual(self.stats(), [1, 1, 0])
+    
+    def test_rebuilt_after_the_collection_is_replaced(self):
+        stats = self.stats("""
+            from storage.datastore import save_data
+            save_data('attendance', {})
+        """)
+        
+        self.assertEqual(stats, [0, 0, 0])
+    
+    def test_rebuilt_after_a_write_it_missed(self):
+        stats = self.stats("""
+            from storage.datastore import add_item
+            add_item('attendance', 'C1_2026-09-02', {
+                "course_id": "C1", "date": "2026-09-02", "students": [{"student_id": "S1", "status": "absent"}]
+            })
+        """)
+        
+        self.assertEqual(stats, [2, 1, 1])
+    
+    def test_concurrent_marks_are_all_counted(self):
+        stats = self.stats("""
+            import multiprocessing
+            from services.attendance_service import mark_attendance
+            
+            def mark(day):
+                mark_attendance('T1', 'C1', f'2026-10-{day:02d}', [{"student_id": "S1", "status": "absent"}])
+            
+            with multiprocessing.get_context("fork").Pool(4) as pool:
+                pool.map(mark, range(1, 13))
+        """)
+        
+        self.assertEqual(stats, [13, 1, 12])
+
+if __name__ == "__main__":
+    unittest.main()
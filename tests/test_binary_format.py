@@ -0,0 +1,53 @@
+"""
+Round-trip tests for the binary snapshot format
+"""
+import unittest
+from storage.binary_format import encode, decode, Snapshot
+
+class RoundTripTest(unittest.TestCase):
+    """Collections must decode to exactly what was encoded, whole or item by item."""
+    
+    def assert_round_trip(self, data):
+        encoded = encode(data)
+        self.assertEqual(decode(encoded), data)
+        
+        snapshot = Snapshot(encoded)
+        for item_id, item in data.items():
+            self.assertEqual(snapshot.get(item_id), item)
+    
+    def test_empty_collection(self):
+        self.assert_round_trip({})
+    
+    def test_empty_dict_items(self):
+        self.assert_round_trip({"a": {}})
+        self.assert_round_trip({"a": {}, "b": {}, "c": {}})
+    
+    def test_empty_list_items(self):
+        self.assert_round_trip({"a": [], "b": []})
+    
+    def test_nested_empty_values(self):
+        self.assert_round_trip({
+            "a": {"x": {}, "y": []},
+            "b": {"x": {}, "y": []},
+            "c": {"rows": [{}, {}], "pairs": [[], {}]},
+            "d": {"deep": {"deeper": {"deepest": {}}}}
+        })
+    
+    def test_uniform_flat_items(self):
+        self.assert_round_trip({
+            f"GRD{i:04d}": {"student_id": f"STU{i % 7}", "points": i * 1.5, "graded": i % 2 == 0}
+            for i in range(50)
+        })
+    
+    def test_mixed_items(self):
+        self.assert_round_trip({
+            "a": 1,
+            "b": None,
+            "c": {},
+            "d": {"students": [{"student_id": "STU1", "status": "present"},
+                               {"student_id": "STU2", "status": "absent"}]},
+            "e": {"big": 2 ** 70, "text": "héllo"}
+        })
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+"""
+Tests for the data store: journal, transactions, sequences, indexes and
+snapshot formats
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from store_support import run_script
+
+SETUP = """
+from storage.datastore import save_data
+save_data('courses', {"C1": {"name": "Algebra", "students": []}})
+"""
+
+class DataStoreTestCase(unittest.TestCase):
+    """Each test gets a data directory holding one course."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def path(self, file_name):
+        return os.path.join(self.data_dir, file_name)
+
+class JournalTest(DataStoreTestCase):
+    """Item writes go to the journal and are replayed over the snapshot."""
+    
+    def test_item_writes_are_replayed(self):
+        with open(self.path("courses.json"), 'rb') as f:
+            snapshot = f.read()
+        
+        run_script(self.data_dir, """
+            from storage.datastore import add_item, update_item, delete_item
+            add_item('courses', 'C2', {"name": "Biology", "students": []})
+            add_item('courses', 'C3', {"name": "Chemistry", "students": []})
+            update_item('courses', 'C2', {"students": ["S1"]})
+            delete_item('courses', 'C3')
+            report(None)
+        """)
+        
+        with open(self.path("courses.json"), 'rb') as f:
+            self.assertEqual(f.read(), snapshot)
+        self.assertTrue(os.path.exists(self.path("courses.journal")))
+        
+        courses = run_script(self.data_dir, """
+            from storage.datastore import get_data
+            report(get_data('courses'))
+        """)
+        
+        self.assertEqual(courses, {
+            "C1": {"name": "Algebra", "students": []},
+            "C2": {"name": "Biology", "students": ["S1"]}
+        })
+    
+    def test_compaction_folds_the_journal_in(self):
+        courses = run_script(self.data_dir, """
+            from storage.datastore import add_item, compact_collection, get_data
+            add_item('courses', 'C2', {"name": "Biology"})
+            compact_collection('courses')
+            report(sorted(get_data('courses')))
+        """)
+        
+        self.assertEqual(courses, ["C1", "C2"])
+        self.assertFalse(os.path.exists(self.path("courses.journal")))
+    
+    def test_torn_record_is_skipped(self):
+        courses = run_script(self.data_dir, """
+            from storage.datastore import add_item, get_data
+            from storage.journal import journal_path
+            add_item('courses', 'C2', {"name": "Biology"})
+            with open(journal_path('courses'), 'ab') as f:
+                f.write(b'{"op":"put","id":"C9","data":{"na\\n')
+            add_item('courses', 'C3', {"name": "Chemistry"})
+            report(sorted(get_data('courses')))
+        """)
+        
+        self.assertEqual(courses, ["C1", "C2", "C3"])
+
+class TransactionTest(DataStoreTestCase):
+    """Copies saved in a transaction are rebased onto other writers' changes."""
+    
+    def test_other_items_are_kept(self):
+        result = run_script(self.data_dir, """
+            import threading
+            from storage.datastore import get_data, save_data, add_item, transaction
+            
+            with transaction():
+                courses = get_data('courses')
+                # Another writer commits while this transaction is open
+                writer = threading.Thread(target=add_item, args=('courses', 'C2', {"name": "Biology"}))
+                writer.start()
+                writer.join()
+                courses['C1']['students'].append('S1')
+                save_data('courses', courses)
+            
+            courses = get_data('courses')
+            report([sorted(courses), courses['C1']['students']])
+        """)
+        
+        self.assertEqual(result, [["C1", "C2"], ["S1"]])
+    
+    def test_same_item_conflicts(self):
+        result = run_script(self.data_dir, """
+            import threading
+            from storage.datastore import (
+                get_data, save_data, update_item, transaction, ConcurrentUpdateError
+            )
+            
+            try:
+                with transaction():
+                    courses = get_data('courses')
+                    writer = threading.Thread(target=update_item, args=('courses', 'C1', {"name": "Geometry"}))
+                    writer.start()
+                    writer.join()
+                    courses['C1']['students'].append('S1')
+                    save_data('courses', courses)
+                outcome = "committed"
+            except ConcurrentUpdateError:
+                outcome = "conflict"
+            
+            report([outcome, get_data('courses')['C1']])
+        """)
+        
+        self.assertEqual(result, ["conflict", {"name": "Geometry", "students": []}])
+    
+    def test_conflict_is_retried(self):
+        result = run_script(self.data_dir, """
+            import threading
+            from storage.datastore import get_data, get_item, save_data, update_item, run_transaction
+            
+            attempts = []
+            
+            def enroll():
+                attempts.append(1)
+                courses = get_data('courses')
+                if len(attempts) == 1:
+                    writer = threading.Thread(target=update_item, args=('courses', 'C1', {"name": "Geometry"}))
+                    writer.start()
+                    writer.join()
+                courses['C1']['students'].append('S1')
+                save_data('courses', courses)
+            
+            run_transaction(enroll)
+            report([len(attempts), get_item('courses', 'C1')])
+        """)
+        
+        self.assertEqual(result, [2, {"name": "Geometry", "students": ["S1"]}])
+
+class SequenceTest(DataStoreTestCase):
+    """IDs are never handed out twice."""
+    
+    def test_concurrent_processes_get_distinct_ids(self):
+        result = run_script(self.data_dir, """
+            import multiprocessing
+            from storage.sequences import next_id, reserve_ids
+            
+            def allocate(_):
+                return [next_id('EVT') for _ in range(30)] + reserve_ids('EVT', 20)
+            
+            with multiprocessing.get_context("fork").Pool(4) as pool:
+                ids = [event_id for batch in pool.map(allocate, range(8)) for event_id in batch]
+            
+            report([len(ids), len(set(ids))])
+        """)
+        
+        self.assertEqual(result, [400, 400])
+    
+    def test_sequence_starts_above_existing_ids(self):
+        result = run_script(self.data_dir, """
+            from storage.datastore import add_item
+            from storage.sequences import next_id
+            add_item('events', 'EVT0041', {"title": "Fair"})
+            report(next_id('EVT'))
+        """)
+        
+        self.assertEqual(result, "EVT0042")
+
+class IndexTest(DataStoreTestCase):
+    """Index lookups match what a scan with == would find."""
+    
+    def test_lookups_follow_writes(self):
+        result = run_script(self.data_dir, """
+            from storage.datastore import add_item, update_item, delete_item, get_by_index
+            
+            add_item('students', 'S1', {"grade_level": "7"})
+            add_item('students', 'S2', {"grade_level": 7})
+            add_item('students', 'S3', {"grade_level": 7.0})
+            add_item('students', 'S4', {"grade_level": 8})
+            update_item('students', 'S4', {"grade_level": 7})
+            delete_item('students', 'S3')
+            
+            report([sorted(get_by_index('students', 'grade_level', value)) for value in ("7", 7, 8)])
+        """)
+        
+        self.assertEqual(result, [["S1"], ["S2", "S4"], []])
+    
+    def test_saved_index_is_reused(self):
+        run_script(self.data_dir, """
+            from storage.datastore import save_data, get_by_index
+            save_data('students', {"S1": {"grade_level": "7"}, "S2": {"grade_level": 7}})
+            get_by_index('students', 'grade_level', 7)
+            report(None)
+        """)
+        
+        result = run_script(self.data_dir, """
+            from storage.datastore import get_by_index
+            report([sorted(get_by_index('students', 'grade_level', value)) for value in ("7", 7)])
+        """)
+        
+        self.assertEqual(result, [["S1"], ["S2"]])
+
+class SnapshotFormatTest(DataStoreTestCase):
+    """Snapshots stay JSON unless binary is opted into and converted to."""
+    
+    def test_json_by_default(self):
+        self.assertTrue(os.path.exists(self.path("courses.json")))
+        self.assertFalse([name for name in os.listdir(self.data_dir) if name.endswith(".bin")])
+    
+    def test_startup_leaves_existing_snapshots_alone(self):
+        with open(self.path("courses.json"), 'rb') as f:
+            snapshot = f.read()
+        
+        courses = run_script(self.data_dir, """
+            from storage.datastore import get_data
+            report(sorted(get_data('courses')))
+        """, SMS_SNAPSHOT_FORMATS="courses=binary")
+        
+        with open(self.path("courses.json"), 'rb') as f:
+            self.assertEqual(f.read(), snapshot)
+        self.assertFalse(os.path.exists(self.path("courses.bin")))
+        self.assertEqual(courses, ["C1"])
+    
+    def test_explicit_conversion(self):
+        courses = run_script(self.data_dir, """
+            from storage.datastore import add_item, get_data
+            from tools.convert_data import convert_collections
+            add_item('courses', 'C2', {"name": "Biology"})
+            convert_collections(['courses'])
+            report(get_data('courses'))
+        """, SMS_SNAPSHOT_FORMATS="courses=binary")
+        
+        self.assertFalse(os.path.exists(self.path("courses.json")))
+        self.assertTrue(os.path.exists(self.path("courses.bin")))
+        self.assertEqual(courses, {"C1": {"name": "Algebra", "students": []}, "C2": {"name": "Biology"}})
+
+if __name__ == "__main__":
+    unittest.main()
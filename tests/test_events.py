@@ -0,0 +1,63 @@
+"""
+Tests for event booking
+"""
+import shutil
+import tempfile
+import unittest
+from store_support import run_script
+
+class EventBookingTest(unittest.TestCase):
+    """A location can't be booked twice for the same time."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+    
+    def test_concurrent_bookings_of_one_slot(self):
+        result = run_script(self.data_dir, """
+            import multiprocessing
+            from storage.datastore import get_data
+            from services.event_service import create_event
+            
+            context = multiprocessing.get_context("fork")
+            barrier = context.Barrier(6)
+            outcomes = context.Queue()
+            
+            def book(n):
+                barrier.wait()
+                try:
+                    outcomes.put(create_event('admin', f'Meeting {n}', '', 'meeting', '2026-11-02', '10:00',
+                                              '2026-11-02', '11:00', 'Room 1', ['all'])[0])
+                except Exception as e:
+                    outcomes.put(repr(e))
+            
+            processes = [context.Process(target=book, args=(n,)) for n in range(6)]
+            for process in processes:
+                process.start()
+            results = [outcomes.get() for _ in range(6)]
+            for process in processes:
+                process.join()
+            
+            report([sorted(results, key=str), len(get_data('events'))])
+        """)
+        
+        self.assertEqual(result, [[False] * 5 + [True], 1])
+    
+    def test_update_into_a_booked_slot(self):
+        result = run_script(self.data_dir, """
+            from services.event_service import create_event, update_event, list_events
+            
+            create_event('admin', 'Exam', '', 'exam', '2026-11-02', '10:00', '2026-11-02', '11:00', 'Hall', ['all'])
+            create_event('admin', 'Fair', '', 'other', '2026-11-02', '12:00', '2026-11-02', '13:00', 'Hall', ['all'])
+            fair = next(event for event in list_events() if event["title"] == 'Fair')
+            
+            clash = update_event(fair["id"], {"start_time": "10:30"}, 'admin')[0]
+            moved = update_event(fair["id"], {"start_time": "11:00"}, 'admin')[0]
+            
+            report([clash, moved, [event["start_time"] for event in list_events() if event["title"] == 'Fair']])
+        """)
+        
+        self.assertEqual(result, [False, True, ["11:00"]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Tests for grade entry and the gradebook
+"""
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from store_support import run_script
+from services import grade_service
+from utils.constants import GRADE_POINTS
+from utils.helpers import calculate_grade_letter
+
+SETUP = """
+from storage.datastore import add_item
+add_item('courses', 'C1', {"name": "Algebra", "teacher_id": "T1", "students": ["S1", "S2"]})
+add_item('assignments', 'A1', {"title": "Quiz", "course_id": "C1", "max_points": 10})
+with open('sheet.csv', 'w') as f:
+    f.write("student_id,points\\nS1,8\\nS2,5\\n")
+"""
+
+class GradeSheetTest(unittest.TestCase):
+    """A student is graded at most once per assignment, however sheets are entered."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def test_sheet_entered_twice(self):
+        result = run_script(self.data_dir, """
+            from storage.datastore import get_data
+            from services.grade_service import enter_grade_sheets
+            
+            first = enter_grade_sheets('T1', {'A1': 'sheet.csv'})
+            second = enter_grade_sheets('T1', {'A1': 'sheet.csv'})
+            report([first["graded"], second["graded"], second["rejected"], len(get_data('grades'))])
+        """)
+        
+        self.assertEqual(result, [2, 0, 2, 2])
+    
+    def test_sheet_entered_concurrently(self):
+        result = run_script(self.data_dir, """
+            import multiprocessing
+            from storage.datastore import get_data
+            from services.grade_service import enter_grade_sheets, get_student_gradebook
+            
+            context = multiprocessing.get_context("fork")
+            barrier = context.Barrier(4)
+            outcomes = context.Queue()
+            
+            def enter(_):
+                barrier.wait()
+                try:
+                    summary = enter_grade_sheets('T1', {'A1': 'sheet.csv'})
+                    outcomes.put([summary["graded"], summary["rejected"]])
+                except Exception as e:
+                    outcomes.put([repr(e), 0])
+            
+            processes = [context.Process(target=enter, args=(n,)) for n in range(4)]
+            for process in processes:
+                process.start()
+            results = [outcomes.get() for _ in range(4)]
+            for process in processes:
+                process.join()
+            
+            report({
+                "graded": sum(graded for graded, _ in results),
+                "rejected": sum(rejected for _, rejected in results),
+                "grades": sorted(grade["student_id"] for grade in get_data('grades').values()),
+                "count": get_student_gradebook('S1')['C1']["count"]
+            })
+        """)
+        
+        self.assertEqual(result, {"graded": 2, "rejected": 6, "grades": ["S1", "S2"], "count": 1})
+
+class GradebookTest(unittest.TestCase):
+    """The gradebook must count exactly the grades that exist."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + """
+from services.grade_service import enter_grade_sheets
+enter_grade_sheets('T1', {'A1': 'sheet.csv'})
+report(None)
+""")
+    
+    def gradebook(self, script=""):
+        return run_script(self.data_dir, script + """
+            from services.grade_service import get_student_gradebook
+            entry = get_student_gradebook('S1').get('C1')
+            report(entry and [entry["count"], entry["average_percentage"]])
+        """)
+    
+    def test_grades_are_counted(self):
+        self.assertEqual(self.gradebook(), [1, 80.0])
+    
+    def test_rebuilt_after_the_collection_is_replaced(self):
+        gradebook = self.gradebook("""
+            from storage.datastore import save_data
+            save_data('grades', {})
+        """)
+        
+        self.assertIsNone(gradebook)
+    
+    def test_rebuilt_after_a_write_it_missed(self):
+        gradebook = self.gradebook("""
+            from storage.datastore import add_item
+            add_item('grades', 'GRD9999', {
+                "student_id": "S1", "course_id": "C1", "assignment_id": "A2",
+                "points": 4, "max_points": 10, "percentage": 40.0, "letter_grade": "F"
+            })
+        """)
+        
+        self.assertEqual(gradebook, [2, 60.0])
+
+class GradeAnalyticsTest(unittest.TestCase):
+    """The reports must agree with a by-hand computation, with or without NumPy."""
+    
+    GRADES = {
+        "G1": {"student_id": "S1", "course_id": "C1", "assignment_id": "A1", "percentage": 90.0},
+        "G2": {"student_id": "S1", "course_id": "C2", "assignment_id": "A2", "percentage": 70.0},
+        "G3": {"student_id": "S2", "course_id": "C1", "assignment_id": "A1", "percentage": 80.0},
+        "G4": {"student_id": "S2", "course_id": "C1", "assignment_id": "A3", "percentage": 60.0}
+    }
+    ASSIGNMENTS = {
+        "A1": {"course_id": "C1", "due_date": "2026-09-10"},
+        "A2": {"course_id": "C2", "due_date": "2026-10-01"},
+        "A3": {"course_id": "C1", "due_date": "2026-02-10"}
+    }
+    
+    def reports(self):
+        analytics = grade_service.GradeAnalytics(self.GRADES, self.ASSIGNMENTS)
+        return analytics.course_report(), analytics.term_report(), analytics.student_report()
+    
+    def rounded(self, reports):
+        # The two versions sum in different orders
+        return [
+            [{key: round(value, 9) if isinstance(value, float) else value for key, value in row.items()}
+             for row in report]
+            for report in reports
+        ]
+    
+    def test_reports(self):
+        courses, terms, students = self.reports()
+        
+        self.assertEqual([(row["course_id"], row["count"], row["median"], row["min"], row["max"])
+                          for row in courses], [("C1", 3, 80.0, 60.0, 90.0), ("C2", 1, 70.0, 70.0, 70.0)])
+        self.assertAlmostEqual(courses[0]["mean"], 230 / 3)
+        self.assertEqual(sum(courses[0]["distribution"].values()), 3)
+        
+        self.assertEqual([(row["term"], row["count"], row["mean"]) for row in terms],
+                         [("Spring 2026", 1, 60.0), ("Fall 2026", 3, 80.0)])
+        
+        points = lambda percentage: GRADE_POINTS.get(calculate_grade_letter(percentage), 0.0)
+        self.assertEqual([(row["student_id"], row["count"], row["courses"], row["average"], row["gpa"])
+                          for row in students], [
+            ("S1", 2, 2, 80.0, (points(90) + points(70)) / 2),
+            ("S2", 2, 1, 70.0, points(70))
+        ])
+    
+    def test_without_numpy(self):
+        expected = self.rounded(self.reports())
+        
+        with mock.patch.object(grade_service, "np", None):
+            self.assertEqual(self.rounded(self.reports()), expected)
+
+if __name__ == "__main__":
+    unittest.main()
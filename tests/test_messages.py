@@ -0,0 +1,74 @@
+"""
+Tests for the teacher/parent message threads
+"""
+import shutil
+import tempfile
+import unittest
+from store_support import run_script
+
+SETUP = """
+from storage.datastore import add_item
+from services.message_service import send_message
+add_item('teachers', 'T1', {"first_name": "Ada"})
+send_message('T1', 'P1', 'S1', 'T1', 'Homework', 'Missing again')
+"""
+
+class MessageThreadTest(unittest.TestCase):
+    """The threads must hold exactly the messages that exist."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def thread(self, script=""):
+        return run_script(self.data_dir, script + """
+            from services.message_service import get_thread
+            thread = get_thread('T1', 'P1', 'S1')
+            report(thread and [len(thread["messages"]), len(thread["unread"]["P1"])])
+        """)
+    
+    def test_messages_are_threaded(self):
+        thread = self.thread("""
+            from services.message_service import send_message, mark_thread_read
+            mark_thread_read('T1', 'P1', 'S1', 'P1')
+            send_message('T1', 'P1', 'S1', 'P1', 'Re: Homework', 'Sorry')
+        """)
+        
+        self.assertEqual(thread, [2, 0])
+    
+    def test_rebuilt_after_the_collection_is_replaced(self):
+        thread = self.thread("""
+            from storage.datastore import save_data
+            save_data('messages', {})
+        """)
+        
+        self.assertIsNone(thread)
+    
+    def test_rebuilt_after_a_write_it_missed(self):
+        thread = self.thread("""
+            from storage.datastore import add_item
+            add_item('messages', 'MSG9999', {
+                "from_id": "T1", "to_id": "P1", "student_id": "S1", "subject": "Also",
+                "message": "Lunch money", "sent_at": "2026-09-01T10:00:00", "read": False
+            })
+        """)
+        
+        self.assertEqual(thread, [2, 2])
+    
+    def test_concurrent_messages_are_all_threaded(self):
+        thread = self.thread("""
+            import multiprocessing
+            from services.message_service import send_message
+            
+            def send(n):
+                send_message('T1', 'P1', 'S1', 'T1', f'Note {n}', 'Text')
+            
+            with multiprocessing.get_context("fork").Pool(4) as pool:
+                pool.map(send, range(12))
+        """)
+        
+        self.assertEqual(thread, [13, 13])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Tests for roster imports
+"""
+import shutil
+import tempfile
+import unittest
+from store_support import run_script
+
+SETUP = """
+with open('roster.csv', 'w') as f:
+    f.write("username,password,first_name,last_name,department\\n"
+            "alice,secret1,Alice,Ng,Math\\n"
+            "bob,secret2,Bob,Ray,Art\\n")
+"""
+
+class RosterImportTest(unittest.TestCase):
+    """An import must never overwrite a user, even one created while it runs."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def test_rows_are_imported(self):
+        result = run_script(self.data_dir, """
+            from storage.datastore import get_data
+            from services.roster_service import import_roster
+            
+            summary = import_roster('roster.csv', 'admin', 'teacher', workers=1)
+            report([summary["imported"], summary["rejected"], sorted(get_data('users')),
+                    sorted(teacher["department"] for teacher in get_data('teachers').values())])
+        """)
+        
+        self.assertEqual(result, [2, 0, ["alice", "bob"], ["Art", "Math"]])
+    
+    def test_username_taken_during_the_import(self):
+        result = run_script(self.data_dir, """
+            from storage.datastore import get_data
+            from services import roster_service
+            from services.user_service import create_user
+            
+            # Someone takes 'bob' after the rows were checked
+            reserve_ids = roster_service.reserve_ids
+            def reserve_and_register(*args, **kwargs):
+                if 'bob' not in get_data('users', readonly=True):
+                    create_user('bob', 'other', 'staff', 'Bobby', 'Tables')
+                return reserve_ids(*args, **kwargs)
+            roster_service.reserve_ids = reserve_and_register
+            
+            summary = roster_service.import_roster('roster.csv', 'admin', 'teacher', workers=1)
+            with open(summary["error_report"]) as f:
+                errors = f.read()
+            
+            report({
+                "summary": [summary["imported"], summary["rejected"]],
+                "bob": get_data('users')['bob']["first_name"],
+                "teachers": len(get_data('teachers')),
+                "reported": "username 'bob' already exists" in errors
+            })
+        """)
+        
+        self.assertEqual(result, {"summary": [1, 1], "bob": "Bobby", "teachers": 1, "reported": True})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Concurrency tests for data store transactions
+"""
+import shutil
+import tempfile
+import unittest
+from store_support import run_script
+
+SETUP = """
+from storage.datastore import add_item
+add_item('courses', 'C1', {"name": "Algebra", "students": []})
+for n in range(8):
+    add_item('students', f'S{n}', {"first_name": f"Student{n}", "courses": []})
+"""
+
+class ConcurrentWritersTest(unittest.TestCase):
+    """Writers changing the same item must queue behind each other, not fail."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        run_script(self.data_dir, SETUP + "report(None)")
+    
+    def test_threads_enrolling_into_one_course(self):
+        result = run_script(self.data_dir, """
+            import threading
+            from storage.datastore import get_item
+            from services.student_service import enroll_student_in_course
+            
+            barrier = threading.Barrier(8)
+            outcomes = {}
+            
+            def enroll(n):
+                barrier.wait()
+                outcomes[n] = enroll_student_in_course(f'S{n}', 'C1', 'admin')[0]
+            
+            threads = [threading.Thread(target=enroll, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            report({
+                "outcomes": sorted(outcomes.values()),
+                "course": sorted(get_item('courses', 'C1')["students"]),
+                "students": [get_item('students', f'S{n}')["courses"] for n in range(8)]
+            })
+        """)
+        
+        self.assertEqual(result["outcomes"], [True] * 8)
+        self.assertEqual(result["course"], [f"S{n}" for n in range(8)])
+        self.assertEqual(result["students"], [["C1"]] * 8)
+    
+    def test_processes_enrolling_into_shared_courses(self):
+        result = run_script(self.data_dir, """
+            import multiprocessing
+            from storage.datastore import add_item, get_item
+            from services.student_service import enroll_student_in_course
+            
+            for course_id in ('C2', 'C3', 'C4'):
+                add_item('courses', course_id, {"name": course_id, "students": []})
+            
+            context = multiprocessing.get_context("fork")
+            barrier = context.Barrier(8)
+            outcomes = context.Queue()
+            
+            def enroll(n):
+                barrier.wait()
+                for course_id in ('C1', 'C2', 'C3', 'C4'):
+                    try:
+                        outcomes.put(enroll_student_in_course(f'S{n}', course_id, 'admin')[0])
+                    except Exception as e:
+                        outcomes.put(repr(e))
+            
+            processes = [context.Process(target=enroll, args=(n,)) for n in range(8)]
+            for process in processes:
+                process.start()
+            results = [outcomes.get() for _ in range(32)]
+            for process in processes:
+                process.join()
+            
+            report({
+                "outcomes": results,
+                "courses": [sorted(get_item('courses', c)["students"]) for c in ('C1', 'C2', 'C3', 'C4')]
+            })
+        """)
+        
+        self.assertEqual(result["outcomes"], [True] * 32)
+        self.assertEqual(result["courses"], [[f"S{n}" for n in range(8)]] * 4)
+    
+    def test_item_increments_are_not_lost(self):
+        result = run_script(self.data_dir, """
+            import multiprocessing
+            from storage.datastore import add_item, get_item, update_item, run_transaction
+            
+            add_item('counters', 'hits', {"count": 0})
+            
+            def increment(_):
+                def bump():
+                    update_item('counters', 'hits', {"count": get_item('counters', 'hits')["count"] + 1})
+                for _ in range(10):
+                    run_transaction(bump)
+            
+            with multiprocessing.get_context("fork").Pool(4) as pool:
+                pool.map(increment, range(4))
+            
+            report(get_item('counters', 'hits')["count"])
+        """)
+        
+        self.assertEqual(result, 40)
+    
+    def test_failed_transaction_writes_nothing(self):
+        result = run_script(self.data_dir, """
+            from storage.datastore import add_item, get_item, transaction
+            
+            try:
+                with transaction():
+                    add_item('courses', 'C2', {"name": "Geometry"})
+                    add_item('students', 'S0', {"first_name": "Renamed", "courses": []})
+                    raise RuntimeError("abort")
+            except RuntimeError:
+                pass
+            
+            report([get_item('courses', 'C2'), get_item('students', 'S0')["first_name"]])
+        """)
+        
+        self.assertEqual(result, [None, "Student0"])
+
+class FirstRegistrationTest(unittest.TestCase):
+    """Only one of several simultaneous first registrations may become admin."""
+    
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+    
+    def test_one_admin(self):
+        result = run_script(self.data_dir, """
+            import multiprocessing
+            from storage.datastore import get_data
+            from auth import register_new_user
+            
+            context = multiprocessing.get_context("fork")
+            barrier = context.Barrier(6)
+            
+            def register(n):
+                barrier.wait()
+                register_new_user(f'user{n}', 'secret')
+            
+            processes = [context.Process(target=register, args=(n,)) for n in range(6)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            
+            report(sorted(user["role"] for user in get_data('users').values()))
+        """)
+        
+        self.assertEqual(result, ["admin"] + ["pending"] * 5)
+
+if __name__ == "__main__":
+    unittest.main()
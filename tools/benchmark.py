@@ -0,0 +1,201 @@
+"""
+Benchmark harness for the School Management System service layer
+
+Generates a data set per scale with tools.generate_data, then times the
+key service functions against it and prints the results as JSON. Each
+scale runs in its own process with SMS_DATA_DIR pointing at a scratch
+directory, so caches never leak between scales and data/ is untouched.
+
+Usage:
+    python -m tools.benchmark --scales 1000 10000 --repeat 5 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import date, timedelta
+from typing import Dict, Any, List, Callable
+
+def _time_call(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Time a call once cold and then `repeat` times warm.
+    
+    Args:
+        func: Function to call with no arguments
+        repeat: Number of warm runs
+    
+    Returns:
+        Timings in seconds
+    """
+    start = time.perf_counter()
+    func()
+    cold = time.perf_counter() - start
+    
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    
+    return {
+        "cold": cold,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.mean(runs),
+        "runs": repeat
+    }
+
+def run_scale(scale: int, seed: int, repeat: int) -> Dict[str, Any]:
+    """
+    Generate data for one scale and benchmark it.
+    
+    Must run in a process whose SMS_DATA_DIR is set before the
+    application modules are imported.
+    
+    Args:
+        scale: Number of students
+        seed: Random seed for the data and the sampled inputs
+        repeat: Number of warm runs per benchmark
+    
+    Returns:
+        Result for the scale
+    """
+    from tools.generate_data import generate, write_data, DEFAULT_PASSWORD
+    from storage.datastore import clear_cache
+    from auth import authenticate_user
+    from services.attendance_service import get_student_attendance, generate_attendance_report
+    from services.event_service import get_upcoming_events
+    from dashboards.student_dashboard import get_due_assignments, get_grade_summaries
+    
+    anchor = date.today()
+    
+    start = time.perf_counter()
+    data = generate(scale, seed, anchor)
+    generate_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    write_data(data)
+    write_seconds = time.perf_counter() - start
+    
+    # Sample inputs deterministically from the generated data
+    rng = random.Random(seed)
+    student_id = rng.choice(sorted(data['students']))
+    username = data['students'][student_id]["username"]
+    course_id = rng.choice(data['students'][student_id]["courses"])
+    start_date = (anchor - timedelta(days=14)).isoformat()
+    end_date = anchor.isoformat()
+    
+    benchmarks = {
+        "authenticate_user": lambda: authenticate_user(username, DEFAULT_PASSWORD),
+        "get_student_attendance": lambda: get_student_attendance(student_id),
+        "generate_attendance_report": lambda: generate_attendance_report(
+            course_id=course_id, start_date=start_date, end_date=end_date
+        ),
+        "get_upcoming_events": lambda: get_upcoming_events("student"),
+        "get_due_assignments": lambda: get_due_assignments(student_id),
+        "view_grade_summaries": lambda: get_grade_summaries(student_id)
+    }
+    
+    del data
+    results = {}
+    
+    for name, func in benchmarks.items():
+        # Start every benchmark from an empty in-process cache
+        clear_cache()
+        results[name] = _time_call(func, repeat)
+    
+    return {
+        "scale": scale,
+        "records": _count_records(),
+        "generate_seconds": generate_seconds,
+        "write_seconds": write_seconds,
+        "benchmarks": results
+    }
+
+def _count_records() -> Dict[str, int]:
+    """Count the records of every generated collection."""
+    from storage.datastore import get_data
+    from tools.generate_data import COLLECTIONS
+    
+    return {
+        data_type: len(get_data(data_type, readonly=True))
+        for data_type in COLLECTIONS
+    }
+
+def run(scales: List[int], seed: int, repeat: int,
+        backend: str = "json") -> Dict[str, Any]:
+    """
+    Benchmark every scale, each in a fresh process and data directory.
+    
+    Args:
+        scales: Numbers of students to benchmark at
+        seed: Random seed
+        repeat: Number of warm runs per benchmark
+        backend: Storage backend to benchmark ("json" or "sqlite")
+    
+    Returns:
+        Report with environment details and one result per scale
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    
+    for scale in scales:
+        data_dir = tempfile.mkdtemp(prefix="sms-bench-")
+        env = {**os.environ, "SMS_DATA_DIR": data_dir, "SMS_STORAGE_BACKEND": backend}
+        
+        try:
+            completed = subprocess.run(
+                [sys.executable, "-m", "tools.benchmark", "--worker",
+                 "--scales", str(scale), "--seed", str(seed), "--repeat", str(repeat)],
+                cwd=root, env=env, capture_output=True, text=True, check=True
+            )
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+        
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    
+    return {
+        "seed": seed,
+        "repeat": repeat,
+        "backend": backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": date.today().isoformat(),
+        "results": results
+    }
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the service layer")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000],
+                        help="numbers of students to benchmark at")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--repeat", type=int, default=5, help="warm runs per benchmark")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json",
+                        help="storage backend to benchmark")
+    parser.add_argument("--output", help="file to write the JSON report to (default: stdout)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        # One scale inside an already prepared environment
+        print(json.dumps(run_scale(args.scales[0], args.seed, args.repeat)))
+        return
+    
+    report = run(args.scales, args.seed, args.repeat, args.backend)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
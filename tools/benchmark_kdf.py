@@ -0,0 +1,88 @@
+"""
+Benchmark candidate password KDF settings
+
+Times password verification, which is the KDF's share of every login that
+misses the verified-credential cache, for each candidate cost. Pick the
+largest cost whose p99 fits the login budget and set it in
+utils/constants.py (PASSWORD_KDF, PBKDF2_ITERATIONS, SCRYPT_N).
+
+Usage:
+    python -m tools.benchmark_kdf --pbkdf2 50000 80000 150000 --scrypt 8192 16384
+"""
+import os
+import json
+import time
+import argparse
+import statistics
+from typing import Dict, Any, List
+from auth import verify_password
+from utils.constants import SCRYPT_R, SCRYPT_P
+
+def time_verify(encoded: str, repeat: int) -> Dict[str, Any]:
+    """
+    Time verify_password() against a stored hash.
+    
+    Args:
+        encoded: Stored hash with the parameters to measure
+        repeat: Number of runs
+    
+    Returns:
+        Timings in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        verify_password("benchmark-password", encoded)
+        timings.append(time.perf_counter() - start)
+    
+    timings.sort()
+    return {
+        "min": timings[0],
+        "median": statistics.median(timings),
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "runs": repeat
+    }
+
+def run(pbkdf2_iterations: List[int], scrypt_costs: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Time every candidate setting.
+    
+    The hashes are made up, so verification fails, but only after the full
+    KDF has run, which takes the same time as a match.
+    
+    Args:
+        pbkdf2_iterations: PBKDF2-SHA256 iteration counts to try
+        scrypt_costs: scrypt N values to try
+        repeat: Runs per setting
+    
+    Returns:
+        One result per setting
+    """
+    salt = os.urandom(16).hex()
+    digest = "00" * 32
+    candidates = [
+        ({"kdf": "pbkdf2_sha256", "iterations": iterations},
+         f"pbkdf2_sha256${iterations}${salt}${digest}")
+        for iterations in pbkdf2_iterations
+    ] + [
+        ({"kdf": "scrypt", "n": n, "r": SCRYPT_R, "p": SCRYPT_P},
+         f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${salt}${digest}")
+        for n in scrypt_costs
+    ]
+    
+    return [{**setting, **time_verify(encoded, repeat)} for setting, encoded in candidates]
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark password KDF settings")
+    parser.add_argument("--pbkdf2", type=int, nargs="*", default=[30000, 60000, 120000, 600000],
+                        help="PBKDF2-SHA256 iteration counts")
+    parser.add_argument("--scrypt", type=int, nargs="*", default=[8192, 16384, 32768],
+                        help="scrypt N values (powers of two)")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per setting")
+    args = parser.parse_args()
+    
+    print(json.dumps(run(args.pbkdf2, args.scrypt, args.repeat), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+JSON import/export for the School Management System data store
+
+Collections are stored as JSON unless the binary snapshot format is opted
+into (see SNAPSHOT_FORMATS). Export writes collections out as plain JSON,
+whatever their format, with any journaled writes applied; import replaces
+collections with the contents of JSON files. Format rewrites existing
+snapshots in their configured format, replacing the old files; nothing
+else converts a snapshot that already exists.
+
+Usage:
+    python -m tools.convert_data export --output /tmp/export attendance grades
+    python -m tools.convert_data export --output /tmp/export
+    python -m tools.convert_data import /tmp/export/attendance.json
+    SMS_SNAPSHOT_FORMATS="attendance=binary" python -m tools.convert_data format attendance
+"""
+import os
+import json
+import argparse
+from typing import List
+from utils.constants import DATA_DIR
+from storage.datastore import initialize_data_store, get_data, save_data, transaction, convert_snapshot
+
+# Files in DATA_DIR that look like snapshots but aren't collections
+_NOT_COLLECTIONS = {"sequences"}
+
+def stored_collections() -> List[str]:
+    """
+    List the collections with a snapshot in DATA_DIR.
+    
+    Returns:
+        Sorted collection names
+    """
+    names = set()
+    
+    for file_name in os.listdir(DATA_DIR):
+        name, extension = os.path.splitext(file_name)
+        if extension in (".json", ".bin") and "." not in name and name not in _NOT_COLLECTIONS:
+            names.add(name)
+    
+    return sorted(names)
+
+def export_collections(data_types: List[str], output_dir: str) -> None:
+    """
+    Write collections to <output_dir>/<data_type>.json.
+    
+    Args:
+        data_types: Collections to export
+        output_dir: Directory to write the files to
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    for data_type in data_types:
+        data = get_data(data_type, readonly=True)
+        with open(os.path.join(output_dir, f"{data_type}.json"), 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f"  {data_type}: {len(data)} records exported")
+
+def import_collections(file_paths: List[str]) -> None:
+    """
+    Replace collections with the contents of JSON files, all or nothing.
+    
+    Each file is imported into the collection named after it, so
+    'export/grades.json' replaces 'grades'.
+    
+    Args:
+        file_paths: JSON files to import
+    """
+    collections = {}
+    
+    for file_path in file_paths:
+        data_type = os.path.splitext(os.path.basename(file_path))[0]
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+        
+        if not isinstance(data, dict):
+            raise ValueError(f"{file_path} does not hold a collection (JSON object)")
+        collections[data_type] = data
+    
+    with transaction():
+        for data_type, data in collections.items():
+            save_data(data_type, data)
+    
+    for data_type, data in collections.items():
+        print(f"  {data_type}: {len(data)} records imported")
+
+def convert_collections(data_types: List[str]) -> None:
+    """
+    Rewrite collections' snapshots in their configured format.
+    
+    Args:
+        data_types: Collections to convert
+    """
+    for data_type in data_types:
+        if convert_snapshot(data_type):
+            print(f"  {data_type}: converted")
+        else:
+            print(f"  {data_type}: already in its configured format")
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Convert collections to and from JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = commands.add_parser("export", help="write collections as JSON files")
+    export_parser.add_argument("collections", nargs="*",
+                               help="collections to export (default: all)")
+    export_parser.add_argument("--output", required=True, help="directory to write to")
+    
+    import_parser = commands.add_parser("import", help="replace collections from JSON files")
+    import_parser.add_argument("files", nargs="+", help="JSON files named after their collections")
+    
+    format_parser = commands.add_parser("format", help="rewrite snapshots in their configured format")
+    format_parser.add_argument("collections", nargs="*",
+                               help="collections to convert (default: all)")
+    
+    args = parser.parse_args()
+    
+    initialize_data_store()
+    
+    if args.command == "export":
+        export_collections(args.collections or stored_collections(), args.output)
+    elif args.command == "import":
+        import_collections(args.files)
+    else:
+        convert_collections(args.collections or stored_collections())
+
+if __name__ == "__main__":
+    main()
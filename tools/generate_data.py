@@ -0,0 +1,398 @@
+"""
+Synthetic data generator for the School Management System
+
+Fills every collection at realistic ratios from a seed and a scale factor
+(the number of students). The same seed, scale and anchor date always
+produce the same data; all dates are offsets from the anchor.
+
+Usage:
+    SMS_DATA_DIR=/tmp/sms python -m tools.generate_data --scale 10000 --seed 42
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional
+from auth import hash_password
+from utils.constants import (
+    DATA_DIR, USER_ROLES, EVENT_TYPES, ATTENDANCE_STATUS, FEE_STATUS
+)
+from utils.helpers import calculate_grade_letter
+
+# Password shared by every generated account
+DEFAULT_PASSWORD = "password123"
+
+# Ratios relative to the number of students
+STUDENTS_PER_TEACHER = 20
+COURSES_PER_TEACHER = 3
+COURSES_PER_STUDENT = 5
+PARENTS_PER_STUDENT = 0.8
+STUDENTS_PER_STAFF = 100
+ASSIGNMENTS_PER_COURSE = 10
+ATTENDANCE_DAYS = 30
+SUBMISSION_RATE = 0.8
+MESSAGES_PER_PARENT = 2
+FEES_PER_STUDENT = 2
+
+FIRST_NAMES = [
+    "Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie",
+    "Avery", "Quinn", "Charlie", "Drew", "Emerson", "Finley", "Harper", "Kai"
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Lopez", "Wilson", "Anderson", "Thomas"
+]
+SUBJECTS = [
+    ("Mathematics", "MATH"), ("English", "ENG"), ("Biology", "BIO"),
+    ("Chemistry", "CHEM"), ("Physics", "PHYS"), ("History", "HIST"),
+    ("Geography", "GEO"), ("Art", "ART"), ("Music", "MUS"), ("Computer Science", "CS")
+]
+DEPARTMENTS = ["Science", "Humanities", "Mathematics", "Arts", "Technology"]
+STAFF_POSITIONS = ["Accountant", "Librarian", "Counselor", "Nurse", "Administrator"]
+GRADE_LEVELS = [str(level) for level in range(1, 13)]
+
+# Collections the generator fills
+COLLECTIONS = (
+    'users', 'credentials', 'user_ids', 'students', 'teachers', 'parents', 'staff',
+    'courses', 'assignments', 'submissions', 'attendance', 'events',
+    'announcements', 'fees', 'grades', 'messages'
+)
+
+# Weights for present, absent, late, excused
+ATTENDANCE_WEIGHTS = [0.88, 0.05, 0.05, 0.02]
+
+def _school_days(anchor: date, count: int):
+    """Get the last `count` weekdays before the anchor date, oldest first."""
+    days = []
+    day = anchor
+    
+    while len(days) < count:
+        day -= timedelta(days=1)
+        if day.weekday() < 5:
+            days.append(day)
+    
+    return list(reversed(days))
+
+def _person(rng: random.Random, username: str) -> Dict[str, str]:
+    """Get the name and contact fields shared by every kind of person."""
+    return {
+        "username": username,
+        "first_name": rng.choice(FIRST_NAMES),
+        "last_name": rng.choice(LAST_NAMES),
+        "email": f"{username}@school.example",
+        "phone": f"555{rng.randrange(10 ** 7):07d}"
+    }
+
+def generate(scale: int, seed: int = 42,
+             anchor: Optional[date] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Generate a complete data set in memory.
+    
+    Args:
+        scale: Number of students; every other collection scales with it
+        seed: Random seed
+        anchor: Date the data is generated around (defaults to today)
+    
+    Returns:
+        Dictionary of data_type -> collection data
+    """
+    rng = random.Random(seed)
+    anchor = anchor or date.today()
+    created_at = datetime.combine(anchor - timedelta(days=365), datetime.min.time()).isoformat()
+    # One hash shared by every account: hashing each would dominate large scales
+    password = hash_password(DEFAULT_PASSWORD)
+    
+    data = {data_type: {} for data_type in COLLECTIONS}
+    
+    def add_user(user_id: str, person: Dict[str, str], role: str) -> None:
+        data['users'][person["username"]] = {
+            "id": user_id,
+            "role": role,
+            **person,
+            "created_at": created_at,
+            "created_by": "admin"
+        }
+        data['credentials'][person["username"]] = {"hash": password, "updated_at": created_at}
+        data['user_ids'][user_id] = {"username": person["username"]}
+    
+    add_user("ADM000001", _person(rng, "admin"), USER_ROLES.ADMIN)
+    
+    # Teachers and their courses
+    teacher_count = max(1, scale // STUDENTS_PER_TEACHER)
+    course_ids = []
+    
+    for t in range(1, teacher_count + 1):
+        teacher_id = f"TCH{t:06d}"
+        person = _person(rng, f"teacher{t}")
+        subject, code = SUBJECTS[t % len(SUBJECTS)]
+        classes = []
+        
+        for c in range(COURSES_PER_TEACHER):
+            course_id = f"CRS{len(course_ids) + 1:06d}"
+            data['courses'][course_id] = {
+                "name": f"{subject} {c + 1}",
+                "code": f"{code}{100 + len(course_ids) + 1}",
+                "teacher_id": teacher_id,
+                "students": [],
+                "created_at": created_at
+            }
+            course_ids.append(course_id)
+            classes.append(course_id)
+        
+        add_user(teacher_id, person, USER_ROLES.TEACHER)
+        data['teachers'][teacher_id] = {
+            **person,
+            "subjects": [subject],
+            "department": DEPARTMENTS[t % len(DEPARTMENTS)],
+            "hire_date": created_at,
+            "classes": classes,
+            "created_at": created_at,
+            "created_by": "admin"
+        }
+    
+    # Students and enrollments
+    student_ids = []
+    
+    for s in range(1, scale + 1):
+        student_id = f"STU{s:06d}"
+        person = _person(rng, f"student{s}")
+        courses = rng.sample(course_ids, min(COURSES_PER_STUDENT, len(course_ids)))
+        
+        for course_id in courses:
+            data['courses'][course_id]["students"].append(student_id)
+        
+        add_user(student_id, person, USER_ROLES.STUDENT)
+        data['students'][student_id] = {
+            **person,
+            "grade_level": rng.choice(GRADE_LEVELS),
+            "date_of_birth": (anchor - timedelta(days=rng.randrange(6 * 365, 18 * 365))).isoformat(),
+            "enrollment_date": created_at,
+            "parent_id": "",
+            "courses": courses,
+            "created_at": created_at,
+            "created_by": "admin"
+        }
+        student_ids.append(student_id)
+    
+    # Parents, each with one or two children
+    parent_count = int(scale * PARENTS_PER_STUDENT)
+    unassigned = list(student_ids)
+    rng.shuffle(unassigned)
+    
+    for p in range(1, parent_count + 1):
+        if not unassigned:
+            break
+        
+        parent_id = f"PAR{p:06d}"
+        person = _person(rng, f"parent{p}")
+        children = [unassigned.pop() for _ in range(min(rng.choice([1, 1, 1, 2]), len(unassigned)))]
+        
+        for student_id in children:
+            data['students'][student_id]["parent_id"] = parent_id
+        
+        add_user(parent_id, person, USER_ROLES.PARENT)
+        data['parents'][parent_id] = {
+            **person,
+            "children": children,
+            "created_at": created_at,
+            "created_by": "admin"
+        }
+        
+        # Messages from a child's teacher to the parent
+        for m in range(MESSAGES_PER_PARENT):
+            student_id = rng.choice(children)
+            course_id = rng.choice(data['students'][student_id]["courses"] or course_ids)
+            sent_at = datetime.combine(anchor - timedelta(days=rng.randrange(60)), datetime.min.time())
+            data['messages'][f"MSG{len(data['messages']) + 1:06d}"] = {
+                "from_id": data['courses'][course_id]["teacher_id"],
+                "to_id": parent_id,
+                "student_id": student_id,
+                "subject": "Progress update",
+                "message": f"A note about {data['students'][student_id]['first_name']}'s progress.",
+                "sent_at": (sent_at + timedelta(minutes=rng.randrange(24 * 60))).isoformat(),
+                "read": rng.random() < 0.5
+            }
+    
+    # Staff
+    for f in range(1, max(1, scale // STUDENTS_PER_STAFF) + 1):
+        staff_id = f"STF{f:06d}"
+        person = _person(rng, f"staff{f}")
+        add_user(staff_id, person, USER_ROLES.STAFF)
+        data['staff'][staff_id] = {
+            **person,
+            "position": rng.choice(STAFF_POSITIONS),
+            "department": rng.choice(DEPARTMENTS),
+            "hire_date": created_at,
+            "created_at": created_at,
+            "created_by": "admin"
+        }
+    
+    # Attendance for the last school days
+    statuses = [
+        ATTENDANCE_STATUS.PRESENT, ATTENDANCE_STATUS.ABSENT,
+        ATTENDANCE_STATUS.LATE, ATTENDANCE_STATUS.EXCUSED
+    ]
+    
+    for day in _school_days(anchor, ATTENDANCE_DAYS):
+        day_str = day.isoformat()
+        
+        for course_id in course_ids:
+            course = data['courses'][course_id]
+            if not course["students"]:
+                continue
+            
+            data['attendance'][f"{course_id}_{day_str}"] = {
+                "course_id": course_id,
+                "date": day_str,
+                "marked_by": course["teacher_id"],
+                "marked_at": f"{day_str}T09:00:00",
+                "students": [
+                    {"student_id": student_id, "status": rng.choices(statuses, ATTENDANCE_WEIGHTS)[0]}
+                    for student_id in course["students"]
+                ]
+            }
+    
+    # Assignments, half past due and half upcoming, with submissions and grades
+    for course_id in course_ids:
+        course = data['courses'][course_id]
+        
+        for a in range(ASSIGNMENTS_PER_COURSE):
+            assignment_id = f"ASN{len(data['assignments']) + 1:06d}"
+            due_date = anchor + timedelta(days=(a - ASSIGNMENTS_PER_COURSE // 2) * 7)
+            max_points = rng.choice([10, 20, 50, 100])
+            
+            data['assignments'][assignment_id] = {
+                "title": f"{course['name']} Assignment {a + 1}",
+                "description": "Generated assignment",
+                "type": rng.choice(["homework", "quiz", "project", "exam"]),
+                "course_id": course_id,
+                "max_points": max_points,
+                "due_date": due_date.isoformat(),
+                "created_by": course["teacher_id"],
+                "created_at": created_at,
+                "status": "active"
+            }
+            
+            for student_id in course["students"]:
+                if rng.random() >= SUBMISSION_RATE:
+                    continue
+                
+                submitted = due_date - timedelta(days=rng.randrange(-1, 5))
+                submission_id = f"SUB{len(data['submissions']) + 1:06d}"
+                graded = due_date < anchor
+                
+                data['submissions'][submission_id] = {
+                    "assignment_id": assignment_id,
+                    "student_id": student_id,
+                    "content": "Generated submission",
+                    "comments": "",
+                    "submitted_at": f"{submitted.isoformat()}T18:00:00",
+                    "is_late": submitted > due_date,
+                    "status": "graded" if graded else "submitted"
+                }
+                
+                if not graded:
+                    continue
+                
+                points = round(max_points * min(1.0, max(0.0, rng.gauss(0.82, 0.12))), 1)
+                percentage = (points / max_points) * 100
+                data['grades'][f"GRD{len(data['grades']) + 1:06d}"] = {
+                    "student_id": student_id,
+                    "course_id": course_id,
+                    "assignment_id": assignment_id,
+                    "submission_id": submission_id,
+                    "points": points,
+                    "max_points": max_points,
+                    "percentage": percentage,
+                    "letter_grade": calculate_grade_letter(percentage),
+                    "comments": "",
+                    "graded_by": course["teacher_id"],
+                    "graded_at": f"{due_date.isoformat()}T20:00:00"
+                }
+    
+    # Events spread around the anchor date
+    roles = [USER_ROLES.STUDENT, USER_ROLES.TEACHER, USER_ROLES.PARENT, USER_ROLES.STAFF]
+    event_types = [EVENT_TYPES.HOLIDAY, EVENT_TYPES.EXAM, EVENT_TYPES.MEETING,
+                   EVENT_TYPES.ACTIVITY, EVENT_TYPES.OTHER]
+    
+    for e in range(1, 20 + scale // 50 + 1):
+        start = anchor + timedelta(days=rng.randrange(-90, 90))
+        hour = rng.randrange(8, 17)
+        data['events'][f"EVT{e:06d}"] = {
+            "title": f"Event {e}",
+            "description": "Generated event",
+            "event_type": rng.choice(event_types),
+            "start_date": start.isoformat(),
+            "start_time": f"{hour:02d}:00",
+            "end_date": start.isoformat(),
+            "end_time": f"{hour + 1:02d}:00",
+            "location": f"Room {rng.randrange(1, 40)}",
+            "visibility": ["all"] if rng.random() < 0.5 else rng.sample(roles, rng.randrange(1, len(roles))),
+            "created_at": created_at,
+            "created_by": "admin",
+            "is_cancelled": False
+        }
+    
+    # Fees
+    for student_id in student_ids:
+        for f in range(FEES_PER_STUDENT):
+            due_date = anchor + timedelta(days=(f * 90) - 45)
+            paid = due_date < anchor and rng.random() < 0.85
+            data['fees'][f"FEE{len(data['fees']) + 1:06d}"] = {
+                "student_id": student_id,
+                "description": "Tuition" if f == 0 else "Activities",
+                "amount": float(rng.choice([250, 500, 750, 1000])),
+                "due_date": due_date.isoformat(),
+                "status": FEE_STATUS.PAID if paid else FEE_STATUS.PENDING
+            }
+    
+    return data
+
+def write_data(data: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Replace the collections in DATA_DIR with generated data.
+    
+    Args:
+        data: Dictionary of data_type -> collection data
+    """
+    from storage.datastore import initialize_data_store, save_data, transaction
+    from services.attendance_service import get_attendance_store, rebuild_attendance_stats
+    from services.assignment_service import rebuild_assignment_indexes
+    from services.grade_service import rebuild_gradebook
+    from services.message_service import rebuild_message_threads
+    from storage import sequences
+    
+    initialize_data_store()
+    
+    # Existing sequences describe the data being replaced
+    sequences.reset()
+    
+    with transaction():
+        for data_type, collection in data.items():
+            save_data(data_type, collection)
+    
+    # Build the derived structures up front
+    get_attendance_store()
+    rebuild_attendance_stats()
+    rebuild_assignment_indexes()
+    rebuild_gradebook()
+    rebuild_message_threads()
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Generate synthetic school data")
+    parser.add_argument("--scale", type=int, default=1000, help="number of students")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None,
+                        help="date to generate around (YYYY-MM-DD, defaults to today)")
+    args = parser.parse_args()
+    
+    data = generate(args.scale, args.seed, args.anchor)
+    write_data(data)
+    
+    total = sum(len(collection) for collection in data.values())
+    print(f"Generated {total} records in {DATA_DIR}")
+    for data_type, collection in data.items():
+        print(f"  {data_type}: {len(collection)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Bulk grade entry for the School Management System
+
+Enters grades from spreadsheet exports without prompting: one CSV per
+assignment, with 'student_id' and 'points' columns. All grades are
+written in one transaction; rows that fail the checks are listed and
+skipped.
+
+Usage:
+    python -m tools.import_grades --teacher TCH0001 ASN0012=finals-7a.csv ASN0013=finals-7b.csv
+"""
+import argparse
+from storage.datastore import initialize_data_store
+from services.grade_service import enter_grade_sheets
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Enter grades from CSV grade sheets")
+    parser.add_argument("--teacher", required=True, help="ID of the teacher entering the grades")
+    parser.add_argument("sheets", nargs="+", metavar="ASSIGNMENT_ID=FILE",
+                        help="assignment and the grade sheet for it")
+    args = parser.parse_args()
+    
+    sheets = {}
+    for sheet in args.sheets:
+        assignment_id, separator, file_path = sheet.partition("=")
+        if not separator or not assignment_id or not file_path:
+            parser.error(f"expected ASSIGNMENT_ID=FILE, got '{sheet}'")
+        sheets[assignment_id] = file_path
+    
+    initialize_data_store()
+    
+    summary = enter_grade_sheets(args.teacher, sheets)
+    
+    for file_path, line_number, student_id, problem in summary["errors"]:
+        print(f"  {file_path}:{line_number} {student_id}: {problem}")
+    print(f"Graded {summary['graded']} rows, rejected {summary['rejected']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Bulk roster import for the School Management System
+
+Imports students, teachers and staff from a CSV (with a header row) or
+JSONL roster in one batched write per collection; see
+services.roster_service for the columns. Rows that fail validation are
+listed in an error report and everything else is imported.
+
+Usage:
+    python -m tools.import_roster roster.csv --role student --admin admin
+    python -m tools.import_roster staff.jsonl --errors staff-errors.csv
+"""
+import argparse
+from storage.datastore import initialize_data_store
+from services.roster_service import ROSTER_ROLES, import_roster
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Import a roster of students, teachers and staff")
+    parser.add_argument("roster", help="CSV or JSONL roster file")
+    parser.add_argument("--role", choices=sorted(ROSTER_ROLES),
+                        help="role of rows without a 'role' column")
+    parser.add_argument("--admin", default="admin", help="username recorded as the creator")
+    parser.add_argument("--errors", help="error report path (default: <roster>.errors.csv)")
+    parser.add_argument("--workers", type=int, help="password hashing processes (default: one per CPU)")
+    args = parser.parse_args()
+    
+    initialize_data_store()
+    
+    summary = import_roster(args.roster, args.admin, args.role, args.errors, args.workers)
+    
+    print(f"Imported {summary['imported']} rows, rejected {summary['rejected']}")
+    if summary["error_report"]:
+        print(f"Rejected rows are listed in {summary['error_report']}")
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,90 @@ Constants used throughout the School Management System
 import os
 from types import SimpleNamespace
 
-# Directory for data storage
-DATA_DIR = os.path.join(os.getcwd(), "data")
+# Directory for data storage (override with SMS_DATA_DIR, e.g. for benchmarks)
+DATA_DIR = os.environ.get("SMS_DATA_DIR", os.path.join(os.getcwd(), "data"))
+
+# Storage engine for collections: "json" (files in DATA_DIR) or "sqlite"
+STORAGE_BACKEND = os.environ.get("SMS_STORAGE_BACKEND", "json")
+
+# Database file used by the SQLite storage engine
+SQLITE_DB_PATH = os.path.join(DATA_DIR, "school.db")
+
+# Secondary indexes maintained by the data store, per collection
+INDEXED_FIELDS = {
+    "students": ["grade_level"],
+    "teachers": ["department"],
+    "staff": ["position", "department"],
+    "attendance": ["course_id"],
+    "grades": ["student_id", "course_id"],
+    "assignments": ["course_id"],
+    "submissions": ["assignment_id"],
+    "attendance_stats": ["student_id"],
+    "gradebook": ["student_id"],
+    "message_threads": ["teacher_id", "parent_id"]
+}
+
+# On-disk format of collection snapshots: "json" or "binary" (see
+# storage.binary_format). Everything is JSON unless binary is opted into,
+# for all collections with SMS_SNAPSHOT_FORMAT=binary or for some with
+# SMS_SNAPSHOT_FORMATS="attendance=binary,grades=binary". An existing
+# snapshot keeps its format until converted with tools.convert_data.
+DEFAULT_SNAPSHOT_FORMAT = os.environ.get("SMS_SNAPSHOT_FORMAT", "json")
+SNAPSHOT_FORMATS = dict(
+    entry.strip().split("=", 1)
+    for entry in os.environ.get("SMS_SNAPSHOT_FORMATS", "").split(",") if "=" in entry
+)
+
+# Journal size (bytes) at which a collection is compacted into a new snapshot
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# When writes are fsynced: "always", "batch" (every FSYNC_BATCH_WRITES writes)
+# or "interval" (at most FSYNC_INTERVAL_SECONDS apart); see storage.fileio
+FSYNC_POLICY = os.environ.get("SMS_FSYNC_POLICY", "always")
+FSYNC_BATCH_WRITES = 32
+FSYNC_INTERVAL_SECONDS = 1.0
+
+# Attempts made by compare-and-swap updates before giving up, and the base
+# delay (seconds) of the randomized exponential backoff between them
+CAS_MAX_RETRIES = 5
+CAS_BACKOFF_SECONDS = 0.01
+
+# Number of IDs a process reserves from a sequence at a time
+SEQUENCE_BLOCK_SIZE = 32
+
+# Collection holding the IDs of each prefix, used to seed new sequences
+SEQUENCE_COLLECTIONS = {
+    "STU": "students",
+    "TCH": "teachers",
+    "STF": "staff",
+    "PAR": "parents",
+    "EVT": "events",
+    "ANN": "announcements",
+    "ASN": "assignments",
+    "SUB": "submissions",
+    "GRD": "grades",
+    "MSG": "messages",
+    "REP": "reports",
+    "ISS": "facility_issues",
+    "LVR": "leave_requests"
+}
+
+# Password hashing: "pbkdf2_sha256" or "scrypt", with each KDF's cost.
+# Stored hashes made with other settings are upgraded on the next login;
+# measure candidates with tools.benchmark_kdf.
+PASSWORD_KDF = os.environ.get("SMS_PASSWORD_KDF", "pbkdf2_sha256")
+PBKDF2_ITERATIONS = int(os.environ.get("SMS_PBKDF2_ITERATIONS", "60000"))
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# Successful logins remembered per process so that re-authenticating with
+# the same password skips the KDF: how many, and for how long (seconds)
+VERIFIED_CACHE_SIZE = 1024
+VERIFIED_CACHE_TTL_SECONDS = 300
+
+# Rows validated at a time by the roster import (services.roster_service)
+ROSTER_CHUNK_SIZE = 500
 
 # User roles
 USER_ROLES = SimpleNamespace(
@@ -42,6 +124,23 @@ GRADE_SCALE = {
     "F": (0, 59)
 }
 
+# Grade points per letter grade, for GPA
+GRADE_POINTS = {
+    "A+": 4.0,
+    "A": 4.0,
+    "A-": 3.7,
+    "B+": 3.3,
+    "B": 3.0,
+    "B-": 2.7,
+    "C+": 2.3,
+    "C": 2.0,
+    "C-": 1.7,
+    "D+": 1.3,
+    "D": 1.0,
+    "D-": 0.7,
+    "F": 0.0
+}
+
 # Assignment status
 ASSIGNMENT_STATUS = SimpleNamespace(
     ASSIGNED="assigned",
@@ -4,10 +4,15 @@ Helper functions for the School Management System
 import os
 import re
 import json
-import random
-import string
+from bisect import bisect_right
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+from utils.constants import GRADE_SCALE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def clear_screen() -> None:
     """Clear the terminal screen."""
@@ -63,14 +68,37 @@ def generate_id(prefix: str, length: int = 6) -> str:
     
     Args:
         prefix: Prefix for the ID (e.g., 'STU' for students)
-        length: Length of the random part of the ID
+        length: Minimum number of digits after the prefix
     
     Returns:
-        Generated ID (e.g., 'STU123456')
+        Generated ID (e.g., 'STU000123')
     """
-    chars = string.ascii_uppercase + string.digits
-    random_part = ''.join(random.choice(chars) for _ in range(length))
-    return f"{prefix}{random_part}"
+    from storage.sequences import next_id
+    
+    return next_id(prefix, length)
+
+def set_user_id_mapping(user_id: str, username: str) -> None:
+    """
+    Record which username holds a user ID in the 'user_ids' collection.
+    
+    Args:
+        user_id: The ID of the user
+        username: The username the user is stored under
+    """
+    from storage.datastore import add_item
+    
+    add_item('user_ids', user_id, {"username": username})
+
+def remove_user_id_mapping(user_id: str) -> None:
+    """
+    Forget a user ID in the 'user_ids' collection.
+    
+    Args:
+        user_id: The ID of the user
+    """
+    from storage.datastore import delete_item
+    
+    delete_item('user_ids', user_id)
 
 def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -82,13 +110,23 @@ def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         User data if found, None otherwise
     """
-    from storage.datastore import get_data
+    import copy
+    from storage.datastore import get_data, get_item
     
-    users = get_data('users')
+    # Users are keyed by username, so resolve the ID through the reverse map
+    mapping = get_item('user_ids', user_id)
+    if mapping:
+        user = get_item('users', mapping.get("username", ""))
+        if user and user.get("id") == user_id:
+            return user
+    
+    # Not mapped yet (or the map is stale): scan once and repair the map
+    users = get_data('users', readonly=True)
     
     for username, user in users.items():
         if user["id"] == user_id:
-            return user
+            set_user_id_mapping(user_id, username)
+            return copy.deepcopy(user)
     
     return None
 
@@ -117,23 +155,55 @@ def format_currency(amount: float) -> str:
     """
     return f"${amount:,.2f}"
 
+# Letter grades ordered from the lowest band up, with each band's lower bound
+GRADE_LETTERS = sorted(GRADE_SCALE, key=lambda letter: GRADE_SCALE[letter][0])
+GRADE_FLOORS = [GRADE_SCALE[letter][0] for letter in GRADE_LETTERS]
+
+def grade_band(score: float) -> int:
+    """
+    Get the position in GRADE_LETTERS of the band a score falls in.
+    
+    Args:
+        score: Numerical score (0-100)
+    
+    Returns:
+        Index into GRADE_LETTERS and GRADE_FLOORS
+    """
+    return max(bisect_right(GRADE_FLOORS, score) - 1, 0)
+
 def calculate_grade_letter(score: float) -> str:
     """
     Calculate letter grade from a numerical score.
     
+    A score earns the highest band whose lower bound it reaches, so
+    fractional scores between two bands (e.g. 82.5) get the lower band.
+    
     Args:
         score: Numerical score (0-100)
     
     Returns:
         Letter grade based on GRADE_SCALE
     """
-    from utils.constants import GRADE_SCALE
+    return GRADE_LETTERS[grade_band(score)]
+
+def calculate_grade_letters(scores: Sequence[float]) -> List[str]:
+    """
+    Calculate the letter grades of many scores at once.
     
-    for grade, (min_score, max_score) in GRADE_SCALE.items():
-        if min_score <= score <= max_score:
-            return grade
+    Same bands as calculate_grade_letter(); uses NumPy when it is
+    installed and falls back to plain Python otherwise.
     
-    return "F"  # Default to F if no match found
+    Args:
+        scores: Numerical scores (0-100)
+    
+    Returns:
+        Letter grades, in the order of the scores
+    """
+    if np is None or not len(scores):
+        return [calculate_grade_letter(score) for score in scores]
+    
+    positions = np.searchsorted(GRADE_FLOORS, np.asarray(scores, dtype=np.float64), side="right") - 1
+    return np.asarray(GRADE_LETTERS)[np.maximum(positions, 0)].tolist()
 
 def paginate(items: List[Any], page_size: int = 10, 
              page: int = 1) -> List[Any]:
@@ -152,22 +222,34 @@ def paginate(items: List[Any], page_size: int = 10,
     end_idx = start_idx + page_size
     return items[start_idx:end_idx]
 
-def get_current_term() -> str:
+def get_term_for_date(date_str: str) -> str:
     """
-    Get the current academic term based on the date.
+    Get the academic term a date falls in.
+    
+    Args:
+        date_str: ISO format date string (YYYY-MM-DD)
     
     Returns:
-        Current term (e.g., 'Fall 2023')
+        Term (e.g., 'Fall 2023')
     """
-    now = datetime.now()
-    year = now.year
+    date_obj = datetime.fromisoformat(date_str)
+    year = date_obj.year
     
     # Determine semester based on month
-    if 1 <= now.month <= 5:
+    if 1 <= date_obj.month <= 5:
         term = "Spring"
-    elif 6 <= now.month <= 7:
+    elif 6 <= date_obj.month <= 7:
         term = "Summer"
     else:
         term = "Fall"
     
-    return f"{term} {year}"
\ No newline at end of file
+    return f"{term} {year}"
+
+def get_current_term() -> str:
+    """
+    Get the current academic term based on the date.
+    
+    Returns:
+        Current term (e.g., 'Fall 2023')
+    """
+    return get_term_for_date(datetime.now().date().isoformat())
\ No newline at end of file